@@ -0,0 +1 @@
+"""Synthetic data + dashboard benchmarks (python -m bench.run)"""
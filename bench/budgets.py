@@ -0,0 +1,294 @@
+# ====================================================
+# 🧾 Per-page Query Budgets (AppTest)
+# ====================================================
+"""Drive app.py page by page and hold every render to a query budget.
+
+Seeds a local database, runs the real app with streamlit's AppTest, logs
+in as the admin and as the busiest approved customer, and opens every
+section twice. The warm render of each page is measured with
+query_monitor: query count and DB time of the whole rerun (header plus
+section). Both must stay within the budgets in bench/budgets.json:
+
+    {"volumes": {...}, "memory": {"Admin · 👥 Users": {"queries": 6, "db_ms": 60}, ...},
+     "mongo": {...}}
+
+A page over budget prints the call sites behind its queries, with repeated
+identical queries marked, so a find_one inside a loop points at its line.
+
+    python -m bench.budgets                       # in-memory backend
+    python -m bench.budgets --backend mongo       # local mongod (BENCH_MONGO_URI)
+    python -m bench.budgets --update              # re-record this backend's budgets
+
+On the memory backend a "query" is one repository call (nested calls are
+not counted twice) and DB time is the time spent in those calls. The mongo
+backend seeds its own database (BENCH_MONGO_DB, default BroadbandBench) and
+drops it first — never point it at production.
+
+tests/test_budgets.py runs the check for both backends (mongo only when a
+mongod is reachable).
+"""
+import argparse
+import collections
+import functools
+import gc
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+from bench import synthetic
+
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), "budgets.json")
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+ADMIN = ("admin@portal.com", "admin@123")
+ADMIN_SECTIONS = ["👥 Users", "📦 Plans", "📊 Analytics", "📋 Subscriptions",
+                  "➕ Add User", "➕ Add Plan", "⚡ Performance"]
+CUSTOMER_SECTIONS = ["👤 Profile", "📊 My Plans", "📦 Available Plans",
+                     "🕒 Previous Plans", "📈 My Analytics"]
+QUERY_HEADROOM = 0.05      # a loop of per-row lookups must not fit in the slack
+DB_MS_HEADROOM = 1.0       # timings are noisy: --update allows double
+MIN_DB_MS = 25.0
+TIMEOUT_S = 120
+
+
+# ====================================================
+# 🌱 Seeding + Memory Call Tracking
+# ====================================================
+def _subscriptions(volumes, plan_docs, per_user):
+    for sub in synthetic.subscriptions(volumes["subs"], plan_docs, volumes["users"]):
+        per_user[sub["user_email"]] += 1
+        yield sub
+
+
+def seed_memory(volumes):
+    """The app's own (cached) memory repositories, seeded"""
+    os.environ["PORTAL_BACKEND"] = "memory"
+    from db import get_repositories
+
+    repos = get_repositories()
+    plan_docs = list(synthetic.plans(volumes["plans"]))
+    per_user = collections.Counter()
+    repos.seed(users=synthetic.users(volumes["users"]), plans=plan_docs,
+               subscriptions=_subscriptions(volumes, plan_docs, per_user))
+    track_memory_calls(repos)
+    return repos, per_user
+
+
+def seed_mongo(volumes):
+    """Seed the bench database and point the app's client at it"""
+    # before db is imported: it reads MONGO_DB once
+    os.environ["PORTAL_BACKEND"] = "mongo"
+    os.environ["MONGO_URI"] = os.environ.get("BENCH_MONGO_URI", "mongodb://localhost:27017")
+    os.environ["MONGO_DB"] = os.environ.get("BENCH_MONGO_DB", "BroadbandBench")
+    from bench.run import Counter, seed_mongo as seed
+
+    return seed(volumes, Counter())
+
+
+def _tracked(func, collection, depth):
+    from query_monitor import MONITOR, call_site
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(depth, "value", 0):
+            return func(*args, **kwargs)
+        site = call_site()
+        depth.value = 1
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            depth.value = 0
+        docs = len(result) if isinstance(result, (list, dict)) else int(result is not None)
+        MONITOR.record_call(func.__name__, collection, (time.perf_counter() - start) * 1000,
+                            docs, f"{func.__name__} {collection}", [repr(args), repr(kwargs)],
+                            site)
+        return result
+    return wrapper
+
+
+def track_memory_calls(repos):
+    """Record every outermost public repository call (and catalog reload) as
+    a query, like bench.run counts round trips"""
+    depth = threading.local()
+    for repo, collection in ((repos.users, "users"), (repos.subscriptions, "CustomerPlans")):
+        for name in dir(type(repo)):
+            if not name.startswith("_") and callable(getattr(repo, name)):
+                setattr(repo, name, _tracked(getattr(repo, name), collection, depth))
+    catalog = repos.plans.catalog
+    catalog.load = _tracked(catalog.load, "plans", depth)
+
+
+# ====================================================
+# 🖱️ Driving the App
+# ====================================================
+def _run(at, label):
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"{label}: app raised {at.exception[0].value}")
+
+
+def _login(at, email, password):
+    at.text_input(key="login_email").input(email)
+    at.text_input(key="login_pass").input(password)
+    at.button(key="login_btn").click()
+    _run(at, f"login {email}")
+    if not at.session_state["user"]:
+        raise RuntimeError(f"could not log in as {email}")
+
+
+def _visit(at, state_key, section, prefix):
+    """Open a section twice; the warm rerun's record"""
+    from query_monitor import MONITOR
+
+    for _ in range(2):
+        at.session_state[state_key] = section
+        _run(at, section)
+    rerun = MONITOR.recent(at.session_state["monitor_session"])[0]
+    page = f"{prefix} · {section}"
+    if rerun["section"] != page:
+        raise RuntimeError(f"{page}: last rerun rendered {rerun['section']!r}")
+    return page, rerun
+
+
+def measure_pages(customer):
+    """{page: rerun record} for every admin and customer section"""
+    from streamlit.testing.v1 import AppTest
+    from query_monitor import MONITOR
+
+    MONITOR.call_sites = True
+    at = AppTest.from_file(APP_PATH, default_timeout=TIMEOUT_S)
+    _run(at, "login page")
+    pages = {}
+
+    _login(at, *ADMIN)
+    for section in ADMIN_SECTIONS:
+        page, rerun = _visit(at, "admin_section", section, "Admin")
+        pages[page] = rerun
+
+    at.sidebar.button[0].click()      # 🚪 Logout
+    _run(at, "logout")
+    _login(at, customer, "secret")
+    for section in CUSTOMER_SECTIONS:
+        page, rerun = _visit(at, "customer_section", section, "Customer")
+        pages[page] = rerun
+    return pages
+
+
+# ====================================================
+# ⚖️ Budgets
+# ====================================================
+def usage(rerun):
+    commands = rerun["commands"]
+    return {"queries": len(commands) + rerun["dropped"],
+            "db_ms": round(sum(c["ms"] for c in commands), 1)}
+
+
+def call_site_report(rerun, limit=10):
+    """Lines like "app.py:1234  ×12  find plans (8.1 ms, 12 identical)" """
+    from query_monitor import query_key, repeat_counts
+
+    repeated = repeat_counts(rerun)
+    by_site = collections.defaultdict(list)
+    for command in rerun["commands"]:
+        by_site[(command["call_site"] or "?", command["operation"],
+                 command["collection"])].append(command)
+    lines = []
+    for (site, operation, collection), commands in sorted(
+            by_site.items(), key=lambda item: -len(item[1]))[:limit]:
+        repeats = sum(repeated[query_key(c)] > 1 for c in commands)
+        lines.append(f"{site:<44} ×{len(commands):<4} {operation} {collection} "
+                     f"({sum(c['ms'] for c in commands):.1f} ms"
+                     + (f", {repeats} identical" if repeats else "") + ")")
+    return lines
+
+
+def check(pages, budgets):
+    """Failure messages (empty when every page is within budget)"""
+    failures = []
+    for page, rerun in pages.items():
+        used, budget = usage(rerun), budgets.get(page)
+        if budget is None:
+            failures.append((page, f"no budget declared (measured {used['queries']} queries, "
+                                   f"{used['db_ms']:.1f} ms)", rerun))
+            continue
+        over = [f"{key} {used[key]:g} > {budget[key]:g}" for key in ("queries", "db_ms")
+                if used[key] > budget[key]]
+        if over:
+            failures.append((page, " · ".join(over), rerun))
+    return failures
+
+
+def recorded(pages):
+    """Budgets for this run's measurements plus headroom"""
+    budgets = {}
+    for page, rerun in pages.items():
+        used = usage(rerun)
+        budgets[page] = {
+            "queries": used["queries"] + max(1, math.ceil(used["queries"] * QUERY_HEADROOM)),
+            "db_ms": math.ceil(max(used["db_ms"], MIN_DB_MS) * (1 + DB_MS_HEADROOM)),
+        }
+    return budgets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check per-page query budgets with AppTest")
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--budgets", default=BUDGETS_PATH)
+    parser.add_argument("--update", action="store_true",
+                        help="write this run's measurements (+headroom) as the budgets")
+    args = parser.parse_args(argv)
+
+    with open(args.budgets) as fh:
+        config = json.load(fh)
+    volumes = config["volumes"]
+
+    print(f"Seeding {args.backend}: {volumes} ...")
+    seed = seed_memory if args.backend == "memory" else seed_mongo
+    repos, per_user = seed(volumes)
+    # keep the seeded store out of the collector: a full collection that
+    # happens to start inside a timed call (~40 ms over 20k subscriptions)
+    # is not DB time, and where it lands shifts with every code change
+    gc.collect()
+    gc.freeze()
+    approved = {u["email"] for u in synthetic.users(volumes["users"]) if u["approved"]}
+    customer = next(email for email, _ in per_user.most_common() if email in approved)
+
+    pages = measure_pages(customer)
+    budgets = config.get(args.backend, {})
+    if not budgets and not args.update:
+        for page, rerun in pages.items():
+            used = usage(rerun)
+            print(f"{page:<30} {used['queries']:>5} queries {used['db_ms']:>9.1f} ms")
+        print(f"\n❌ no {args.backend} budgets in {args.budgets} — record them with "
+              f"`python -m bench.budgets --backend {args.backend} --update` and commit the file")
+        return 1
+    for page, rerun in pages.items():
+        used, budget = usage(rerun), budgets.get(page, {})
+        print(f"{page:<30} {used['queries']:>5} / {budget.get('queries', '-'):>5} queries "
+              f"{used['db_ms']:>9.1f} / {budget.get('db_ms', '-'):>6} ms")
+
+    if args.update:
+        config[args.backend] = recorded(pages)
+        with open(args.budgets, "w") as fh:
+            json.dump(config, fh, indent=2, ensure_ascii=False)
+            fh.write("\n")
+        print(f"✅ {args.backend} budgets written to {args.budgets}")
+        return 0
+
+    failures = check(pages, budgets)
+    for page, problem, rerun in failures:
+        print(f"\n❌ {page}: {problem}")
+        for line in call_site_report(rerun):
+            print("   ", line)
+    if failures:
+        return 1
+    print("✅ every page is within its budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
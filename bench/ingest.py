@@ -0,0 +1,77 @@
+# ====================================================
+# 📶 Usage Ingestion Benchmark
+# ====================================================
+"""Events/sec of usage_ingest.ingest() on synthetic events, end to end.
+
+    python -m bench.ingest                          # 1M events, in-memory backend
+    python -m bench.ingest --events 5000000 --format jsonl
+    python -m bench.ingest --backend mongo          # local mongod (BENCH_MONGO_URI)
+
+The events file is written first (not timed); the timed part is parsing,
+aggregation and the bulk flushes. The same batch is then ingested again to
+show that a replay changes nothing.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+
+from bench import synthetic
+from bench.run import Counter, seed_memory, seed_mongo
+from usage_ingest import DEFAULT_FLUSH_EVENTS, ingest
+
+
+def write_events(path, fmt, events):
+    with open(path, "w", newline="") as fh:
+        if fmt == "csv":
+            writer = csv.DictWriter(fh, fieldnames=["user_email", "plan_name", "bytes", "timestamp"])
+            writer.writeheader()
+            writer.writerows(events)
+        else:
+            for event in events:
+                fh.write(json.dumps(event) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark usage ingestion")
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--flush-events", type=int, default=DEFAULT_FLUSH_EVENTS)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--subs", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    volumes = {"users": args.users, "plans": 500, "subs": args.subs}
+    seed = seed_memory if args.backend == "memory" else seed_mongo
+    repos, _ = seed(volumes, Counter())
+    open_subs = {(s["user_email"], s["plan_name"])
+                 for s in synthetic.subscriptions(volumes["subs"], list(synthetic.plans(500)),
+                                                  volumes["users"])
+                 if s["status"] in ("active", "stopped")}
+
+    fd, path = tempfile.mkstemp(suffix=f".{args.format}")
+    os.close(fd)
+    try:
+        write_events(path, args.format, synthetic.usage_events(args.events, open_subs))
+        print(f"{args.events:,} events, {os.path.getsize(path) / 1e6:,.0f} MB {args.format}")
+
+        for attempt in ("first run", "replay"):
+            start = time.perf_counter()
+            summary = ingest(repos.subscriptions, path, args.format, f"bench:{args.format}",
+                             args.flush_events)
+            elapsed = time.perf_counter() - start
+            print(f"{attempt:<10} {elapsed:>7.2f} s  {summary['events'] / elapsed:>12,.0f} events/s  "
+                  f"{summary['matched']:>8,} subscriptions updated  "
+                  f"{summary['buckets']:>8,} history buckets  "
+                  f"already done: {summary['already_done']}")
+    finally:
+        os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+# ====================================================
+# 🏋️ Concurrent-session Load Test
+# ====================================================
+"""How rerun latency degrades as concurrent sessions grow.
+
+A Streamlit server runs each session's script in its own thread, all on
+one shared MongoClient. This tool does the same with N session threads
+over one repositories object. Each session logs in as its own approved
+customer and loops over a customer flow, one rerun per step:
+
+    login → dashboard → browse plans → subscribe → my plans → pause → resume
+
+A step does the storage work of that rerun — the bench.paths functions
+that mirror app.py, plus the subscribe / pause / resume callbacks, which
+rerun only their card fragment. Rendering is not included; AppTest can't
+drive concurrent sessions in one process.
+
+For every session count it reports reruns, throughput, p50/p95/p99 rerun
+latency and the time spent waiting for a pooled connection:
+
+    python -m bench.load --sessions 1,10,50,100                # local mongod
+    python -m bench.load --sessions 50 --max-pool-size 20      # smaller pool
+    python -m bench.load --backend memory --latency-ms 30      # no mongod
+
+The mongo backend seeds its own database (BENCH_MONGO_URI / BENCH_MONGO_DB,
+default BroadbandBench) and drops it first — never point it at production.
+On the memory backend every repository call waits for one of
+--max-pool-size slots and sleeps --latency-ms, a stand-in for the pool and
+the network.
+"""
+import argparse
+import collections
+import functools
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+from bench import paths, synthetic
+from bench.run import PRESETS
+
+
+STEPS = ["login", "dashboard", "browse", "subscribe", "my_plans", "pause", "resume"]
+
+
+# ====================================================
+# ⏳ Connection-pool Wait
+# ====================================================
+class PoolWaits:
+    """Seconds each connection checkout waited, from any thread"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waits = []
+
+    def add(self, seconds):
+        with self.lock:
+            self.waits.append(seconds)
+
+    def drain(self):
+        with self.lock:
+            waits, self.waits = self.waits, []
+        return waits
+
+
+def pool_listener(waits):
+    from pymongo import monitoring
+
+    class CheckoutListener(monitoring.ConnectionPoolListener):
+        """ConnectionCheckedOutEvent.duration includes the wait for a free
+        connection (and establishing a new one)"""
+
+        def connection_checked_out(self, event):
+            waits.add(event.duration or 0.0)
+
+        def connection_check_out_failed(self, event):
+            waits.add(event.duration or 0.0)
+
+    # the listener interface needs every hook
+    for hook in ("pool_created", "pool_ready", "pool_cleared", "pool_closed",
+                 "connection_created", "connection_ready", "connection_closed",
+                 "connection_check_out_started", "connection_checked_in"):
+        setattr(CheckoutListener, hook, lambda self, event: None)
+    return CheckoutListener()
+
+
+class FairSlots:
+    """A connection pool stand-in: n slots, handed to waiters first come
+    first served (a plain Semaphore lets newcomers barge and starve some)"""
+
+    def __init__(self, n):
+        self.free = n
+        self.lock = threading.Lock()
+        self.waiters = collections.deque()
+
+    def __enter__(self):
+        with self.lock:
+            if self.free and not self.waiters:
+                self.free -= 1
+                return
+            turn = threading.Event()
+            self.waiters.append(turn)
+        turn.wait()
+
+    def __exit__(self, *exc):
+        with self.lock:
+            if self.waiters:
+                self.waiters.popleft().set()   # the slot passes straight on
+            else:
+                self.free += 1
+
+
+def simulate_network(repos, waits, latency_ms, pool_size):
+    """Memory backend: each outermost repository call takes a pool slot and
+    sleeps latency_ms, so sessions queue like they would for connections"""
+    slots = FairSlots(pool_size)
+    depth = threading.local()
+    latency = latency_ms / 1000
+
+    def networked(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if getattr(depth, "value", 0):
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            with slots:
+                waits.add(time.perf_counter() - start)
+                depth.value = 1
+                try:
+                    time.sleep(latency)
+                    return func(*args, **kwargs)
+                finally:
+                    depth.value = 0
+        return wrapper
+
+    for repo in (repos.users, repos.subscriptions):
+        for name in dir(type(repo)):
+            if not name.startswith("_") and callable(getattr(repo, name)):
+                setattr(repo, name, networked(getattr(repo, name)))
+    repos.plans.catalog.load = networked(repos.plans.catalog.load)
+
+
+# ====================================================
+# 🌱 Setup
+# ====================================================
+def memory_setup(volumes, args, waits):
+    from repositories import memory_repositories
+
+    repos = memory_repositories()
+    plan_docs = list(synthetic.plans(volumes["plans"]))
+    repos.seed(users=synthetic.users(volumes["users"]), plans=plan_docs,
+               subscriptions=synthetic.subscriptions(volumes["subs"], plan_docs,
+                                                     volumes["users"]))
+    simulate_network(repos, waits, args.latency_ms, args.max_pool_size)
+    return repos
+
+
+def mongo_setup(volumes, args, waits):
+    import pymongo
+
+    from bench.run import Counter, seed_mongo
+    from db import client_options
+    from repositories import mongo_repositories
+
+    seed_mongo(volumes, Counter())
+    options = client_options()
+    options.update(connect=True, maxPoolSize=args.max_pool_size)
+    client = pymongo.MongoClient(
+        os.environ.get("BENCH_MONGO_URI", "mongodb://localhost:27017"),
+        event_listeners=[pool_listener(waits)], **options)
+    return mongo_repositories(client[os.environ.get("BENCH_MONGO_DB", "BroadbandBench")])
+
+
+# ====================================================
+# 🚶 One Session
+# ====================================================
+class Session:
+    """A logged-in customer walking the flow; step() is one rerun"""
+
+    def __init__(self, repos, email, seed):
+        self.repos = repos
+        self.email = email
+        self.rng = random.Random(seed)
+        self.sub = None
+
+    def login(self):
+        if not self.repos.users.authenticate(self.email, "secret"):
+            raise RuntimeError(f"could not log in as {self.email}")
+
+    def dashboard(self):
+        paths.customer_header(self.repos, self.email)
+        paths.customer_profile(self.repos, self.email)
+
+    def browse(self):
+        paths.customer_header(self.repos, self.email)
+        paths.customer_browse(self.repos, self.email)
+
+    def subscribe(self):
+        # the Subscribe button's callback; only the card fragment reruns
+        plan = self.rng.choice(self.repos.plans.catalog.all())
+        if not self.repos.subscriptions.has_open(self.email, plan["name"]):
+            self.sub = self.repos.subscriptions.subscribe(self.email, plan["name"])
+
+    def my_plans(self):
+        paths.customer_header(self.repos, self.email)
+        paths.customer_my_plans(self.repos, self.email)
+
+    def pause(self):
+        if self.sub:
+            self.repos.subscriptions.set_status(self.sub["_id"], "stopped")
+
+    def resume(self):
+        if self.sub:
+            self.repos.subscriptions.set_status(self.sub["_id"], "active")
+            self.sub = None
+
+
+def run_level(repos, emails, n_sessions, duration, think_ms, waits):
+    """Latencies (s) per step, errors and wall time for n concurrent sessions"""
+    latencies = collections.defaultdict(list)
+    errors = collections.Counter()
+    lock = threading.Lock()
+    start_line = threading.Barrier(n_sessions + 1)
+    stop = threading.Event()
+
+    def worker(i):
+        session = Session(repos, emails[i % len(emails)], seed=i)
+        mine, failed = collections.defaultdict(list), collections.Counter()
+        start_line.wait()
+        while not stop.is_set():
+            for step in STEPS:
+                start = time.perf_counter()
+                try:
+                    getattr(session, step)()
+                except Exception as exc:
+                    failed[f"{step}: {type(exc).__name__}"] += 1
+                else:
+                    mine[step].append(time.perf_counter() - start)
+                if stop.is_set():
+                    break
+                if think_ms:
+                    time.sleep(think_ms / 1000)
+        with lock:
+            for step, values in mine.items():
+                latencies[step].extend(values)
+            errors.update(failed)
+
+    threads = [threading.Thread(target=worker, args=(i,), name=f"session-{i}", daemon=True)
+               for i in range(n_sessions)]
+    for thread in threads:
+        thread.start()
+    waits.drain()
+    start_line.wait()
+    started = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started, waits.drain()
+
+
+# ====================================================
+# 📋 Report
+# ====================================================
+def percentiles(seconds):
+    if not seconds:
+        return [float("nan")] * 3
+    return (np.percentile(seconds, [50, 95, 99]) * 1000).tolist()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test concurrent customer sessions")
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="mongo")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--sessions", default="1,10,50,100",
+                        help="comma-separated concurrent session counts")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per level")
+    parser.add_argument("--think-ms", type=float, default=0,
+                        help="pause between a session's reruns (0 = back to back)")
+    parser.add_argument("--max-pool-size", type=int, default=100,
+                        help="connections per client (MONGO_MAX_POOL_SIZE in production)")
+    parser.add_argument("--latency-ms", type=float, default=5,
+                        help="memory backend: simulated round trip per call")
+    parser.add_argument("--steps", action="store_true", help="also print per-step latency")
+    args = parser.parse_args(argv)
+
+    volumes = PRESETS[args.preset]
+    waits = PoolWaits()
+    print(f"Seeding {args.backend}: {volumes} ...")
+    setup = memory_setup if args.backend == "memory" else mongo_setup
+    repos = setup(volumes, args, waits)
+    emails = [u["email"] for u in synthetic.users(volumes["users"]) if u["approved"]]
+    paths.customer_browse(repos, emails[0])  # load the plan catalog once
+
+    print(f"{'sessions':>8} {'reruns':>8} {'reruns/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'wait p95':>9} {'wait max':>9} {'errors':>7}")
+    for n_sessions in (int(n) for n in args.sessions.split(",")):
+        latencies, errors, wall, pool_waits = run_level(
+            repos, emails, n_sessions, args.duration, args.think_ms, waits)
+        everything = [s for values in latencies.values() for s in values]
+        p50, p95, p99 = percentiles(everything)
+        wait_p95 = percentiles(pool_waits)[1]
+        wait_max = max(pool_waits, default=0) * 1000
+        print(f"{n_sessions:>8} {len(everything):>8,} {len(everything) / wall:>9,.1f} "
+              f"{p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {wait_p95:>9.1f} {wait_max:>9.1f} "
+              f"{sum(errors.values()):>7,}")
+        if args.steps:
+            for step in STEPS:
+                s50, s95, s99 = percentiles(latencies[step])
+                print(f"{'':>8} {step:<18} p50 {s50:.1f} · p95 {s95:.1f} · p99 {s99:.1f} ms")
+        for error, count in errors.most_common(3):
+            print(f"{'':>8} ❌ {error} ×{count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+# ====================================================
+# 🧭 Dashboard Data Paths (what each tab loads)
+# ====================================================
+"""The storage work behind each dashboard section, minus the rendering.
+
+Each function mirrors the repository calls its tab makes in app.py, so the
+timings and query counts describe one render of that tab. Keep these in
+step with app.py when a tab's data access changes.
+"""
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from churn import TOP_RISK_LIMIT
+from dashboard_data import fetch
+from kpis import analytics_rows
+from list_views import CARD_LIMIT
+from recommender import DEFAULT_K, PlanRecommender
+from segments import offer_first
+from subscriptions import DEFAULT_PAGE_SIZE
+
+DURATIONS = ["Monthly", "Quarterly", "Yearly"]
+
+
+# ---------- Admin ----------
+def admin_kpis(repos, email):
+    return fetch("admin header", {
+        "total_users": repos.users.count,
+        "total_customers": lambda: repos.users.count(role="customer"),
+        "kpis": repos.subscriptions.admin_kpis,
+    })[0]
+
+
+def admin_users(repos, email):
+    counts, _ = fetch("admin users", {
+        "admins": lambda: repos.users.count(role="admin"),
+        "approved": lambda: repos.users.count(role="customer", approved=True),
+        "pending": lambda: repos.users.count(role="customer", approved=False),
+    })
+    return counts, repos.users.search_page(page_size=DEFAULT_PAGE_SIZE)
+
+
+def admin_plans(repos, email):
+    all_plans = repos.plans.all()
+    return {
+        duration: (
+            [p for p in all_plans if p.get("duration_type") == duration and p.get("plan_type") == "Offer"],
+            [p for p in all_plans if p.get("duration_type") == duration and p.get("plan_type") == "Normal"],
+        )
+        for duration in DURATIONS
+    }
+
+
+def admin_analytics(repos, email):
+    kpis = repos.subscriptions.admin_kpis()
+    precomputed, _ = fetch("admin analytics", {
+        "profiles": repos.users.segment_profiles,
+        "at_risk": lambda: repos.users.top_churn_risk(TOP_RISK_LIMIT),
+    })
+    return pd.DataFrame(analytics_rows(repos.plans.all(), kpis)), precomputed
+
+
+def admin_subscriptions(repos, email):
+    pages = {}
+    for duration in DURATIONS:
+        filtered = [p for p in repos.plans.all() if p.get("duration_type") == duration]
+        counts = repos.subscriptions.plan_subscriber_counts(
+            {p["name"] for p in filtered}, "All")
+        if len(filtered) > CARD_LIMIT:
+            continue  # grid view: subscribers load once a plan is selected
+        pages.update(repos.subscriptions.first_subscriber_pages(
+            [p["name"] for p in filtered if counts.get(p["name"])], "All", DEFAULT_PAGE_SIZE))
+    return pages
+
+
+# ---------- Customer ----------
+def customer_header(repos, email):
+    user_subs = repos.subscriptions.for_user(email)
+    prices = [(s, repos.plans.catalog.price_of(s["plan_name"])) for s in user_subs]
+    return sum(price for _, price in prices if price is not None)
+
+
+def customer_profile(repos, email):
+    profile, _ = fetch("customer profile", {
+        "user_info": lambda: repos.users.by_email(email),
+        "active_plans": lambda: repos.subscriptions.for_user(email, statuses=["active"]),
+    })
+    active_plans = profile["active_plans"]
+    catalog = repos.plans.catalog
+    segment = (profile["user_info"] or {}).get("segment")
+    current_plans = [catalog.by_name(p["plan_name"]) for p in active_plans
+                     if catalog.by_name(p["plan_name"])]
+    if not current_plans:
+        return offer_first(catalog.filter(plan_type="Offer"), segment) or \
+            catalog.sorted_by_price(limit=3)
+    recs = catalog.derived("recommender", PlanRecommender).recommend(
+        current_plans, k=DEFAULT_K * 3)
+    return offer_first(recs, segment)[:DEFAULT_K]
+
+
+def customer_my_plans(repos, email):
+    user_subs = repos.subscriptions.for_user(email)
+    return [(p, repos.plans.by_name(p.get("plan_name")))
+            for p in user_subs if p.get("status") in ["active", "stopped"]]
+
+
+def customer_browse(repos, email):
+    return {d: repos.plans.catalog.filter(duration_type=d) for d in DURATIONS}
+
+
+def customer_previous(repos, email):
+    result = {}
+    prev = repos.subscriptions.for_user(email, statuses=["previous", "stopped"])
+    for duration in DURATIONS:
+        result[duration] = [
+            (p, plan) for p in prev
+            if (plan := repos.plans.by_name(p["plan_name"]))
+            and plan.get("duration_type") == duration
+        ]
+    return result
+
+
+def customer_analytics(repos, email):
+    rows = []
+    for sub in repos.subscriptions.for_user(email):
+        plan_info = repos.plans.by_name(sub.get("plan_name"))
+        if plan_info:
+            rows.append({
+                "Plan": plan_info.get("name", ""),
+                "Price": plan_info.get("price", 0),
+                "Used Data (GB)": sub.get("usage_gb", 0),
+                "Status": sub.get("status", "active"),
+            })
+    # Usage Trends, default range: the last 30 days as daily rollups
+    end = datetime.now()
+    history = repos.subscriptions.usage_history(email, "day", end - timedelta(days=30), end)
+    return pd.DataFrame(rows), history
+
+
+PATHS = {
+    "admin.kpis": admin_kpis,
+    "admin.users": admin_users,
+    "admin.plans": admin_plans,
+    "admin.analytics": admin_analytics,
+    "admin.subscriptions": admin_subscriptions,
+    "customer.header": customer_header,
+    "customer.profile": customer_profile,
+    "customer.my_plans": customer_my_plans,
+    "customer.browse": customer_browse,
+    "customer.previous": customer_previous,
+    "customer.analytics": customer_analytics,
+}
@@ -0,0 +1,140 @@
+# ====================================================
+# 🤖 Recommender Evaluation (nearest neighbours vs the old rule)
+# ====================================================
+"""Compare PlanRecommender with the rule the dashboard used before it.
+
+The rule recommended every plan with more data or longer validity than the
+user's active plans (catalog order), falling back to the three priciest
+plans. For every user with active plans this prints, for both: coverage,
+list length, agreement, price jump, feature distance and time per call.
+
+    python -m bench.recommend_eval                      # synthetic catalog
+    python -m bench.recommend_eval --plans 20000 --k 5
+    python -m bench.recommend_eval --source mongo       # live data, read-only
+"""
+import argparse
+import collections
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from bench import synthetic
+from catalog import PlanCatalog
+from recommender import DEFAULT_K, PlanRecommender, plan_features, upgrade_bar
+
+
+def synthetic_users(n_plans, n_users, n_subs):
+    plans = [dict(plan, _id=i) for i, plan in enumerate(synthetic.plans(n_plans), 1)]
+    active = collections.defaultdict(set)
+    for sub in synthetic.subscriptions(n_subs, plans, n_users):
+        if sub["status"] == "active":
+            active[sub["user_email"]].add(sub["plan_name"])
+    return plans, active
+
+
+def mongo_users():
+    from db import get_db
+
+    db = get_db()
+    plans = list(db["plans"].find())
+    active = collections.defaultdict(set)
+    for sub in db["CustomerPlans"].find({"status": "active"},
+                                        {"user_email": 1, "plan_name": 1}):
+        active[sub["user_email"]].add(sub["plan_name"])
+    return plans, active
+
+
+def rule(catalog, current_plans, k):
+    """The pre-recommender dashboard logic, cut to the first k cards"""
+    recs = catalog.upgrades_over(*upgrade_bar(current_plans))
+    return recs or catalog.sorted_by_price(descending=True, limit=3), len(recs)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate the plan recommender offline")
+    parser.add_argument("--source", choices=["synthetic", "mongo"], default="synthetic")
+    parser.add_argument("--plans", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--subs", type=int, default=100_000)
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    args = parser.parse_args(argv)
+
+    plans, active = (mongo_users() if args.source == "mongo"
+                     else synthetic_users(args.plans, args.users, args.subs))
+    catalog = PlanCatalog(lambda: plans)
+    recommender, fit_seconds = timed(PlanRecommender, catalog.all())
+    features = plan_features(recommender.plans)
+
+    def distance(current_plans, recs):
+        """mean feature distance from each rec to the nearest current plan"""
+        if not recs:
+            return None
+        here = features[[recommender.position[p["name"]] for p in current_plans]]
+        there = features[[recommender.position[p["name"]] for p in recs]]
+        return float(np.linalg.norm(there[:, None] - here[None], axis=2).min(axis=1).mean())
+
+    def price_jump(current_plans, recs):
+        top = max((p.get("price") or 0) for p in current_plans)
+        prices = [p.get("price") or 0 for p in recs]
+        return statistics.mean(prices) - top if prices else None
+
+    stats = {"rule": collections.defaultdict(list), "knn": collections.defaultdict(list)}
+    for names in active.values():
+        current_plans = [catalog.by_name(n) for n in names if catalog.by_name(n)]
+        if not current_plans:
+            continue
+        (rule_recs, upgrades), rule_seconds = timed(rule, catalog, current_plans, args.k)
+        knn_recs, knn_seconds = timed(recommender.recommend, current_plans, args.k)
+        shown = {"rule": rule_recs[:args.k], "knn": knn_recs}
+        valid = {p["name"] for p in rule_recs} if upgrades else set()
+
+        for method, recs, seconds in (("rule", shown["rule"], rule_seconds),
+                                      ("knn", knn_recs, knn_seconds)):
+            row = stats[method]
+            row["covered"].append(bool(recs) and (method == "knn" or upgrades > 0))
+            row["length"].append(upgrades if method == "rule" else len(recs))
+            row["valid"].extend(p["name"] in valid for p in recs if method == "knn")
+            row["overlap"].append(
+                len({p["name"] for p in recs} & {p["name"] for p in shown["rule"]})
+                / max(len(recs), 1))
+            for key, value in (("price_jump", price_jump(current_plans, recs)),
+                               ("distance", distance(current_plans, recs))):
+                if value is not None:
+                    row[key].append(value)
+            row["micros"].append(seconds * 1e6)
+
+    users = len(stats["knn"]["micros"])
+    print(f"{len(plans):,} plans · {users:,} users with active plans · k={args.k} · "
+          f"fit + precompute {fit_seconds * 1000:,.0f} ms")
+    if not users:
+        return 1
+
+    def mean(values):
+        return f"{statistics.mean(values):,.2f}" if values else "-"
+
+    rows = [
+        ("users with an upgrade", lambda r: f"{100 * statistics.mean(r['covered']):.1f}%"),
+        ("upgrades matched (rule: all)", lambda r: mean(r["length"])),
+        ("recs that are rule upgrades", lambda r: f"{100 * statistics.mean(r['valid']):.1f}%"
+         if r["valid"] else "-"),
+        ("overlap with rule's first k", lambda r: f"{100 * statistics.mean(r['overlap']):.1f}%"),
+        ("price jump over current (₹)", lambda r: mean(r["price_jump"])),
+        ("feature distance to current", lambda r: mean(r["distance"])),
+        ("µs per call (median)", lambda r: f"{statistics.median(r['micros']):,.1f}"),
+    ]
+    print(f"{'':<30} {'rule':>12} {'knn':>12}")
+    for label, cell in rows:
+        print(f"{label:<30} {cell(stats['rule']):>12} {cell(stats['knn']):>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
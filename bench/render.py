@@ -0,0 +1,143 @@
+# ====================================================
+# 🖼️ List Rendering Cost (per-card vs batched vs grid)
+# ====================================================
+"""What a long list costs to send to the browser, per rendering mode.
+
+Renders the same N subscriber rows (default 10,000) three ways with
+streamlit's AppTest and measures the delta messages the server would send:
+
+    per-card   one st.markdown per row with the old inline-styled card
+    block      list_views.html_block: every card in one st.markdown, styled
+               by class (static/portal.css)
+    grid       list_views.grid: one Arrow-backed st.dataframe
+
+For each mode it reports the element count (one delta message each), the
+payload bytes (each element serialized in its ForwardMsg, as sent over the
+websocket) and the script time:
+
+    python -m bench.render                 # 10,000 rows
+    python -m bench.render --rows 1000 --repeat 5
+
+Client render time needs a browser, which this harness doesn't drive.
+The element count is its proxy: the frontend mounts one React element per
+delta, and each card's HTML is parsed and laid out in full, whereas the
+grid is a canvas that draws only the rows in view.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+
+MODES = ["per-card", "block", "grid"]
+
+
+def render_list(mode, n_rows):
+    """The AppTest script: N subscriber rows in one rendering mode"""
+    import random
+
+    import pandas as pd
+    import streamlit as st
+
+    import list_views
+
+    rng = random.Random(0)
+    rows = [{
+        "User": f"Customer {i}",
+        "Email": f"customer{i}@example.com",
+        "Usage (GB)": round(rng.uniform(0, 500), 1),
+        "Status": rng.choice(["Active", "Stopped"]),
+    } for i in range(n_rows)]
+
+    if mode == "per-card":
+        for row in rows:
+            st.markdown(
+                f"""
+                <div style="
+                    border:1px solid #b2ebf2;
+                    border-radius:10px;
+                    padding:12px;
+                    margin-bottom:8px;
+                    background: #e0f2f1;
+                    box-shadow: 0px 2px 6px rgba(0,0,0,0.05);
+                ">
+                    <b>User:</b> {row['User']}<br>
+                    <b>Email:</b> {row['Email']}<br>
+                    <b>Usage:</b> {row['Usage (GB)']} GB<br>
+                    <b>Status:</b> {row['Status']}
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+    elif mode == "block":
+        list_views.html_block([
+            '<div class="subscriber-card">'
+            f'<b>User:</b> {list_views.esc(row["User"])}<br>'
+            f'<b>Email:</b> {list_views.esc(row["Email"])}<br>'
+            f'<b>Usage:</b> {row["Usage (GB)"]} GB<br>'
+            f'<b>Status:</b> {row["Status"]}</div>'
+            for row in rows])
+    else:
+        list_views.grid(pd.DataFrame(rows), "render_bench")
+
+
+def message_size(proto, path):
+    """Bytes of the ForwardMsg that delivers one element at a delta path"""
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    msg = ForwardMsg()
+    msg.metadata.delta_path[:] = path
+    element = msg.delta.new_element
+    for field in element.DESCRIPTOR.fields:
+        if field.message_type is proto.DESCRIPTOR:
+            getattr(element, field.name).CopyFrom(proto)
+            return msg.ByteSize()
+    return msg.ByteSize() + proto.ByteSize()
+
+
+def payload(node, path=()):
+    """(delta messages, bytes) for an AppTest element tree"""
+    proto = getattr(node, "proto", None)
+    messages, size = (1, message_size(proto, path)) if proto is not None else (0, 0)
+    for index, child in getattr(node, "children", {}).items():
+        child_messages, child_size = payload(child, path + (index,))
+        messages += child_messages
+        size += child_size
+    return messages, size
+
+
+def measure(mode, n_rows, repeat):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_function(render_list, kwargs={"mode": mode, "n_rows": n_rows},
+                               default_timeout=600)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+        if at.exception:
+            raise RuntimeError(f"{mode}: {at.exception[0].value}")
+    elements, size = payload(at._tree)
+    return {"elements": elements, "bytes": size, "ms": statistics.median(timings)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare list rendering modes")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per mode (median time)")
+    args = parser.parse_args(argv)
+
+    results = {mode: measure(mode, args.rows, args.repeat) for mode in MODES}
+    base = results["per-card"]
+    print(f"{args.rows:,} rows")
+    print(f"{'mode':<10} {'elements':>9} {'payload':>12} {'vs per-card':>12} {'script ms':>10}")
+    for mode, result in results.items():
+        ratio = result["bytes"] / base["bytes"] if base["bytes"] else float("nan")
+        print(f"{mode:<10} {result['elements']:>9,} {result['bytes'] / 1024:>9,.0f} KiB "
+              f"{ratio:>11.1%} {result['ms']:>10,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
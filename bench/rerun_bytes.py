@@ -0,0 +1,123 @@
+# ====================================================
+# 📡 Bytes Sent per Rerun (AppTest)
+# ====================================================
+"""How much each page sends to the browser on a rerun.
+
+Seeds the in-memory backend with the volumes in bench/budgets.json, drives
+app.py with streamlit's AppTest like bench.budgets (login page, every admin
+section, every customer section) and sizes the warm rerun of each page:
+delta messages, payload bytes (each element in its ForwardMsg, see
+bench.render) and how many of those bytes are <style> blocks.
+
+    python -m bench.rerun_bytes
+    python -m bench.rerun_bytes --save-baseline bench/rerun_bytes.json
+    python -m bench.rerun_bytes --baseline bench/rerun_bytes.json   # before/after
+    python -m bench.rerun_bytes --inline-css      # as with static serving off
+
+A stylesheet served as a static file (theme.py) is fetched once per page
+load, not per rerun, so only its <link> counts here.
+"""
+import argparse
+import json
+import sys
+
+from bench import budgets
+from bench.render import message_size
+
+
+def payload(node, path=()):
+    """(delta messages, bytes, <style> bytes) for an AppTest element tree"""
+    proto = getattr(node, "proto", None)
+    messages, size, css = 0, 0, 0
+    if proto is not None:
+        messages, size = 1, message_size(proto, path)
+        if "<style" in str(getattr(proto, "body", "")):
+            css = size
+    for index, child in getattr(node, "children", {}).items():
+        child_messages, child_size, child_css = payload(child, path + (index,))
+        messages += child_messages
+        size += child_size
+        css += child_css
+    return messages, size, css
+
+
+def _sized(at):
+    messages, size, css = payload(at._tree)
+    return {"messages": messages, "bytes": size, "css_bytes": css}
+
+
+def measure_pages(customer):
+    """{page: size} for the login page and every dashboard section"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(budgets.APP_PATH, default_timeout=budgets.TIMEOUT_S)
+    budgets._run(at, "login page")
+    budgets._run(at, "login page")
+    pages = {"Login": _sized(at)}
+
+    for (email, password), state_key, sections, prefix in (
+            (budgets.ADMIN, "admin_section", budgets.ADMIN_SECTIONS, "Admin"),
+            ((customer, "secret"), "customer_section", budgets.CUSTOMER_SECTIONS, "Customer")):
+        if prefix == "Customer":
+            at.sidebar.button[0].click()      # 🚪 Logout
+            budgets._run(at, "logout")
+        budgets._login(at, email, password)
+        for section in sections:
+            for _ in range(2):
+                at.session_state[state_key] = section
+                budgets._run(at, section)
+            pages[f"{prefix} · {section}"] = _sized(at)
+    return pages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure bytes sent per rerun, per page")
+    parser.add_argument("--save-baseline", help="write results as the new baseline")
+    parser.add_argument("--baseline", help="compare against this baseline JSON")
+    parser.add_argument("--inline-css", action="store_true",
+                        help="turn off server.enableStaticServing (theme inlines its CSS)")
+    args = parser.parse_args(argv)
+
+    if args.inline_css:
+        from streamlit import config
+
+        config.set_option("server.enableStaticServing", False, "bench.rerun_bytes")
+
+    with open(budgets.BUDGETS_PATH) as fh:
+        volumes = json.load(fh)["volumes"]
+    print(f"Seeding memory: {volumes} ...")
+    _, per_user = budgets.seed_memory(volumes)
+    approved = {u["email"] for u in budgets.synthetic.users(volumes["users"]) if u["approved"]}
+    customer = next(email for email, _ in per_user.most_common() if email in approved)
+    pages = measure_pages(customer)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)["pages"]
+    print(f"{'page':<30} {'msgs':>6} {'KiB':>9} {'css KiB':>8} {'baseline KiB':>13} {'change':>8}")
+    for page, size in pages.items():
+        line = (f"{page:<30} {size['messages']:>6,} {size['bytes'] / 1024:>9,.1f} "
+                f"{size['css_bytes'] / 1024:>8,.1f}")
+        if page in baseline:
+            base = baseline[page]["bytes"]
+            line += f" {base / 1024:>13,.1f} {(size['bytes'] - base) / base:>+8.1%}"
+        print(line)
+    total = sum(size["bytes"] for size in pages.values())
+    print(f"{'total':<30} {'':>6} {total / 1024:>9,.1f}", end="")
+    if baseline:
+        base = sum(size["bytes"] for size in baseline.values())
+        print(f" {'':>8} {base / 1024:>13,.1f} {(total - base) / base:>+8.1%}")
+    else:
+        print()
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as fh:
+            json.dump({"volumes": volumes, "pages": pages}, fh, indent=2, ensure_ascii=False)
+            fh.write("\n")
+        print(f"✅ baseline written to {args.save_baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
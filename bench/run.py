@@ -0,0 +1,277 @@
+# ====================================================
+# ⏱️ Dashboard Benchmark Suite
+# ====================================================
+"""Seed synthetic data, time every dashboard data path, compare to a baseline.
+
+    python -m bench.run                                  # in-memory, small preset
+    python -m bench.run --preset full                    # 100k users, 2k plans, 1M subs
+    python -m bench.run --backend mongo                  # local mongod (BENCH_MONGO_URI)
+    python -m bench.run --latency-ms 50                  # memory, 50 ms per round trip
+    python -m bench.run --save-baseline bench/baseline.json
+    python -m bench.run --baseline bench/baseline.json   # exit 1 on regression
+
+For each path in bench.paths.PATHS it records the median wall time over
+--repeat warm runs, the number of storage round trips of one warm run
+(Mongo commands, or repository calls on the memory backend) and the peak
+Python memory allocated during one run (tracemalloc).
+
+The mongo backend writes to its own database (BENCH_MONGO_DB, default
+BroadbandBench) and drops it first — never point it at production.
+"""
+import argparse
+import collections
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+
+from bench import synthetic
+from bench.paths import PATHS
+
+
+PRESETS = {
+    "small": {"users": 5_000, "plans": 200, "subs": 50_000},
+    "medium": {"users": 20_000, "plans": 500, "subs": 200_000},
+    "full": {"users": 100_000, "plans": 2_000, "subs": 1_000_000},
+}
+
+
+# ====================================================
+# 🔢 Round-trip Counting
+# ====================================================
+class Counter:
+    """Round trips of one run; paths fan queries out over threads"""
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def add(self):
+        with self.lock:
+            self.count += 1
+
+
+def _counted(func, counter, latency):
+    def wrapper(*args, **kwargs):
+        counter.add()
+        if latency:
+            time.sleep(latency)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def count_memory_calls(repos, counter, latency_ms=0):
+    """Every public repo call (and catalog reload) counts as one round trip,
+    optionally delayed by latency_ms to stand in for the network"""
+    latency = latency_ms / 1000
+    for repo in (repos.users, repos.subscriptions):
+        for name in dir(type(repo)):
+            if not name.startswith("_") and callable(getattr(repo, name)):
+                setattr(repo, name, _counted(getattr(repo, name), counter, latency))
+    catalog = repos.plans.catalog
+    catalog.load = _counted(catalog.load, counter, latency)
+
+
+def mongo_command_counter(counter):
+    from pymongo import monitoring
+
+    ignored = {"hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart",
+               "saslContinue", "buildInfo", "getLastError"}
+
+    class CommandCounter(monitoring.CommandListener):
+        def started(self, event):
+            if event.command_name not in ignored:
+                counter.add()
+
+        def succeeded(self, event):
+            pass
+
+        def failed(self, event):
+            pass
+
+    return CommandCounter()
+
+
+# ====================================================
+# 🌱 Seeding
+# ====================================================
+def _tracked(subs, per_user):
+    for sub in subs:
+        per_user[sub["user_email"]] += 1
+        yield sub
+
+
+def seed_memory(volumes, counter, latency_ms=0):
+    from repositories import memory_repositories
+
+    repos = memory_repositories()
+    plan_docs = list(synthetic.plans(volumes["plans"]))
+    per_user = collections.Counter()
+    repos.seed(
+        users=synthetic.users(volumes["users"]),
+        plans=plan_docs,
+        subscriptions=_tracked(
+            synthetic.subscriptions(volumes["subs"], plan_docs, volumes["users"]), per_user),
+    )
+    count_memory_calls(repos, counter, latency_ms)
+    return repos, per_user
+
+
+def seed_mongo(volumes, counter, latency_ms=0):
+    import pymongo
+
+    from db import client_options
+    from indexes import bootstrap_schema
+    from repositories import mongo_repositories
+
+    options = client_options()
+    options["connect"] = True
+    client = pymongo.MongoClient(
+        os.environ.get("BENCH_MONGO_URI", "mongodb://localhost:27017"),
+        event_listeners=[mongo_command_counter(counter)], **options)
+    db_name = os.environ.get("BENCH_MONGO_DB", "BroadbandBench")
+    client.drop_database(db_name)
+    db = client[db_name]
+
+    for batch in synthetic.batched(synthetic.users(volumes["users"]), 10_000):
+        db["users"].insert_many(batch, ordered=False)
+    plan_docs = list(synthetic.plans(volumes["plans"]))
+    db["plans"].insert_many([dict(p) for p in plan_docs], ordered=False)
+    per_user = collections.Counter()
+    subs = _tracked(
+        synthetic.subscriptions(volumes["subs"], plan_docs, volumes["users"]), per_user)
+    for batch in synthetic.batched(subs, 10_000):
+        db["CustomerPlans"].insert_many(batch, ordered=False)
+
+    bootstrap_schema(db)
+    return mongo_repositories(db), per_user
+
+
+# ====================================================
+# 📏 Measurement
+# ====================================================
+def measure(repos, counter, email, repeat):
+    results = {}
+    for name, path in PATHS.items():
+        path(repos, email)  # warm-up (loads the plan catalog once)
+
+        counter.count = 0
+        path(repos, email)
+        queries = counter.count
+
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            path(repos, email)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        tracemalloc.start()
+        path(repos, email)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results[name] = {
+            "wall_ms": round(statistics.median(timings), 3),
+            "queries": queries,
+            "peak_kib": round(peak / 1024, 1),
+        }
+        print(f"{name:<22} {results[name]['wall_ms']:>10.2f} ms "
+              f"{queries:>7} queries {results[name]['peak_kib']:>10.1f} KiB")
+    return results
+
+
+def regressions(current, baseline, threshold, min_delta_ms=5.0):
+    """Human-readable list of metrics that got worse than the baseline allows.
+
+    Wall-time changes smaller than min_delta_ms are treated as noise.
+    """
+    problems = []
+    if current["meta"]["volumes"] != baseline["meta"]["volumes"] or \
+            current["meta"]["backend"] != baseline["meta"]["backend"] or \
+            current["meta"].get("latency_ms", 0) != baseline["meta"].get("latency_ms", 0):
+        problems.append("baseline was recorded with different volumes/backend/latency")
+        return problems
+    for name, base in baseline["results"].items():
+        now = current["results"].get(name)
+        if now is None:
+            continue
+        if now["queries"] > base["queries"]:
+            problems.append(f"{name}: queries {base['queries']} → {now['queries']}")
+        if now["wall_ms"] > base["wall_ms"] * (1 + threshold) and \
+                now["wall_ms"] - base["wall_ms"] > min_delta_ms:
+            problems.append(f"{name}: wall {base['wall_ms']:.2f} → {now['wall_ms']:.2f} ms")
+        if now["peak_kib"] > base["peak_kib"] * (1 + threshold):
+            problems.append(f"{name}: peak {base['peak_kib']:.0f} → {now['peak_kib']:.0f} KiB")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dashboard data paths")
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--plans", type=int)
+    parser.add_argument("--subs", type=int)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=0,
+                        help="memory backend: delay per repository call, like a "
+                             "network round trip (default 0)")
+    parser.add_argument("--output", help="write this run's results as JSON")
+    parser.add_argument("--save-baseline", help="write results as the new baseline")
+    parser.add_argument("--baseline", help="compare against this baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative slowdown / memory growth (default 0.25)")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0,
+                        help="ignore wall-time regressions smaller than this")
+    args = parser.parse_args(argv)
+
+    volumes = dict(PRESETS[args.preset])
+    for key in ("users", "plans", "subs"):
+        if getattr(args, key):
+            volumes[key] = getattr(args, key)
+
+    counter = Counter()
+    print(f"Seeding {args.backend}: {volumes} ...")
+    start = time.perf_counter()
+    seed = seed_memory if args.backend == "memory" else seed_mongo
+    repos, per_user = seed(volumes, counter, args.latency_ms)
+    print(f"Seeded in {time.perf_counter() - start:.1f} s")
+
+    # heaviest customer = worst case for the customer dashboard
+    email = per_user.most_common(1)[0][0] if per_user else synthetic.user_email(0)
+    report = {
+        "meta": {
+            "backend": args.backend,
+            "volumes": volumes,
+            "customer": email,
+            "repeat": args.repeat,
+            "latency_ms": args.latency_ms,
+            "python": platform.python_version(),
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": measure(repos, counter, email, args.repeat),
+    }
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as fh:
+                json.dump(report, fh, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        problems = regressions(report, baseline, args.threshold, args.min_delta_ms)
+        for problem in problems:
+            print("❌", problem)
+        if problems:
+            return 1
+        print("✅ no regressions against", args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
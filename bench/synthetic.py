@@ -0,0 +1,110 @@
+# ====================================================
+# 🎲 Synthetic Portal Data
+# ====================================================
+"""Realistic-looking users, plans and subscriptions at any volume.
+
+Distributions (roughly what the production portal looks like):
+- durations: 60% Monthly, 25% Quarterly, 15% Yearly; 20% of plans are Offers
+- plan popularity is Zipf-like: a few plans carry most subscriptions
+- statuses: 60% active, 15% stopped, 25% previous
+- usage is a Beta-distributed share of the plan's data allowance
+- subscribed_on is spread over the last three years
+- usage events carry ~50 MB each (exponential), over the last 30 days
+
+Everything is produced lazily so 1M subscriptions never sit in a list here.
+"""
+import itertools
+import random
+from datetime import datetime, timedelta
+
+
+DURATIONS = [("Monthly", 30, 0.60), ("Quarterly", 90, 0.25), ("Yearly", 365, 0.15)]
+STATUSES = [("active", 0.60), ("stopped", 0.15), ("previous", 0.25)]
+SPEEDS = [30, 50, 100, 150, 300, 500, 1000]
+
+
+def user_email(i):
+    return f"user{i}@example.com"
+
+
+def users(n, seed=1):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield {
+            "name": f"Customer {i}",
+            "email": user_email(i),
+            "password": "secret",
+            "role": "customer",
+            "approved": rng.random() < 0.9,
+            "created_at": datetime(2022, 1, 1) + timedelta(minutes=i),
+        }
+
+
+def plans(n, seed=2):
+    rng = random.Random(seed)
+    names, weights = zip(*[(d, w) for d, _, w in DURATIONS])
+    validity = {d: days for d, days, _ in DURATIONS}
+    for i in range(n):
+        duration = rng.choices(names, weights)[0]
+        speed = rng.choice(SPEEDS)
+        months = validity[duration] // 30
+        yield {
+            "name": f"{duration} {speed} Mbps #{i}",
+            "price": int(months * (199 + speed * rng.uniform(0.8, 1.5))),
+            "valid_data": rng.choice([50, 100, 200, 500, 1000]) * months,
+            "speed": f"{speed} Mbps",
+            "validity_days": validity[duration],
+            "description": "Synthetic benchmark plan",
+            "duration_type": duration,
+            "plan_type": "Offer" if rng.random() < 0.2 else "Normal",
+            "createdAt": datetime(2022, 1, 1),
+        }
+
+
+def subscriptions(n, plan_docs, n_users, seed=3):
+    """n subscriptions over the given plans (list) and n_users users"""
+    rng = random.Random(seed)
+    # Zipf-ish popularity, shuffled so popular plans are spread over durations
+    ranked = list(plan_docs)
+    rng.shuffle(ranked)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(ranked))))
+    statuses, status_weights = zip(*STATUSES)
+    start = datetime.now() - timedelta(days=3 * 365)
+
+    for _ in range(n):
+        plan = rng.choices(ranked, cum_weights=cum_weights)[0]
+        yield {
+            "user_email": user_email(rng.randrange(n_users)),
+            "plan_name": plan["name"],
+            "status": rng.choices(statuses, status_weights)[0],
+            "usage_gb": round(plan["valid_data"] * rng.betavariate(2, 3), 2),
+            "subscribed_on": start + timedelta(minutes=rng.randrange(3 * 365 * 24 * 60)),
+        }
+
+
+def usage_events(n, open_subs, days=30, seed=4):
+    """n network usage events over open (user_email, plan_name) pairs, in
+    time order as a collector would emit them"""
+    rng = random.Random(seed)
+    open_subs = list(open_subs)
+    start = datetime.now() - timedelta(days=days)
+    step = days * 24 * 3600 / n
+    for i in range(n):
+        email, plan_name = open_subs[rng.randrange(len(open_subs))]
+        yield {
+            "user_email": email,
+            "plan_name": plan_name,
+            "bytes": int(rng.expovariate(1 / 50_000_000)),
+            "timestamp": (start + timedelta(seconds=int(i * step))).isoformat(),
+        }
+
+
+def batched(docs, size):
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
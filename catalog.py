@@ -0,0 +1,140 @@
+# ====================================================
+# 📚 Plan Catalog Cache
+# ====================================================
+"""In-memory copy of the plans collection.
+
+Plans are reference data: every dashboard reads them, only the admin
+add/edit/delete paths write them. Those paths go through PlansRepo, which
+calls `bump()` after writing, and the next lookup reloads the whole catalog
+in one query. Until then every lookup is a dict access, so a render costs
+zero catalog queries. `max_age` is a safety net for edits made outside this
+process. Anything computed from the whole catalog (the recommender index)
+hangs off `derived()` and is rebuilt with it.
+
+The repositories are cached once per server process, so each backend has
+exactly one catalog. Returned plan dicts are shared between sessions —
+treat them as read-only.
+"""
+import threading
+import time
+
+
+def _price_sort_key(plan):
+    # Mongo sorts missing/null prices before every number
+    price = plan.get("price")
+    return (price is not None, price if price is not None else 0)
+
+
+class PlanCatalog:
+    """All plans, indexed by name, _id, duration_type and plan_type"""
+
+    def __init__(self, load, max_age=300):
+        self.load = load
+        self.max_age = max_age
+        self.version = 0
+        self._lock = threading.Lock()
+        self._loaded_version = None
+        self._loaded_at = 0.0
+        self._plans = []
+        self._by_name = {}
+        self._by_id = {}
+        self._by_duration = {}
+        self._by_type = {}
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+
+    # ---------- Versioning ----------
+    def bump(self):
+        """Call after any write to the plans collection"""
+        with self._lock:
+            self.version += 1
+            return self.version
+
+    def _is_stale(self):
+        if self._loaded_version != self.version:
+            return True
+        return time.monotonic() - self._loaded_at > self.max_age
+
+    def _load(self):
+        version = self.version
+        plans = list(self.load())
+
+        by_name, by_id, by_duration, by_type = {}, {}, {}, {}
+        for plan in plans:
+            # first plan wins, same as find_one({"name": ...})
+            by_name.setdefault(plan.get("name"), plan)
+            by_id[plan["_id"]] = plan
+            by_duration.setdefault(plan.get("duration_type"), []).append(plan)
+            by_type.setdefault(plan.get("plan_type"), []).append(plan)
+
+        self._plans = plans
+        self._by_name = by_name
+        self._by_id = by_id
+        self._by_duration = by_duration
+        self._by_type = by_type
+        self._derived = {}
+        self._loaded_version = version
+        self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    self._load()
+
+    # ---------- Lookups ----------
+    def all(self):
+        self._ensure_fresh()
+        return self._plans
+
+    def by_name(self, name):
+        self._ensure_fresh()
+        return self._by_name.get(name)
+
+    def by_id(self, plan_id):
+        self._ensure_fresh()
+        return self._by_id.get(plan_id)
+
+    def price_of(self, name, default=None):
+        plan = self.by_name(name)
+        if plan is None:
+            return default
+        return plan.get("price", 0)
+
+    def filter(self, duration_type=None, plan_type=None):
+        """Plans matching the given duration and/or type (None = any)"""
+        self._ensure_fresh()
+        if duration_type is not None:
+            plans = self._by_duration.get(duration_type, [])
+            if plan_type is not None:
+                plans = [p for p in plans if p.get("plan_type") == plan_type]
+            return plans
+        if plan_type is not None:
+            return self._by_type.get(plan_type, [])
+        return self._plans
+
+    def upgrades_over(self, max_data, max_validity):
+        """Plans with more data OR longer validity than the given limits"""
+        def greater(value, limit):
+            return isinstance(value, (int, float)) and value > limit
+
+        return [
+            p for p in self.all()
+            if greater(p.get("valid_data"), max_data)
+            or greater(p.get("validity_days"), max_validity)
+        ]
+
+    def sorted_by_price(self, descending=False, limit=None):
+        plans = sorted(self.all(), key=_price_sort_key, reverse=descending)
+        return plans[:limit] if limit is not None else plans
+
+    # ---------- Derived Data ----------
+    def derived(self, name, build):
+        """build(plans), computed once per catalog load (e.g. a fitted model)"""
+        self._ensure_fresh()
+        plans, derived = self._plans, self._derived
+        if name not in derived:
+            with self._derived_lock:
+                if name not in derived:
+                    derived[name] = build(plans)
+        return derived[name]
@@ -0,0 +1,230 @@
+# ====================================================
+# ⚠️ Churn Risk (offline model + batch scoring)
+# ====================================================
+"""Who is about to pause or leave, scored ahead of time.
+
+Training (`python churn.py train`, offline): every subscription is an
+example, labelled 1 if it ended up "stopped" or "previous". Its features are
+the plan (price, data, validity, duration, offer), how much of the plan was
+used, its age, and the customer's *other* subscriptions (how many are open,
+how many already ended, tenure, spend). A HistGradientBoostingClassifier is
+fitted on a sample of at most --max-rows subscriptions and saved with joblib
+to CHURN_MODEL_PATH, with its hold-out ROC AUC.
+
+Scoring (`python churn.py score`, e.g. nightly): active subscriptions are
+streamed in batches and scored with one predict_proba per batch; a
+customer's `churn_score` is their riskiest active subscription. Scores go
+back to `users` in bulk and the admin Analytics tab reads the top of the
+`churn_score` index — the app never runs the model.
+
+Both passes reuse segments.customer_features() for the per-customer totals.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from segments import DEFAULT_BATCH_SIZE, SCAN_FIELDS, customer_features
+
+
+CHURN_MODEL_PATH = os.environ.get("CHURN_MODEL_PATH", "churn_model.joblib")
+FEATURES = [
+    "price", "valid_data", "validity_days", "offer", "quarterly", "yearly",
+    "usage_ratio", "age_days",
+    "other_active", "other_ended", "customer_tenure_days", "customer_spend",
+]
+ENDED = ["stopped", "previous"]
+DEFAULT_MAX_ROWS = 500_000
+TOP_RISK_LIMIT = 25
+
+
+# ====================================================
+# 🧮 Features (one batch of subscriptions at a time)
+# ====================================================
+def plan_table(plans):
+    """Plan features indexed by name (first plan wins, as in the catalog)"""
+    frame = pd.DataFrame([{
+        "name": p.get("name"),
+        "price": p.get("price"),
+        "valid_data": p.get("valid_data"),
+        "validity_days": p.get("validity_days"),
+        "offer": p.get("plan_type") == "Offer",
+        "quarterly": p.get("duration_type") == "Quarterly",
+        "yearly": p.get("duration_type") == "Yearly",
+    } for p in plans], columns=["name", "price", "valid_data", "validity_days",
+                                "offer", "quarterly", "yearly"])
+    frame = frame.drop_duplicates("name").set_index("name")
+    for column in ("price", "valid_data", "validity_days"):
+        frame[column] = pd.to_numeric(frame[column], errors="coerce")
+    return frame.astype(float)
+
+
+def subscription_features(rows, plan_features, customers, now):
+    """(features DataFrame, ended Series, user_email Series) for one batch.
+
+    The customer columns leave the subscription itself out, so a stopped
+    subscription never explains itself.
+    """
+    df = pd.DataFrame(rows, columns=SCAN_FIELDS)
+    status = df["status"].fillna("active")
+    ended = status.isin(ENDED).astype(int)
+    active = status.eq("active").astype(int)
+
+    plan = plan_features.reindex(df["plan_name"]).reset_index(drop=True)
+    customer = customers.reindex(df["user_email"]).reset_index(drop=True).fillna(0)
+    usage = pd.to_numeric(df["usage_gb"], errors="coerce")
+    subscribed_on = pd.to_datetime(df["subscribed_on"], errors="coerce")
+
+    features = plan.assign(
+        usage_ratio=(usage / plan["valid_data"].where(plan["valid_data"] > 0)),
+        age_days=(now - subscribed_on).dt.days.clip(lower=0),
+        other_active=customer["active"] - active,
+        other_ended=customer["stopped"] + customer["previous"] - ended,
+        customer_tenure_days=customer["tenure_days"],
+        customer_spend=customer["spend"] - plan["price"].fillna(0),
+    )[FEATURES].astype(float)
+    return features, ended, df["user_email"]
+
+
+def _customers(repos, batch_size):
+    return customer_features(repos.subscriptions.scan(SCAN_FIELDS, batch_size),
+                             repos.plans.all())
+
+
+# ====================================================
+# 🎓 Training (offline)
+# ====================================================
+def train(repos, path=CHURN_MODEL_PATH, max_rows=DEFAULT_MAX_ROWS,
+          batch_size=DEFAULT_BATCH_SIZE, seed=0):
+    """Fit and save the model; returns its metadata (rows, AUC, …)"""
+    import joblib
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    from sklearn.metrics import roc_auc_score
+    from sklearn.model_selection import train_test_split
+
+    now = datetime.now()
+    customers = _customers(repos, batch_size)
+    plan_features = plan_table(repos.plans.all())
+    total = sum(s["total"] for s in repos.subscriptions.plan_stats().values())
+    keep = min(1.0, max_rows / max(total, 1))
+    rng = np.random.default_rng(seed)
+
+    xs, ys = [], []
+    for rows in repos.subscriptions.scan(SCAN_FIELDS, batch_size):
+        features, ended, _ = subscription_features(rows, plan_features, customers, now)
+        sample = rng.random(len(features)) < keep
+        xs.append(features[sample])
+        ys.append(ended[sample])
+    X, y = pd.concat(xs, ignore_index=True), pd.concat(ys, ignore_index=True)
+    if y.nunique() < 2:
+        raise ValueError("need both ended and open subscriptions to train")
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=seed, stratify=y)
+    model = HistGradientBoostingClassifier(max_iter=200, random_state=seed)
+    model.fit(X_train, y_train)
+
+    meta = {
+        "trained_at": now,
+        "rows": len(X),
+        "ended_share": float(y.mean()),
+        "auc": float(roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])),
+        "features": FEATURES,
+    }
+    joblib.dump({"model": model, **meta}, path)
+    return meta
+
+
+_loaded = {}
+
+
+def load_model(path=CHURN_MODEL_PATH):
+    """The saved model bundle, cached until the file changes"""
+    import joblib
+
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    if key not in _loaded:
+        _loaded.clear()
+        _loaded[key] = joblib.load(path)
+    return _loaded[key]
+
+
+# ====================================================
+# 📊 Scoring (batch job)
+# ====================================================
+def score_customers(repos, bundle, batch_size=DEFAULT_BATCH_SIZE):
+    """Series of churn scores indexed by user_email, for customers with an
+    active subscription; one predict_proba per batch"""
+    if bundle["features"] != FEATURES:
+        raise ValueError("model was trained on other features — retrain it")
+    now = datetime.now()
+    customers = _customers(repos, batch_size)
+    plan_features = plan_table(repos.plans.all())
+
+    partials = []
+    for rows in repos.subscriptions.scan(SCAN_FIELDS, batch_size):
+        rows = [r for r in rows if r.get("status") in ("active", None)]
+        if not rows:
+            continue
+        features, _, emails = subscription_features(rows, plan_features, customers, now)
+        risk = pd.Series(bundle["model"].predict_proba(features)[:, 1], index=emails)
+        partials.append(risk.groupby(level=0, sort=False).max())
+    if not partials:
+        return pd.Series(dtype=float)
+    return pd.concat(partials).groupby(level=0, sort=False).max()
+
+
+def run_scoring(repos, path=CHURN_MODEL_PATH, batch_size=DEFAULT_BATCH_SIZE,
+                progress=None):
+    """Score and store; returns (customers scored, seconds per stage)"""
+    timings = {}
+    start = time.perf_counter()
+    scores = score_customers(repos, load_model(path), batch_size)
+    timings["score"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    written = repos.users.set_churn_scores(
+        list(zip(scores.index.tolist(), scores.round(4).tolist())), datetime.now(), progress)
+    timings["write"] = time.perf_counter() - start
+    return written, timings
+
+
+# ====================================================
+# 🖥️ CLI
+# ====================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train or run the churn-risk model")
+    parser.add_argument("command", choices=["train", "score"])
+    parser.add_argument("--model", default=CHURN_MODEL_PATH, help="joblib file")
+    parser.add_argument("--max-rows", type=int, default=DEFAULT_MAX_ROWS,
+                        help="training sample size (subscriptions)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    from db import get_db
+    from repositories import mongo_repositories
+
+    repos = mongo_repositories(get_db())
+    start = time.perf_counter()
+    if args.command == "train":
+        meta = train(repos, args.model, args.max_rows, args.batch_size)
+        print(f"✅ trained on {meta['rows']:,} subscriptions "
+              f"({meta['ended_share']:.0%} ended) · hold-out AUC {meta['auc']:.3f} · "
+              f"{time.perf_counter() - start:.1f} s → {args.model}")
+        return 0
+
+    def report(done, total):
+        print(f"  {done:,} / {total:,} scores written", file=sys.stderr)
+
+    written, timings = run_scoring(repos, args.model, args.batch_size, report)
+    print(f"✅ scored {written:,} customers · "
+          + " · ".join(f"{stage} {seconds:.1f} s" for stage, seconds in timings.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
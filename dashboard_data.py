@@ -0,0 +1,100 @@
+# ====================================================
+# 🚀 Dashboard Data Loading (concurrent fan-out)
+# ====================================================
+"""Run the independent queries of one dashboard render at the same time.
+
+A render declares what it needs as {name: callable} — e.g. the admin
+header's two user counts and the KPI read — and fetch() runs them together
+on a process-wide bounded thread pool. The repositories share one pooled
+MongoClient, which is thread-safe, so each query borrows its own
+connection and the render waits for the slowest query instead of the sum.
+
+    results, timings = fetch("admin header", {
+        "total_users": users_repo.count,
+        "kpis": subs_repo.admin_kpis,
+    })
+
+Per-query timings are logged (logger "dashboard_data", DEBUG) and returned.
+Queries must not call fetch() themselves: nested fan-outs could exhaust
+the pool and wait on each other.
+
+    DASHBOARD_QUERY_WORKERS   threads in the pool (default 8)
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+import query_monitor
+
+
+QUERY_WORKERS = int(os.environ.get("DASHBOARD_QUERY_WORKERS") or 8)
+
+logger = logging.getLogger("dashboard_data")
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=QUERY_WORKERS,
+                                       thread_name_prefix="dashboard-query")
+        return _pool
+
+
+def _timed(query):
+    start = time.perf_counter()
+    result = query()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def _run_here(context, query):
+    future = Future()
+    try:
+        future.set_result(context.run(_timed, query))
+    except Exception as exc:
+        future.set_exception(exc)
+    return future
+
+
+def fetch(label, queries):
+    """({name: result}, {name: ms}) for independent queries run concurrently.
+
+    A single query runs inline, and so does any query no worker has picked
+    up by the time all are submitted — a render is never slower than running
+    its queries one after another. If any query raises, the first failure in
+    declaration order is raised once all of them have finished.
+    """
+    start = time.perf_counter()
+    if len(queries) == 1:
+        (name, query), = queries.items()
+        done = {name: _timed(query)}
+    else:
+        # each worker runs in a copy of this context, so query_monitor still
+        # attributes its commands to the calling rerun and section
+        site = query_monitor.call_site() if query_monitor.MONITOR.call_sites else ""
+        futures, contexts = {}, {}
+        for name, query in queries.items():
+            context = contexts[name] = contextvars.copy_context()
+            if site:
+                context.run(query_monitor.set_fetch_site, f"{site} ({label}: {name})")
+            futures[name] = _executor().submit(context.run, _timed, query)
+        # with many sessions rendering at once the pool is busy: run what is
+        # still queued on this thread instead of waiting for a worker
+        for name in reversed(list(futures)):
+            if futures[name].cancel():
+                futures[name] = _run_here(contexts[name], queries[name])
+        wait(futures.values())
+        done = {name: future.result() for name, future in futures.items()}
+
+    results = {name: result for name, (result, _) in done.items()}
+    timings = {name: ms for name, (_, ms) in done.items()}
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s: %s · wall %.1f ms", label,
+                     " · ".join(f"{name} {ms:.1f} ms" for name, ms in timings.items()),
+                     (time.perf_counter() - start) * 1000)
+    return results, timings
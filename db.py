@@ -0,0 +1,105 @@
+# ====================================================
+# 🌐 MongoDB Client (one pooled client per server process)
+# ====================================================
+"""Shared MongoClient configured from the environment.
+
+Streamlit re-executes app.py on every rerun, so the client lives in
+`st.cache_resource` and is built once per server process. It is created
+with `connect=False`: no network round trip happens until the first query.
+
+Environment variables (a local `.env` file is honoured):
+
+    MONGO_URI                           connection string (default: localhost)
+    MONGO_DB                            database name (default: BroadbandDB)
+    MONGO_MAX_POOL_SIZE                 default 100
+    MONGO_MIN_POOL_SIZE                 default 0
+    MONGO_MAX_IDLE_TIME_MS              default 300000
+    MONGO_CONNECT_TIMEOUT_MS            default 5000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS   default 5000
+    MONGO_SOCKET_TIMEOUT_MS             default 20000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS         default 10000
+    MONGO_COMPRESSORS                   default "zstd,snappy,zlib"
+    PORTAL_BACKEND                      "mongo" (default) or "memory"
+
+Every command is recorded per dashboard rerun by query_monitor.MONITOR.
+
+zstd and snappy need the optional `zstandard` / `python-snappy` packages;
+compressors that are not installed are skipped, zlib is always available.
+"""
+import os
+
+import pymongo
+import streamlit as st
+from dotenv import load_dotenv
+
+from query_monitor import MONITOR
+from repositories import memory_repositories, mongo_repositories
+
+
+load_dotenv()
+
+DEFAULT_URI = "mongodb://localhost:27017"
+DB_NAME = os.environ.get("MONGO_DB", "BroadbandDB")
+
+
+def _int_env(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _available_compressors(requested):
+    available = []
+    for name in (c.strip() for c in requested.split(",")):
+        if name == "zstd":
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                continue
+        elif name == "snappy":
+            try:
+                import snappy  # noqa: F401
+            except ImportError:
+                continue
+        elif name not in ("zlib",):
+            continue
+        available.append(name)
+    return available
+
+
+def client_options():
+    """Keyword arguments passed to MongoClient, read from the environment"""
+    options = {
+        "maxPoolSize": _int_env("MONGO_MAX_POOL_SIZE", 100),
+        "minPoolSize": _int_env("MONGO_MIN_POOL_SIZE", 0),
+        "maxIdleTimeMS": _int_env("MONGO_MAX_IDLE_TIME_MS", 300000),
+        "connectTimeoutMS": _int_env("MONGO_CONNECT_TIMEOUT_MS", 5000),
+        "serverSelectionTimeoutMS": _int_env("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        "socketTimeoutMS": _int_env("MONGO_SOCKET_TIMEOUT_MS", 20000),
+        "waitQueueTimeoutMS": _int_env("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000),
+        "connect": False,
+    }
+    compressors = _available_compressors(
+        os.environ.get("MONGO_COMPRESSORS", "zstd,snappy,zlib"))
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    return options
+
+
+@st.cache_resource(show_spinner=False)
+def get_client():
+    """The process-wide MongoClient (lazy: connects on first use)"""
+    return pymongo.MongoClient(
+        os.environ.get("MONGO_URI", DEFAULT_URI), event_listeners=[MONITOR],
+        **client_options())
+
+
+def get_db(name=None):
+    return get_client()[name or DB_NAME]
+
+
+@st.cache_resource(show_spinner=False)
+def get_repositories():
+    """The data-access layer for this process (PORTAL_BACKEND picks it)"""
+    if os.environ.get("PORTAL_BACKEND", "mongo") == "memory":
+        return memory_repositories()
+    return mongo_repositories(get_db())
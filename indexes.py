@@ -0,0 +1,350 @@
+# ====================================================
+# 🗄️ Index Bootstrap + Schema Migrations
+# ====================================================
+"""Indexes the portal relies on, and the data migrations that go with them.
+
+`bootstrap_schema(db)` runs once per server process: it applies pending
+migrations (tracked in the `schema_migrations` collection) and then creates
+any declared index that is missing. Existing indexes are never dropped;
+differences are reported as drift instead.
+
+`python indexes.py` prints the drift report for the configured database.
+tests/test_indexes.py runs `explain()` on every query shape in QUERY_SHAPES
+and every aggregation in pipeline_shapes() against a scratch mongod and
+fails if any of them needs a collection scan. The pipelines are built by
+the same functions the app calls, so they cannot drift from it.
+"""
+import sys
+import threading
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from kpis import kpi_pipeline
+from plan_stats import rebuild_plan_stats
+from subscription_export import export_pipeline
+from subscriptions import counts_pipeline, first_pages_pipeline
+from user_search import SUPER_ADMIN_EMAIL, user_query
+
+
+# ====================================================
+# 📐 Declared Indexes
+# ====================================================
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        # Users tab: role/approval counts and keyset pages on _id
+        IndexModel([("role", ASCENDING), ("approved", ASCENDING), ("_id", ASCENDING)],
+                   name="role_approved_id"),
+        # prefix search on names (emails use email_unique)
+        IndexModel([("name_lower", ASCENDING)], name="name_lower"),
+        # admin Analytics: highest churn risk first (churn.py writes the scores)
+        IndexModel([("churn_score", DESCENDING)], name="churn_score"),
+    ],
+    "plans": [
+        IndexModel([("name", ASCENDING)], name="name_unique", unique=True),
+        IndexModel([("duration_type", ASCENDING), ("plan_type", ASCENDING)],
+                   name="duration_type_plan_type"),
+        IndexModel([("plan_type", ASCENDING)], name="plan_type"),
+    ],
+    "CustomerPlans": [
+        # also serves the plain {"user_email": ...} lookups (index prefix)
+        IndexModel([("user_email", ASCENDING), ("status", ASCENDING)],
+                   name="user_email_status"),
+        IndexModel([("user_email", ASCENDING), ("plan_name", ASCENDING),
+                    ("status", ASCENDING)],
+                   name="user_email_plan_name_status"),
+        # Subscriptions tab: per-plan counts and keyset pages on _id
+        IndexModel([("plan_name", ASCENDING), ("status", ASCENDING),
+                    ("_id", ASCENDING)],
+                   name="plan_name_status_id"),
+    ],
+    "usage_history": [
+        # one bucket per (user, level, start, plan); serves the Usage Trends
+        # range reads and makes a replayed flush's upsert fail instead of double count
+        IndexModel([("user_email", ASCENDING), ("level", ASCENDING), ("start", ASCENDING),
+                    ("plan_name", ASCENDING)],
+                   name="user_level_start_plan", unique=True),
+    ],
+}
+
+
+# Every filter app.py sends, as (collection, filter, sort). Used by explain().
+QUERY_SHAPES = [
+    ("users", {"email": "a@b.c"}, None),
+    ("users", {"email": "a@b.c", "password": "x"}, None),
+    ("users", {"role": "customer"}, None),
+    ("users", {"email": {"$in": ["a@b.c", "d@e.f"]}}, None),
+    ("users", {"role": "customer", "approved": {"$ne": True}}, None),
+    ("users", {"role": "customer", "approved": True}, [("_id", ASCENDING)]),
+    ("users", {"$or": [{"name_lower": {"$regex": "^ann"}},
+                       {"email": {"$regex": "^ann"}}]}, [("_id", ASCENDING)]),
+    # Users tab search as sent: no index yields _id order under the $or, so
+    # each branch must scan its own index and the (limited) matches are sorted
+    ("users", user_query("ann", "customer", False, [SUPER_ADMIN_EMAIL]), [("_id", ASCENDING)]),
+    ("users", user_query("Ann", None, True), [("_id", ASCENDING)]),
+    ("users", {"churn_score": {"$exists": True}}, [("churn_score", DESCENDING)]),
+    ("plans", {"name": "Monthly Basic"}, None),
+    ("plans", {"name": {"$in": ["Monthly Basic", "Yearly Pro"]}}, None),
+    ("plans", {"duration_type": "Monthly"}, None),
+    ("plans", {"plan_type": "Offer"}, None),
+    ("CustomerPlans", {"user_email": "a@b.c"}, None),
+    ("CustomerPlans", {"user_email": {"$in": ["a@b.c", "d@e.f"]}}, None),
+    ("CustomerPlans", {"user_email": "a@b.c", "status": "active"}, None),
+    ("CustomerPlans", {"user_email": "a@b.c",
+                       "status": {"$in": ["previous", "stopped"]}}, None),
+    ("CustomerPlans", {"user_email": "a@b.c", "plan_name": "Monthly Basic",
+                       "status": {"$in": ["active", "stopped"]}}, None),
+    ("CustomerPlans", {"user_email": "a@b.c", "plan_name": "Monthly Basic",
+                       "status": {"$in": ["active", "stopped"]},
+                       "usage_flushes": {"$ne": "events.csv:0#1"}}, None),
+    ("CustomerPlans", {"user_email": "a@b.c", "plan_name": "Monthly Basic"}, None),
+    ("CustomerPlans", {"plan_name": {"$in": ["Monthly Basic"]},
+                       "status": {"$in": ["active", None]}}, None),
+    ("CustomerPlans", {"plan_name": "Monthly Basic"}, [("_id", ASCENDING)]),
+    ("usage_history", {"user_email": "a@b.c", "level": "day",
+                       "start": {"$gte": datetime(2024, 1, 1), "$lt": datetime(2025, 1, 1)}},
+     None),
+    ("usage_history", {"user_email": {"$in": ["a@b.c", "d@e.f"]}}, None),
+]
+
+
+def pipeline_shapes():
+    """Every aggregation app.py runs, as (collection, pipeline, whole_collection).
+
+    whole_collection pipelines read every document by design (KPI rebuild,
+    finance export): their first stage may scan, but each $lookup must not.
+    """
+    plans = ["Monthly Basic", "Yearly Pro"]
+    return [
+        ("CustomerPlans", kpi_pipeline("plans"), True),
+        ("CustomerPlans", export_pipeline("users", "plans"), True),
+        ("CustomerPlans", counts_pipeline(plans, "All"), False),
+        ("CustomerPlans", counts_pipeline(plans, "Active"), False),
+        ("plans", first_pages_pipeline("CustomerPlans", plans, "All", 26), False),
+        ("plans", first_pages_pipeline("CustomerPlans", plans, "Inactive", 26), False),
+    ]
+
+
+# ====================================================
+# 🔁 Migrations (applied once, in order)
+# ====================================================
+def _backfill_usage_gb(db):
+    # Recommendation subscriptions were inserted without usage_gb
+    db["CustomerPlans"].update_many(
+        {"usage_gb": {"$exists": False}}, {"$set": {"usage_gb": 0}})
+
+
+def _backfill_plan_defaults(db):
+    # the dashboards treat a missing type/duration as Normal/Monthly
+    db["plans"].update_many(
+        {"plan_type": {"$exists": False}}, {"$set": {"plan_type": "Normal"}})
+    db["plans"].update_many(
+        {"duration_type": {"$exists": False}}, {"$set": {"duration_type": "Monthly"}})
+
+
+def _build_plan_stats(db):
+    # counters are maintained incrementally from here on
+    if not rebuild_plan_stats(db["CustomerPlans"]):
+        print("⚠ plan_stats changed during the rebuild — run `python plan_stats.py --rebuild`")
+
+
+def _backfill_name_lower(db):
+    # Users tab prefix search reads name_lower; new writes set it themselves
+    db["users"].update_many(
+        {"name_lower": {"$exists": False}},
+        [{"$set": {"name_lower": {"$toLower": "$name"}}}])
+
+
+def _applied_flush_lists(db):
+    # a single last-flush id was overwritten by other batches; keep a list
+    db["CustomerPlans"].update_many(
+        {"usage_flush": {"$type": "string"}},
+        [{"$set": {"usage_flushes": ["$usage_flush"]}}, {"$unset": "usage_flush"}])
+    db["usage_history"].update_many(
+        {"flush": {"$type": "string"}},
+        [{"$set": {"flushes": ["$flush"]}}, {"$unset": "flush"}])
+
+
+MIGRATIONS = [
+    ("0001_backfill_usage_gb", _backfill_usage_gb),
+    ("0002_backfill_plan_defaults", _backfill_plan_defaults),
+    ("0003_build_plan_stats", _build_plan_stats),
+    ("0004_backfill_name_lower", _backfill_name_lower),
+    ("0005_applied_flush_lists", _applied_flush_lists),
+]
+
+
+def run_migrations(db):
+    """Apply migrations not yet recorded in schema_migrations"""
+    applied_col = db["schema_migrations"]
+    applied = {doc["_id"] for doc in applied_col.find({}, {"_id": 1})}
+    ran = []
+    for migration_id, migrate in MIGRATIONS:
+        if migration_id in applied:
+            continue
+        migrate(db)
+        applied_col.insert_one({"_id": migration_id, "applied_at": datetime.now()})
+        ran.append(migration_id)
+    return ran
+
+
+# ====================================================
+# 🏗️ Index Creation + Drift Report
+# ====================================================
+def _spec(index_model):
+    doc = index_model.document
+    return list(doc["key"].items()), bool(doc.get("unique", False))
+
+
+def index_drift(db):
+    """Compare declared indexes with the server.
+
+    Returns {collection: {"missing": [...], "changed": [...], "unmanaged": [...]}}.
+    """
+    report = {}
+    for collection_name, models in INDEXES.items():
+        existing = db[collection_name].index_information()
+        declared = {m.document["name"]: m for m in models}
+        entry = {"missing": [], "changed": [], "unmanaged": []}
+
+        for name, model in declared.items():
+            if name not in existing:
+                entry["missing"].append(name)
+                continue
+            keys, unique = _spec(model)
+            info = existing[name]
+            if [tuple(k) for k in info["key"]] != keys or bool(info.get("unique")) != unique:
+                entry["changed"].append(name)
+
+        for name in existing:
+            if name != "_id_" and name not in declared:
+                entry["unmanaged"].append(name)
+
+        report[collection_name] = entry
+    return report
+
+
+def ensure_indexes(db):
+    """Create missing declared indexes; returns {collection: [errors]}"""
+    errors = {}
+    drift = index_drift(db)
+    for collection_name, models in INDEXES.items():
+        missing = set(drift[collection_name]["missing"])
+        for model in models:
+            if model.document["name"] not in missing:
+                continue
+            try:
+                db[collection_name].create_indexes([model])
+            except OperationFailure as exc:
+                # e.g. duplicate emails block the unique index — report, don't crash
+                errors.setdefault(collection_name, []).append(
+                    f"{model.document['name']}: {exc}")
+    return errors
+
+
+_bootstrapped = False
+_bootstrap_lock = threading.Lock()
+
+
+def bootstrap_schema(db):
+    """Migrations + indexes, once per server process"""
+    global _bootstrapped
+    if _bootstrapped:
+        return
+    with _bootstrap_lock:
+        if _bootstrapped:
+            return
+        run_migrations(db)
+        for collection_name, problems in ensure_indexes(db).items():
+            for problem in problems:
+                print(f"⚠ index on {collection_name} not created — {problem}")
+        _bootstrapped = True
+
+
+# ====================================================
+# 🔍 explain() Coverage Check
+# ====================================================
+UNBOUNDED = (["[MinKey, MaxKey]"], ["[MaxKey, MinKey]"])
+
+
+def _stages(plan):
+    yield plan
+    if "inputStage" in plan:
+        yield from _stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def _full_index_scan(stage):
+    bounds = stage.get("indexBounds")
+    return stage.get("stage") == "IXSCAN" and bool(bounds) and all(
+        bound in UNBOUNDED for bound in bounds.values())
+
+
+def uncovered_queries(db):
+    """Query shapes whose winning plan contains a COLLSCAN — or, for an $or,
+    walks a whole index (e.g. _id, to skip the sort) instead of scanning
+    each branch on its own index"""
+    uncovered = []
+    for collection_name, query, sort in QUERY_SHAPES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        planner = cursor.explain()["queryPlanner"]
+        winning = planner["winningPlan"]
+        # 7.x+ with the slot-based engine nests the classic plan one level down
+        winning = winning.get("queryPlan", winning)
+        stages = list(_stages(winning))
+        if any(stage.get("stage") == "COLLSCAN" for stage in stages) or \
+                "$or" in query and any(_full_index_scan(stage) for stage in stages):
+            uncovered.append((collection_name, query, sort))
+    return uncovered
+
+
+def _nodes(explain):
+    if isinstance(explain, dict):
+        yield explain
+        for value in explain.values():
+            yield from _nodes(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            yield from _nodes(value)
+
+
+def uncovered_pipelines(db):
+    """Aggregations (from pipeline_shapes) that scan a collection: a COLLSCAN
+    in the first stage's plan, or a $lookup that scanned its foreign side"""
+    uncovered = []
+    for collection_name, pipeline, whole_collection in pipeline_shapes():
+        explain = db.command(
+            "explain", {"aggregate": collection_name, "pipeline": pipeline, "cursor": {}},
+            verbosity="executionStats")
+        nodes = list(_nodes(explain))
+        scans = [] if whole_collection else [
+            node for node in nodes if node.get("stage") == "COLLSCAN"]
+        # classic $lookup reports its inner scans; a pushed-down one its join strategy
+        scans += [node for node in nodes if "$lookup" in node and node.get("collectionScans")]
+        scans += [node for node in nodes if node.get("stage") == "EQ_LOOKUP"
+                  and node.get("strategy") != "IndexedLoopJoin"]
+        if scans:
+            uncovered.append((collection_name, pipeline))
+    return uncovered
+
+
+if __name__ == "__main__":
+    from db import get_db
+
+    target = get_db()
+
+    bootstrap_schema(target)
+    failed = False
+    for collection_name, entry in index_drift(target).items():
+        for kind, names in entry.items():
+            for name in names:
+                print(f"{'❌' if kind != 'unmanaged' else 'ℹ'} {collection_name}.{name}: {kind}")
+                failed = failed or kind != "unmanaged"
+    if failed:
+        sys.exit(1)
+    print("✅ every declared index is in place")
@@ -0,0 +1,210 @@
+# ====================================================
+# 📊 KPI Engine (Admin Header + Analytics Tab)
+# ====================================================
+"""One aggregation for every admin KPI.
+
+The pipeline groups CustomerPlans by plan name first, so the plan price is
+joined once per plan instead of once per subscription, and a $facet returns
+the header totals and the per-plan rows in a single round trip.
+
+The dashboards read the same numbers from the incrementally maintained
+plan_stats counters; this pipeline is the from-scratch recomputation used
+to check those counters (see plan_stats.stats_drift).
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+
+
+def kpi_pipeline(plans_collection_name="plans"):
+    """Aggregation run on CustomerPlans returning totals + per-plan rows"""
+    return [
+        {"$group": {
+            "_id": "$plan_name",
+            "active": {"$sum": {"$cond": [{"$eq": ["$status", "active"]}, 1, 0]}},
+            "total": {"$sum": 1},
+        }},
+        # find_one semantics: first plan with this name, price only
+        {"$lookup": {
+            "from": plans_collection_name,
+            "let": {"plan_name": "$_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$name", "$$plan_name"]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 0, "price": 1}},
+            ],
+            "as": "plan",
+        }},
+        {"$addFields": {
+            "price": {"$ifNull": [{"$arrayElemAt": ["$plan.price", 0]}, 0]},
+        }},
+        {"$facet": {
+            "totals": [{"$group": {
+                "_id": None,
+                "subscriptions": {"$sum": "$total"},
+                "total_revenue": {"$sum": {"$multiply": ["$price", "$total"]}},
+                "active_revenue": {"$sum": {"$multiply": ["$price", "$active"]}},
+            }}],
+            "plans": [{"$project": {
+                "_id": 0,
+                "plan_name": "$_id",
+                "active": 1,
+                "inactive": {"$subtract": ["$total", "$active"]},
+                "total": 1,
+            }}],
+        }},
+    ]
+
+
+def empty_kpis():
+    return {
+        "subscriptions": 0,
+        "total_revenue": 0,
+        "active_revenue": 0,
+        "by_plan": {},
+    }
+
+
+def load_admin_kpis(customers_collection, plans_collection):
+    """Header totals and per-plan subscriber counts in one aggregation"""
+    result = list(customers_collection.aggregate(
+        kpi_pipeline(plans_collection.name)))
+    kpis = empty_kpis()
+    if not result:
+        return kpis
+
+    facet = result[0]
+    if facet["totals"]:
+        totals = facet["totals"][0]
+        kpis["subscriptions"] = totals["subscriptions"]
+        kpis["total_revenue"] = totals["total_revenue"]
+        kpis["active_revenue"] = totals["active_revenue"]
+    for row in facet["plans"]:
+        kpis["by_plan"][row.get("plan_name")] = {
+            "active": row["active"],
+            "inactive": row["inactive"],
+            "total": row["total"],
+        }
+    return kpis
+
+
+def analytics_rows(all_plans, kpis):
+    """Rows for the Analytics tab (one per plan, revenue from active subs)"""
+    analytics_data = []
+    for plan in all_plans:
+        counts = kpis["by_plan"].get(
+            plan["name"], {"active": 0, "inactive": 0, "total": 0})
+        analytics_data.append({
+            "Plan Name": plan["name"],
+            "Active Subscribers": counts["active"],
+            "Inactive Subscribers": counts["inactive"],
+            "Total Subscribers": counts["total"],
+            "Revenue (₹)": counts["active"] * plan.get("price", 0)
+        })
+    return analytics_data
+
+
+# ====================================================
+# 🧪 Reference Loop + Consistency Check
+# ====================================================
+def reference_kpis(all_plans, all_subs):
+    """The original per-subscription Python loop, kept as the oracle"""
+    kpis = empty_kpis()
+    kpis["subscriptions"] = len(all_subs)
+
+    first_by_name = {}
+    for plan in all_plans:
+        first_by_name.setdefault(plan["name"], plan)
+
+    for sub in all_subs:
+        plan = first_by_name.get(sub.get("plan_name"))
+        if plan:
+            kpis["total_revenue"] += plan.get("price", 0)
+            if sub.get("status") == "active":
+                kpis["active_revenue"] += plan.get("price", 0)
+
+        counts = kpis["by_plan"].setdefault(
+            sub.get("plan_name"), {"active": 0, "inactive": 0, "total": 0})
+        if sub.get("status") == "active":
+            counts["active"] += 1
+        else:
+            counts["inactive"] += 1
+        counts["total"] += 1
+    return kpis
+
+
+def synthetic_data(n_plans=40, n_subs=5000, seed=7):
+    """Random plans and subscriptions, including orphans and odd statuses"""
+    rng = random.Random(seed)
+    durations = ["Monthly", "Quarterly", "Yearly"]
+    plans = []
+    for i in range(n_plans):
+        plan = {
+            "name": f"{rng.choice(durations)} Plan {i}",
+            "valid_data": rng.choice([50, 100, 200, 500]),
+            "speed": f"{rng.choice([30, 50, 100, 300])} Mbps",
+            "validity_days": rng.choice([30, 90, 365]),
+            "duration_type": rng.choice(durations),
+            "plan_type": rng.choice(["Normal", "Offer"]),
+        }
+        if rng.random() > 0.05:
+            plan["price"] = rng.randint(199, 4999)
+        plans.append(plan)
+
+    names = [p["name"] for p in plans] + ["Retired Plan", None]
+    start = datetime(2024, 1, 1)
+    subs = []
+    for i in range(n_subs):
+        sub = {
+            "user_email": f"user{rng.randint(0, n_subs // 3)}@example.com",
+            "status": rng.choice(["active", "active", "stopped", "previous"]),
+            "usage_gb": round(rng.uniform(0, 500), 2),
+            "subscribed_on": start + timedelta(days=rng.randint(0, 600)),
+        }
+        plan_name = rng.choice(names)
+        if plan_name is not None:
+            sub["plan_name"] = plan_name
+        subs.append(sub)
+    return plans, subs
+
+
+def check_against_reference(db, n_plans=40, n_subs=5000, seed=7):
+    """Seed scratch collections, run both implementations, return mismatches"""
+    plans_collection = db["kpi_check_plans"]
+    customers_collection = db["kpi_check_subs"]
+    plans_collection.drop()
+    customers_collection.drop()
+
+    plans, subs = synthetic_data(n_plans, n_subs, seed)
+    plans_collection.insert_many([dict(p) for p in plans])
+    customers_collection.insert_many([dict(s) for s in subs])
+
+    try:
+        expected = reference_kpis(plans, subs)
+        actual = load_admin_kpis(customers_collection, plans_collection)
+    finally:
+        plans_collection.drop()
+        customers_collection.drop()
+
+    mismatches = []
+    for key in ("subscriptions", "total_revenue", "active_revenue"):
+        if expected[key] != actual[key]:
+            mismatches.append(f"{key}: loop={expected[key]} pipeline={actual[key]}")
+    if expected["by_plan"] != actual["by_plan"]:
+        mismatches.append("per-plan counts differ")
+    if analytics_rows(plans, expected) != analytics_rows(plans, actual):
+        mismatches.append("analytics rows differ")
+    return mismatches
+
+
+if __name__ == "__main__":
+    # python kpis.py  → compares pipeline vs loop on a scratch database
+    from db import get_db
+
+    scratch = get_db("BroadbandKpiCheck")
+    problems = check_against_reference(scratch)
+    for problem in problems:
+        print("❌", problem)
+    if problems:
+        sys.exit(1)
+    print("✅ KPI pipeline matches the reference loop")
@@ -0,0 +1,86 @@
+# ====================================================
+# 🗂️ List Views (batched cards or a virtualised grid)
+# ====================================================
+"""Render long lists without one Streamlit element per item.
+
+Every st.markdown / st.button is its own delta message, so a list of
+thousands of HTML cards costs thousands of messages and megabytes per
+rerun. A list here renders one of two ways:
+
+- "cards": all card HTML joined into a single st.markdown block (one delta),
+  kept for short lists and read-only cards;
+- "grid":  an Arrow-backed st.dataframe — the browser only draws the
+  visible rows — with row selection feeding the list's action buttons.
+
+Lists longer than CARD_LIMIT open as a grid; each list has a toggle.
+`python -m bench.render` measures both against per-item cards.
+"""
+import html
+
+import streamlit as st
+
+
+CARD_LIMIT = 30
+VIEWS = {"cards": "🗂 Cards", "grid": "📋 Grid"}
+
+
+def choose_view(key, n_items):
+    """"cards" or "grid" for one list (remembered per key)"""
+    default = "cards" if n_items <= CARD_LIMIT else "grid"
+    if key not in st.session_state:
+        st.session_state[key] = default
+    if hasattr(st, "segmented_control"):
+        choice = st.segmented_control("View", list(VIEWS), format_func=VIEWS.get,
+                                      key=key, label_visibility="collapsed")
+    else:
+        choice = st.radio("View", list(VIEWS), format_func=VIEWS.get, key=key,
+                          horizontal=True, label_visibility="collapsed")
+    return choice or default
+
+
+def capped(items):
+    """The first CARD_LIMIT items, for lists of interactive card fragments
+    (a card with buttons is several elements and can't be batched)"""
+    if len(items) > CARD_LIMIT:
+        st.caption(f"Showing the first {CARD_LIMIT} of {len(items):,} — "
+                   "switch to 📋 Grid to see and act on all of them.")
+    return items[:CARD_LIMIT]
+
+
+def esc(value):
+    """HTML-escape a value for a card"""
+    return html.escape(str(value))
+
+
+def html_block(cards):
+    """One markdown element for many HTML cards.
+
+    Cards must be single-line HTML: markdown would turn indented lines
+    into code blocks.
+    """
+    if cards:
+        st.markdown("".join(cards), unsafe_allow_html=True)
+
+
+# ---------- Grid ----------
+def _grid_key(key):
+    return f"{key}#{st.session_state.get('grid_versions', {}).get(key, 0)}"
+
+
+def reset_grid(key):
+    """Drop a grid's selection (e.g. after acting on the selected rows)"""
+    versions = st.session_state.setdefault("grid_versions", {})
+    versions[key] = versions.get(key, 0) + 1
+
+
+def grid(df, key, selection="multi-row", column_config=None, height="auto"):
+    """st.dataframe with row selection; returns the selected row positions"""
+    if selection is None:
+        st.dataframe(df, hide_index=True, use_container_width=True,
+                     column_config=column_config, height=height)
+        return []
+    event = st.dataframe(df, key=_grid_key(key), on_select="rerun",
+                         selection_mode=selection, hide_index=True,
+                         use_container_width=True, column_config=column_config,
+                         height=height)
+    return event.selection.rows
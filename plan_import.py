@@ -0,0 +1,209 @@
+# ====================================================
+# 📥 Bulk Plan Import / Export
+# ====================================================
+"""Stream plans in and out of CSV / Parquet files.
+
+Import reads the file in chunks and, per chunk:
+1. validates every column at once with pandas (no per-row Python checks),
+2. drops names repeated in the file and asks the repo which of the rest
+   already exist — one `$in` query per chunk,
+3. writes the chunk with one unordered insert_many (new plans only) or
+   one unordered bulk_write of upserts (update existing plans too).
+
+    python plan_import.py import plans.csv [--upsert] [--chunk-size 5000]
+    python plan_import.py export plans.parquet
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from tabular_io import DEFAULT_CHUNK_SIZE, ChunkWriter, format_of, read_chunks
+
+
+PLAN_COLUMNS = ["name", "price", "valid_data", "speed", "validity_days",
+                "description", "duration_type", "plan_type"]
+REQUIRED_COLUMNS = ["name", "price", "valid_data", "speed", "validity_days"]
+# same defaults as migration 0002 for plans without a type/duration
+DEFAULTS = {"description": "", "duration_type": "Monthly", "plan_type": "Normal"}
+DURATION_TYPES = ["Monthly", "Quarterly", "Yearly"]
+PLAN_TYPES = ["Normal", "Offer"]
+MAX_REPORTED_ERRORS = 1000
+
+
+# ====================================================
+# ✅ Vectorised Validation
+# ====================================================
+def _numeric(series):
+    """Numbers stay numbers; whole-number columns become int64"""
+    values = pd.to_numeric(series, errors="coerce")
+    if values.notna().all() and (values % 1 == 0).all():
+        return values.astype("int64")
+    return values
+
+
+def validate_chunk(df):
+    """(clean plans DataFrame, rejected DataFrame with an "error" column)"""
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"missing column(s): {', '.join(missing)}")
+
+    df = df.copy()
+    for column, default in DEFAULTS.items():
+        if column not in df.columns:
+            df[column] = default
+        df[column] = df[column].fillna(default).astype(str).str.strip()
+        df.loc[df[column] == "", column] = default
+    for column in ("name", "speed"):
+        df[column] = df[column].astype("string").str.strip()
+    for column in ("price", "valid_data", "validity_days"):
+        df[column] = _numeric(df[column])
+
+    checks = [
+        (df["name"].isna() | (df["name"] == ""), "name is empty"),
+        (df["price"].isna() | (df["price"] < 0), "price must be a number ≥ 0"),
+        (df["valid_data"].isna() | (df["valid_data"] < 0), "valid_data must be a number ≥ 0"),
+        (df["validity_days"].isna() | (df["validity_days"] < 1)
+         | (df["validity_days"] % 1 != 0), "validity_days must be a whole number ≥ 1"),
+        (df["speed"].isna() | (df["speed"] == ""), "speed is empty"),
+        (~df["duration_type"].isin(DURATION_TYPES),
+         f"duration_type must be one of {', '.join(DURATION_TYPES)}"),
+        (~df["plan_type"].isin(PLAN_TYPES), f"plan_type must be one of {', '.join(PLAN_TYPES)}"),
+    ]
+    errors = pd.Series("", index=df.index)
+    for mask, message in checks:
+        mask = mask.fillna(True).astype(bool)
+        errors[mask] = errors[mask] + message + "; "
+
+    bad = errors != ""
+    rejected = df.loc[bad, ["name"]].assign(error=errors[bad].str.rstrip("; "))
+    clean = df.loc[~bad, PLAN_COLUMNS]
+    clean = clean.astype({"validity_days": "int64", "name": str, "speed": str})
+    for column in ("price", "valid_data"):
+        clean[column] = _numeric(clean[column])  # int64 again once bad rows are gone
+    return clean, rejected
+
+
+# ====================================================
+# 📥 Import
+# ====================================================
+def empty_summary():
+    return {"read": 0, "inserted": 0, "updated": 0, "skipped": 0,
+            "invalid": 0, "errors": []}
+
+
+def import_plans(plans_repo, source, fmt, upsert=False,
+                 chunksize=DEFAULT_CHUNK_SIZE, progress=None):
+    """Stream a plans file into the repo; returns a summary dict.
+
+    New names are inserted. Existing names are skipped, or updated when
+    upsert=True. progress(summary) is called after every chunk.
+    """
+    summary = empty_summary()
+    seen = set()
+    for chunk in read_chunks(source, fmt, chunksize):
+        offset = summary["read"]
+        summary["read"] += len(chunk)
+        chunk = chunk.reset_index(drop=True)
+        chunk.index += offset + 1  # 1-based data row numbers in error reports
+
+        clean, rejected = validate_chunk(chunk)
+        # a set lookup per name: isin(seen) would rebuild `seen` every chunk
+        repeated = clean["name"].duplicated() | clean["name"].map(seen.__contains__)
+        if repeated.any():
+            rejected = pd.concat([rejected, clean.loc[repeated, ["name"]].assign(
+                error="name repeated earlier in the file")])
+            clean = clean.loc[~repeated]
+        seen.update(clean["name"])
+
+        summary["invalid"] += len(rejected)
+        room = MAX_REPORTED_ERRORS - len(summary["errors"])
+        if room > 0:
+            summary["errors"].extend(
+                {"row": row, "name": name, "error": error}
+                for row, name, error in rejected.head(room).itertuples())
+
+        docs = clean.to_dict("records")
+        if docs:
+            now = datetime.now()
+            for doc in docs:
+                doc["createdAt"] = now
+            if upsert:
+                inserted, updated = plans_repo.upsert_many(docs)
+                summary["inserted"] += inserted
+                summary["updated"] += updated
+            else:
+                taken = plans_repo.existing_names([d["name"] for d in docs])
+                new_docs = [d for d in docs if d["name"] not in taken]
+                inserted = plans_repo.insert_many(new_docs)
+                summary["inserted"] += inserted
+                summary["skipped"] += len(docs) - inserted
+        if progress:
+            progress(summary)
+    return summary
+
+
+# ====================================================
+# 📤 Export
+# ====================================================
+def export_plans(plans, target, fmt, chunksize=DEFAULT_CHUNK_SIZE):
+    """Write plans (any iterable of plan dicts) chunk by chunk; returns rows"""
+    with ChunkWriter(target, fmt) as writer:
+        batch = []
+        for plan in plans:
+            batch.append({c: plan.get(c, DEFAULTS.get(c)) for c in PLAN_COLUMNS})
+            if len(batch) == chunksize:
+                writer.write(pd.DataFrame(batch, columns=PLAN_COLUMNS))
+                batch = []
+        if batch or not writer.rows:
+            writer.write(pd.DataFrame(batch, columns=PLAN_COLUMNS))
+        return writer.rows
+
+
+# ====================================================
+# 🖥️ CLI
+# ====================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import or export plans")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="load plans from a .csv / .parquet file")
+    imp.add_argument("path")
+    imp.add_argument("--upsert", action="store_true",
+                     help="update plans whose name already exists (default: skip)")
+    imp.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    exp = sub.add_parser("export", help="write all plans to a .csv / .parquet file")
+    exp.add_argument("path")
+    args = parser.parse_args(argv)
+
+    from db import get_db
+    from repositories import mongo_repositories
+
+    plans_repo = mongo_repositories(get_db()).plans
+    start = time.perf_counter()
+
+    if args.command == "export":
+        rows = export_plans(plans_repo.all(), args.path, format_of(args.path))
+        print(f"✅ exported {rows:,} plans to {args.path} "
+              f"in {time.perf_counter() - start:.1f} s")
+        return 0
+
+    def report(summary):
+        rate = summary["read"] / max(time.perf_counter() - start, 1e-9)
+        print(f"  {summary['read']:,} rows read · {summary['inserted']:,} inserted · "
+              f"{summary['updated']:,} updated · {summary['skipped']:,} skipped · "
+              f"{summary['invalid']:,} invalid · {rate:,.0f} rows/s")
+
+    summary = import_plans(plans_repo, args.path, format_of(args.path),
+                           upsert=args.upsert, chunksize=args.chunk_size,
+                           progress=report)
+    for error in summary["errors"][:20]:
+        print(f"❌ row {error['row']} ({error['name']}): {error['error']}")
+    if summary["invalid"] > 20:
+        print(f"… {summary['invalid'] - 20:,} more invalid row(s)")
+    return 1 if summary["invalid"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
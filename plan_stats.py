@@ -0,0 +1,161 @@
+# ====================================================
+# 📈 Per-Plan Statistics (incrementally maintained)
+# ====================================================
+"""Subscriber counters per plan, kept in the `plan_stats` collection.
+
+One document per plan name: {"_id": plan_name, "active": n, "total": n}.
+SubscriptionsRepo updates it with atomic $inc in the same calls that insert
+a subscription or flip its status, so the admin header and Analytics tab
+read O(plans) small documents instead of aggregating every subscription.
+Revenue is derived at read time from the catalog price, so editing a
+plan's price never leaves stale totals behind.
+
+Counters can drift if CustomerPlans is edited outside the app; rebuild
+them from scratch with:
+
+    python plan_stats.py --rebuild      # recompute, then --check
+    python plan_stats.py --check        # report differences, exit 1 if any
+
+A rebuild is a maintenance task: it aggregates into a scratch collection
+and swaps it in only if no counter moved while it ran (a $inc landing
+mid-aggregation would otherwise be lost), retrying a few times. The swap
+itself is not atomic with respect to writes, so --rebuild re-checks drift
+afterwards; run it when the portal is quiet.
+"""
+import sys
+
+from pymongo import UpdateOne
+
+from kpis import empty_kpis, kpi_pipeline
+
+
+STATS_COLLECTION = "plan_stats"
+
+
+def status_delta(old_status, new_status):
+    """Change to the "active" counter when a subscription changes status"""
+    return int(new_status == "active") - int(old_status == "active")
+
+
+# ====================================================
+# 🍃 MongoDB Counters
+# ====================================================
+def record_subscribe(stats_collection, plan_name, status="active"):
+    stats_collection.update_one(
+        {"_id": plan_name},
+        {"$inc": {"total": 1, "active": int(status == "active")}},
+        upsert=True
+    )
+
+
+def record_status_change(stats_collection, plan_name, old_status, new_status):
+    delta = status_delta(old_status, new_status)
+    if delta:
+        stats_collection.update_one(
+            {"_id": plan_name}, {"$inc": {"active": delta}}, upsert=True)
+
+
+def removed_deltas(removed):
+    """{plan_name: {"total": -n, "active": -n}} for [(plan_name, status)]"""
+    deltas = {}
+    for plan_name, status in removed:
+        entry = deltas.setdefault(plan_name, {"total": 0, "active": 0})
+        entry["total"] -= 1
+        entry["active"] -= int(status == "active")
+    return deltas
+
+
+def record_removed(stats_collection, removed):
+    """Decrement counters for deleted subscriptions, in one bulk_write"""
+    deltas = removed_deltas(removed)
+    if deltas:
+        stats_collection.bulk_write(
+            [UpdateOne({"_id": plan_name}, {"$inc": inc})
+             for plan_name, inc in deltas.items()],
+            ordered=False)
+
+
+def load_plan_stats(stats_collection):
+    """{plan_name: {"active", "inactive", "total"}}"""
+    return {
+        row["_id"]: {
+            "active": row.get("active", 0),
+            "inactive": row.get("total", 0) - row.get("active", 0),
+            "total": row.get("total", 0),
+        }
+        for row in stats_collection.find()
+    }
+
+
+def rebuild_plan_stats(customers_collection, stats_name=STATS_COLLECTION, attempts=3):
+    """Recompute every counter from CustomerPlans.
+
+    Returns False (and leaves the counters alone) if they changed during
+    every attempt's aggregation.
+    """
+    db = customers_collection.database
+    scratch = db[f"{stats_name}_rebuild"]
+    for _ in range(attempts):
+        before = load_plan_stats(db[stats_name])
+        customers_collection.aggregate([
+            {"$group": {
+                "_id": "$plan_name",
+                "active": {"$sum": {"$cond": [{"$eq": ["$status", "active"]}, 1, 0]}},
+                "total": {"$sum": 1},
+            }},
+            {"$out": scratch.name},
+        ])
+        if load_plan_stats(db[stats_name]) == before:
+            scratch.rename(stats_name, dropTarget=True)
+            return True
+    scratch.drop()
+    return False
+
+
+# ====================================================
+# 📊 KPIs from Counters
+# ====================================================
+def kpis_from_stats(by_plan, price_of):
+    """Same shape as kpis.load_admin_kpis(), from the per-plan counters"""
+    kpis = empty_kpis()
+    kpis["by_plan"] = by_plan
+    for plan_name, counts in by_plan.items():
+        kpis["subscriptions"] += counts["total"]
+        price = price_of(plan_name, 0)
+        kpis["total_revenue"] += price * counts["total"]
+        kpis["active_revenue"] += price * counts["active"]
+    return kpis
+
+
+def stats_drift(db):
+    """Plans whose stored counters differ from a fresh aggregation"""
+    stored = load_plan_stats(db[STATS_COLLECTION])
+    fresh = {}
+    result = list(db["CustomerPlans"].aggregate(kpi_pipeline()))
+    for row in (result[0]["plans"] if result else []):
+        fresh[row.get("plan_name")] = {
+            "active": row["active"], "inactive": row["inactive"], "total": row["total"]}
+
+    zero = {"active": 0, "inactive": 0, "total": 0}
+    return {
+        name: (stored.get(name, zero), fresh.get(name, zero))
+        for name in set(stored) | set(fresh)
+        if stored.get(name, zero) != fresh.get(name, zero)
+    }
+
+
+if __name__ == "__main__":
+    from db import get_db
+
+    target = get_db()
+    if "--rebuild" in sys.argv:
+        if not rebuild_plan_stats(target["CustomerPlans"]):
+            print("❌ counters kept changing during the rebuild — retry when the portal is quiet")
+            sys.exit(1)
+        print(f"✅ rebuilt {target[STATS_COLLECTION].count_documents({})} plan counters")
+    drift = stats_drift(target)
+    for name, (stored, fresh) in sorted(drift.items(), key=lambda kv: str(kv[0])):
+        print(f"❌ {name}: stored={stored} actual={fresh}")
+    if drift:
+        sys.exit(1)
+    print("✅ plan_stats matches CustomerPlans")
@@ -0,0 +1,327 @@
+# ====================================================
+# 🔎 Query Monitor (pymongo command listener)
+# ====================================================
+"""What each dashboard rerun asks of MongoDB.
+
+`MONITOR` is registered on the shared MongoClient (db.get_client). For every
+command it records the collection, operation, duration, documents returned
+and the dashboard section that was rendering, grouped per rerun:
+
+    start_rerun(session)      top of app.main(): opens a rerun record
+    set_section("Admin · 👥 Users")   tags the commands that follow
+    finish_rerun()            end of app.main(): stamps the wall time
+
+Widget callbacks run before main(), and a fragment can rerun without it:
+start_callback(session) opens the record early so the main() or fragment
+run that follows continues it, and fragment_rerun(session, section) wraps a
+fragment body that reruns on its own.
+
+The rerun and section live in context variables, so commands issued from
+dashboard_data.fetch() worker threads are attributed to the rerun that
+fanned them out. Commands outside a rerun (index bootstrap, CLI jobs) are
+not recorded. The last MAX_RERUNS reruns of the process are kept in memory
+for the admin Performance section.
+
+With `MONITOR.call_sites = True` each command also records the project
+line that issued it ("app.py:1234"); bench.budgets turns that on.
+
+Only the shape of a query is kept: filter and update values are replaced
+by "?" (so no email or password hash ends up on the Performance page),
+next to a digest of the values. A query "repeats" when the same operation
+with the same shape and values runs more than once in a rerun — the
+signature of a per-row lookup loop (N+1).
+"""
+import collections
+import contextlib
+import contextvars
+import hashlib
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+from pymongo import monitoring
+
+
+MAX_RERUNS = 200
+MAX_COMMANDS_PER_RERUN = 2000
+# handshake/auth/session plumbing, not queries
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart",
+                    "saslContinue", "buildInfo", "getLastError", "killCursors"}
+# cursor continuations and inserts never count as repeats of each other
+NOT_REPEATS = {"getMore", "insert"}
+# the part of each command that identifies "the same query"
+QUERY_FIELDS = ("filter", "query", "pipeline", "updates", "deletes", "key", "sort",
+                "projection")
+# ...and the parts of it that carry values (the rest are field names/directions)
+VALUE_FIELDS = {"filter", "query", "pipeline", "updates", "deletes"}
+FIELD_PATH = re.compile(r"^\$\$?[A-Za-z_][\w.]*$")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# frames skipped when looking for the code that asked for a query
+PLUMBING = tuple(os.path.join(ROOT, name) for name in (
+    "query_monitor.py", "dashboard_data.py", "catalog.py", "repositories", "bench"))
+
+_rerun = contextvars.ContextVar("query_monitor_rerun", default=None)
+_section = contextvars.ContextVar("query_monitor_section", default=None)
+# where a dashboard_data.fetch() worker's query was declared
+_fetch_site = contextvars.ContextVar("query_monitor_fetch_site", default="")
+_ids = itertools.count(1)
+
+
+def _collection(event):
+    target = event.command.get(event.command_name)
+    if event.command_name == "getMore":
+        target = event.command.get("collection")
+    return target if isinstance(target, str) else ""
+
+
+def _shape(value):
+    """value with every literal replaced by "?" ($field paths are kept);
+    a list keeps one entry per distinct shape"""
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = _shape(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    if isinstance(value, str) and FIELD_PATH.match(value):
+        return value
+    return "?"
+
+
+def values_digest(values):
+    """Short hash telling two queries of the same shape apart"""
+    encoded = json.dumps(values, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+def _signature(event):
+    """(operation + collection + query shape as a string, digest of the values)"""
+    parts = {field: event.command[field] for field in QUERY_FIELDS if field in event.command}
+    shape = {field: _shape(part) if field in VALUE_FIELDS else part
+             for field, part in parts.items()}
+    return (f"{event.command_name} {_collection(event)} "
+            f"{json.dumps(shape, sort_keys=True, default=str)}", values_digest(parts))
+
+
+def call_site(depth=2):
+    """"app.py:123" — the innermost project frame outside the data layer
+    (in a fetch() worker without one: the line that called fetch)"""
+    frame = sys._getframe(depth)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(ROOT) and not filename.startswith(PLUMBING):
+            return f"{os.path.relpath(filename, ROOT)}:{frame.f_lineno}"
+        frame = frame.f_back
+    return _fetch_site.get()
+
+
+def set_fetch_site(site):
+    _fetch_site.set(site)
+
+
+def _docs_returned(reply):
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if "values" in reply:
+        return len(reply["values"])
+    n = reply.get("n")
+    return n if isinstance(n, int) else 0
+
+
+class QueryMonitor(monitoring.CommandListener):
+    """Per-rerun command log for one server process (thread-safe)"""
+
+    def __init__(self, max_reruns=MAX_RERUNS, call_sites=False):
+        self.reruns = collections.deque(maxlen=max_reruns)
+        self.pending = {}
+        self.lock = threading.Lock()
+        # walking the stack per command is for test harnesses, not production
+        self.call_sites = call_sites
+
+    # ---------- Rerun Context ----------
+    def start_rerun(self, session):
+        rerun = _rerun.get()
+        if rerun is not None and rerun.pop("callback", False):
+            # opened by this run's widget callback: continue it
+            return rerun
+        rerun = {
+            "id": next(_ids), "session": session, "started_at": datetime.now(),
+            "started": time.perf_counter(), "wall_ms": None, "section": None,
+            "commands": [], "dropped": 0,
+        }
+        with self.lock:
+            self.reruns.append(rerun)
+        _rerun.set(rerun)
+        _section.set(None)
+        return rerun
+
+    def start_callback(self, session):
+        """From a widget callback, ahead of the run it triggers"""
+        if _rerun.get() is None:
+            self.start_rerun(session)["callback"] = True
+
+    def finish_rerun(self):
+        rerun = _rerun.get()
+        if rerun is not None:
+            rerun["wall_ms"] = (time.perf_counter() - rerun["started"]) * 1000
+        _rerun.set(None)
+
+    def recent(self, session=None):
+        """Recorded reruns, newest first (optionally one session's only)"""
+        with self.lock:
+            reruns = list(self.reruns)
+        return [r for r in reversed(reruns) if session is None or r["session"] == session]
+
+    def clear(self):
+        with self.lock:
+            self.reruns.clear()
+
+    # ---------- CommandListener ----------
+    def started(self, event):
+        rerun = _rerun.get()
+        if rerun is None or event.command_name in IGNORED_COMMANDS:
+            return
+        site = call_site() if self.call_sites else ""
+        signature, values = _signature(event)
+        with self.lock:
+            self.pending[(event.connection_id, event.request_id)] = (
+                rerun, _section.get(), _collection(event), signature, values, site)
+
+    def succeeded(self, event):
+        self._finish(event, _docs_returned(event.reply or {}), ok=True)
+
+    def failed(self, event):
+        self._finish(event, 0, ok=False)
+
+    def _finish(self, event, docs, ok):
+        with self.lock:
+            started = self.pending.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        rerun, section, collection, signature, values, site = started
+        _append(rerun, {
+            "section": section, "collection": collection,
+            "operation": event.command_name, "ms": event.duration_micros / 1000,
+            "docs": docs, "ok": ok, "signature": signature, "values": values,
+            "call_site": site,
+        })
+
+    # ---------- Other Backends ----------
+    def record_call(self, operation, collection, ms, docs, signature, values, site=""):
+        """Record a non-Mongo round trip (e.g. an in-memory repository call)
+        in the current rerun, like a command; values are only kept as a digest"""
+        rerun = _rerun.get()
+        if rerun is not None:
+            _append(rerun, {
+                "section": _section.get(), "collection": collection,
+                "operation": operation, "ms": ms, "docs": docs, "ok": True,
+                "signature": signature, "values": values_digest(values), "call_site": site,
+            })
+
+
+def _append(rerun, command):
+    if len(rerun["commands"]) >= MAX_COMMANDS_PER_RERUN:
+        rerun["dropped"] += 1
+    else:
+        rerun["commands"].append(command)
+
+
+MONITOR = QueryMonitor()
+
+
+def start_rerun(session):
+    return MONITOR.start_rerun(session)
+
+
+def finish_rerun():
+    MONITOR.finish_rerun()
+
+
+def start_callback(session):
+    MONITOR.start_callback(session)
+
+
+def recording():
+    """True inside a started rerun (not one only opened by a callback)"""
+    rerun = _rerun.get()
+    return rerun is not None and not rerun.get("callback")
+
+
+@contextlib.contextmanager
+def fragment_rerun(session, section):
+    """Record a fragment body as its own rerun when it runs without
+    app.main() around it; inside a full rerun it changes nothing"""
+    if recording():
+        yield
+        return
+    start_rerun(session)
+    set_section(section)
+    try:
+        yield
+    finally:
+        finish_rerun()
+
+
+def current_section():
+    return _section.get()
+
+
+def set_section(name):
+    """Tag the commands that follow in this rerun with a dashboard section"""
+    _section.set(name)
+    rerun = _rerun.get()
+    if rerun is not None:
+        rerun["section"] = name
+
+
+# ====================================================
+# 📋 Summaries (for the Performance section)
+# ====================================================
+def rerun_summary(rerun):
+    commands = rerun["commands"]
+    repeats = repeated_queries(rerun)
+    return {
+        "Rerun": rerun["id"],
+        "Started": rerun["started_at"],
+        "Section": rerun["section"] or "",
+        "Queries": len(commands) + rerun["dropped"],
+        "DB Time (ms)": round(sum(c["ms"] for c in commands), 1),
+        "Slowest (ms)": round(max((c["ms"] for c in commands), default=0), 1),
+        "Repeated": sum(count - 1 for _, count, _ in repeats),
+        "Wall (ms)": round(rerun["wall_ms"], 1) if rerun["wall_ms"] is not None else None,
+    }
+
+
+def slowest_commands(rerun, limit=10):
+    return sorted(rerun["commands"], key=lambda c: c["ms"], reverse=True)[:limit]
+
+
+def query_key(command):
+    """What makes two commands "the same query": shape and values"""
+    return command["signature"], command["values"]
+
+
+def repeat_counts(rerun):
+    """Counter of query_key() over the rerun's commands that can repeat"""
+    return collections.Counter(query_key(c) for c in rerun["commands"]
+                               if c["operation"] not in NOT_REPEATS)
+
+
+def repeated_queries(rerun, min_count=2):
+    """[(signature, count, total ms)] for identical queries run min_count+
+    times in the rerun, most repeated first"""
+    total_ms = collections.defaultdict(float)
+    for command in rerun["commands"]:
+        total_ms[query_key(command)] += command["ms"]
+    return [(key[0], count, total_ms[key])
+            for key, count in repeat_counts(rerun).most_common() if count >= min_count]
@@ -0,0 +1,166 @@
+# ====================================================
+# 🤖 Plan Recommender (nearest-neighbour upgrades)
+# ====================================================
+"""Top-k upgrade suggestions from a NearestNeighbors index over the catalog.
+
+Every plan becomes a numeric vector — price, data, validity, speed (Mbps),
+duration and type — scaled so no single unit dominates. The index is fitted
+once per catalog load (`catalog.derived("recommender", PlanRecommender)`),
+and in the same pass each plan's nearest *upgrades* are precomputed: plans
+with more data or longer validity, the same rule the dashboard used before.
+A request then only merges the precomputed lists of the user's active
+plans — dict and list work, no model call. Users those lists can't serve
+(several plans that together raise the bar) get an exact vectorised scan.
+
+`python -m bench.recommend_eval` compares it with the old rule offline.
+"""
+import re
+
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+
+
+DEFAULT_K = 3
+NEIGHBOUR_POOL = 20       # upgrades kept per plan
+MAX_NEIGHBOURS = 512      # widest precomputed search for a plan short of upgrades
+UPGRADE_STEP = 0.5        # query offset, in std units of log data / validity
+DATA, VALIDITY = 1, 2     # feature columns
+DURATION_TYPES = ["Monthly", "Quarterly", "Yearly"]
+_SPEED = re.compile(r"([\d.]+)\s*([gmk]?)", re.IGNORECASE)
+_SPEED_UNITS = {"g": 1000.0, "m": 1.0, "k": 0.001, "": 1.0}
+
+
+def speed_mbps(speed):
+    """"100 Mbps" → 100.0, "1 Gbps" → 1000.0, anything else → nan"""
+    if isinstance(speed, (int, float)):
+        return float(speed)
+    match = _SPEED.search(str(speed or ""))
+    if not match:
+        return np.nan
+    return float(match.group(1)) * _SPEED_UNITS[match.group(2).lower()]
+
+
+def _number(value):
+    return float(value) if isinstance(value, (int, float)) else np.nan
+
+
+def is_upgrade(plan, max_data, max_validity):
+    """More data or longer validity — same test as catalog.upgrades_over()"""
+    def greater(value, limit):
+        return isinstance(value, (int, float)) and value > limit
+
+    return greater(plan.get("valid_data"), max_data) or \
+        greater(plan.get("validity_days"), max_validity)
+
+
+def upgrade_bar(current_plans):
+    """(max_data, max_validity) over current_plans; a missing or non-numeric
+    value counts as 0, as the upgrade test ignores it"""
+    def highest(field):
+        return max((p.get(field) for p in current_plans
+                    if isinstance(p.get(field), (int, float))), default=0)
+
+    return highest("valid_data"), highest("validity_days")
+
+
+def plan_features(plans):
+    """(n_plans, n_features) matrix: log-scaled numbers z-scored, plus one-hots"""
+    numbers = np.array([
+        [_number(p.get("price")), _number(p.get("valid_data")),
+         _number(p.get("validity_days")), speed_mbps(p.get("speed"))]
+        for p in plans
+    ], dtype=float).reshape(len(plans), 4)
+    numbers = np.log1p(np.clip(numbers, 0, None))
+    # a missing number sits at the column median, i.e. neutral
+    medians = np.nan_to_num(np.nanmedian(numbers, axis=0)) if len(plans) else 0
+    numbers = np.where(np.isnan(numbers), medians, numbers)
+    spread = numbers.std(axis=0)
+    numbers = (numbers - numbers.mean(axis=0)) / np.where(spread > 0, spread, 1)
+
+    categories = np.array([
+        [p.get("duration_type", "Monthly") == d for d in DURATION_TYPES]
+        + [p.get("plan_type", "Normal") == "Offer"]
+        for p in plans
+    ], dtype=float).reshape(len(plans), len(DURATION_TYPES) + 1)
+    return np.hstack([numbers, categories])
+
+
+class PlanRecommender:
+    """Nearest-neighbour upgrades for one catalog snapshot (read-only)"""
+
+    def __init__(self, plans, pool=NEIGHBOUR_POOL):
+        self.plans = list(plans)
+        self.position = {}
+        for i, plan in enumerate(self.plans):
+            # first plan wins, as in the catalog
+            self.position.setdefault(plan.get("name"), i)
+        self.upgrades = [[] for _ in self.plans]   # [(distance, position)], nearest first
+        if len(self.plans) > 1:
+            self._precompute(pool)
+
+    def _precompute(self, pool):
+        features = self.features = plan_features(self.plans)
+        index = NearestNeighbors().fit(features)
+        # ask from a point nudged up in data and validity, so the nearest
+        # neighbours are mostly the smallest sensible step up
+        queries = self.queries = features.copy()
+        queries[:, [DATA, VALIDITY]] += UPGRADE_STEP
+
+        data = self.data = np.array([_number(p.get("valid_data")) for p in self.plans])
+        validity = self.validity = np.array(
+            [_number(p.get("validity_days")) for p in self.plans])
+        limit = min(len(self.plans), MAX_NEIGHBOURS)
+        n_neighbors = min(limit, pool * 4)
+        pending = np.arange(len(self.plans))
+        while True:
+            distances, neighbours = index.kneighbors(queries[pending], n_neighbors)
+            # nan compares False, like the rule's isinstance check
+            upgrade = (data[neighbours] > data[pending, None]) | \
+                (validity[neighbours] > validity[pending, None])
+            for row, i in enumerate(pending.tolist()):
+                keep = upgrade[row]
+                self.upgrades[i] = list(zip(distances[row][keep][:pool].tolist(),
+                                            neighbours[row][keep][:pool].tolist()))
+            if n_neighbors >= limit:
+                break
+            # top-end plans have few upgrades nearby: widen the search for them only
+            pending = np.array([i for i in pending.tolist() if len(self.upgrades[i]) < pool],
+                               dtype=int)
+            if not pending.size:
+                break
+            n_neighbors = min(limit, n_neighbors * 4)
+
+    def recommend(self, current_plans, k=DEFAULT_K):
+        """Up to k upgrades over all of current_plans, nearest first"""
+        current_names = {p.get("name") for p in current_plans}
+        max_data, max_validity = upgrade_bar(current_plans)
+
+        positions = [self.position[n] for n in current_names if n in self.position]
+
+        best = {}
+        for i in positions:
+            for distance, j in self.upgrades[i]:
+                plan = self.plans[j]
+                if plan.get("name") in current_names or j in best and best[j] <= distance:
+                    continue
+                if is_upgrade(plan, max_data, max_validity):
+                    best[j] = distance
+        if len(best) < k and positions:
+            # several plans raise the bar, or a crowded catalog hid the
+            # upgrades from the precomputed lists: rank all upgrades exactly
+            return self._search(positions, current_names, max_data, max_validity, k)
+        return [self.plans[j] for j in sorted(best, key=best.get)[:k]]
+
+    def _search(self, positions, current_names, max_data, max_validity, k):
+        """Vectorised scan of every upgrade — only for users the lists can't serve"""
+        if len(self.plans) < 2:
+            return []
+        candidates = np.flatnonzero((self.data > max_data) | (self.validity > max_validity))
+        candidates = [j for j in candidates.tolist()
+                      if self.plans[j].get("name") not in current_names]
+        if not candidates:
+            return []
+        distances = np.linalg.norm(
+            self.features[candidates][:, None] - self.queries[positions][None], axis=2)
+        nearest = np.argsort(distances.min(axis=1), kind="stable")[:k]
+        return [self.plans[candidates[j]] for j in nearest.tolist()]
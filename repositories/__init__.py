@@ -0,0 +1,12 @@
+# ====================================================
+# 🗃️ Repository Layer
+# ====================================================
+"""Users, plans and subscriptions behind one interface, two backends.
+
+    mongo_repositories(db)   → the live BroadbandDB collections
+    memory_repositories()    → dict-backed store for offline benchmarks
+"""
+from repositories.base import (
+    DuplicateError, PlansRepo, Repositories, SubscriptionsRepo, UsersRepo)
+from repositories.memory import MemoryRepositories, memory_repositories
+from repositories.mongo import MongoRepositories, mongo_repositories
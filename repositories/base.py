@@ -0,0 +1,338 @@
+# ====================================================
+# 🧩 Repository Interfaces
+# ====================================================
+"""What the dashboards need from storage, independent of the backend.
+
+Each backend subclasses these three repos; the dashboards only ever talk to
+a `Repositories` bundle, so the same render code runs against MongoDB or the
+in-memory store.
+"""
+from datetime import datetime
+
+from catalog import PlanCatalog
+from plan_stats import kpis_from_stats
+from user_search import chunked, with_search_keys
+
+
+class DuplicateError(Exception):
+    """A unique field (user email, plan name) is already taken"""
+
+
+class UsersRepo:
+
+    def by_email(self, email):
+        raise NotImplementedError
+
+    def by_emails(self, emails):
+        """{email: {"name", "email"}} for the given emails, in one query"""
+        raise NotImplementedError
+
+    def authenticate(self, email, password):
+        raise NotImplementedError
+
+    def count(self, role=None, approved=None):
+        raise NotImplementedError
+
+    def all(self):
+        raise NotImplementedError
+
+    def search_page(self, search="", role=None, approved=None, exclude_emails=(),
+                    after_id=None, page_size=25):
+        """(users, next_cursor) — prefix search on name/email, keyset on _id"""
+        raise NotImplementedError
+
+    def create(self, name, email, password, role="customer", approved=False):
+        """Insert a user; raises DuplicateError if the email is taken"""
+        if self.by_email(email):
+            raise DuplicateError(email)
+        doc = with_search_keys({
+            "name": name,
+            "email": email,
+            "password": password,   # ⚠ Should hash in real apps
+            "role": role,
+            "approved": approved,
+            "created_at": datetime.now()
+        })
+        self._insert(doc)
+        return doc
+
+    def _insert(self, doc):
+        raise NotImplementedError
+
+    def approve(self, user_id):
+        self.update(user_id, {"approved": True})
+
+    def update(self, user_id, fields):
+        """$set fields on one user; raises DuplicateError on an email clash"""
+        self._update(user_id, with_search_keys(fields))
+
+    def update_profile(self, email, fields):
+        self._update_profile(email, with_search_keys(fields))
+
+    def _update(self, user_id, fields):
+        raise NotImplementedError
+
+    def _update_profile(self, email, fields):
+        raise NotImplementedError
+
+    def delete(self, user_id):
+        raise NotImplementedError
+
+    def bulk_update(self, user_ids, fields, progress=None):
+        """$set fields on many users, one round trip per chunk; returns matches"""
+        user_ids = list(user_ids)
+        fields = with_search_keys(fields)
+        done = matched = 0
+        for chunk in chunked(user_ids):
+            matched += self._update_many(chunk, fields)
+            done += len(chunk)
+            if progress:
+                progress(done, len(user_ids))
+        return matched
+
+    def update_matching(self, fields, search="", role=None, approved=None,
+                        exclude_emails=()):
+        """$set fields on every user matching the Users tab filters"""
+        raise NotImplementedError
+
+    def _update_many(self, user_ids, fields):
+        raise NotImplementedError
+
+    def _delete_many(self, user_ids):
+        """Delete users by _id; returns the deleted users' emails"""
+        raise NotImplementedError
+
+    def set_segments(self, emails_by_segment, run_at, progress=None):
+        """Label customers {segment: [emails]}, one round trip per chunk, then
+        clear labels this run did not write; returns users labelled"""
+        total = sum(len(emails) for emails in emails_by_segment.values())
+        done = labelled = 0
+        for segment, emails in emails_by_segment.items():
+            for chunk in chunked(emails):
+                labelled += self._label_many(
+                    chunk, {"segment": segment, "segmented_at": run_at})
+                done += len(chunk)
+                if progress:
+                    progress(done, total)
+        self._clear_segments(run_at)
+        return labelled
+
+    def _label_many(self, emails, fields):
+        raise NotImplementedError
+
+    def _clear_segments(self, run_at):
+        """Unset the segment of users not labelled at run_at"""
+        raise NotImplementedError
+
+    def set_churn_scores(self, scores, run_at, progress=None):
+        """Store [(email, churn_score)], one bulk write per chunk, then clear
+        scores this run did not write; returns users scored"""
+        done = written = 0
+        for chunk in chunked(scores):
+            written += self._score_many(chunk, run_at)
+            done += len(chunk)
+            if progress:
+                progress(done, len(scores))
+        self._clear_churn_scores(run_at)
+        return written
+
+    def _score_many(self, scores, run_at):
+        raise NotImplementedError
+
+    def _clear_churn_scores(self, run_at):
+        raise NotImplementedError
+
+    def top_churn_risk(self, limit=25):
+        """Highest churn_score first (name, email, churn_score, churn_scored_at)"""
+        raise NotImplementedError
+
+    def save_segment_profiles(self, rows):
+        """Replace the stored segment profiles (one dict per segment)"""
+        raise NotImplementedError
+
+    def segment_profiles(self):
+        raise NotImplementedError
+
+
+class PlansRepo:
+    """Plan reads are served by the catalog; writes bump its version"""
+
+    def __init__(self):
+        self.catalog = PlanCatalog(self._load_all)
+
+    def _load_all(self):
+        raise NotImplementedError
+
+    def all(self):
+        return self.catalog.all()
+
+    def by_name(self, name):
+        return self.catalog.by_name(name)
+
+    def create(self, doc):
+        """Insert a plan; raises DuplicateError if the name is taken"""
+        if self.catalog.by_name(doc["name"]):
+            raise DuplicateError(doc["name"])
+        self._insert(doc)
+        self.catalog.bump()
+
+    def update(self, plan_id, fields):
+        """$set fields on one plan; raises DuplicateError on a name clash"""
+        self._update(plan_id, fields)
+        self.catalog.bump()
+
+    def delete(self, plan_id):
+        self._delete(plan_id)
+        self.catalog.bump()
+
+    def existing_names(self, names):
+        """The subset of names already taken, in one query"""
+        raise NotImplementedError
+
+    def insert_many(self, docs):
+        """Insert new plans, skipping name clashes; returns the inserted count"""
+        inserted = self._insert_many(docs)
+        self.catalog.bump()
+        return inserted
+
+    def upsert_many(self, docs):
+        """Insert or update plans by name; returns (inserted, updated)"""
+        counts = self._upsert_many(docs)
+        self.catalog.bump()
+        return counts
+
+    def _insert(self, doc):
+        raise NotImplementedError
+
+    def _insert_many(self, docs):
+        raise NotImplementedError
+
+    def _upsert_many(self, docs):
+        raise NotImplementedError
+
+    def _update(self, plan_id, fields):
+        raise NotImplementedError
+
+    def _delete(self, plan_id):
+        raise NotImplementedError
+
+
+class SubscriptionsRepo:
+
+    def admin_kpis(self):
+        """Totals + per-plan counts (same shape as kpis.load_admin_kpis())"""
+        return kpis_from_stats(self.plan_stats(), self.plans.catalog.price_of)
+
+    def plan_stats(self):
+        """{plan_name: {"active", "inactive", "total"}} from the counters"""
+        raise NotImplementedError
+
+    def rebuild_plan_stats(self):
+        """Recompute the per-plan counters from the subscriptions (maintenance
+        only: see plan_stats); False if counters kept changing meanwhile"""
+        raise NotImplementedError
+
+    def plan_subscriber_counts(self, plan_names, status_filter="All"):
+        raise NotImplementedError
+
+    def subscriber_page(self, plan_name, status_filter="All", after_id=None,
+                        page_size=25):
+        """((subscription, user) rows, next_cursor) — keyset on _id"""
+        raise NotImplementedError
+
+    def first_subscriber_pages(self, plan_names, status_filter="All", page_size=25):
+        """{plan_name: (rows, next_cursor)}: subscriber_page() from the start
+        for many plans at once (one round trip for the subscriptions)"""
+        raise NotImplementedError
+
+    def for_user(self, email, statuses=None):
+        """A user's subscriptions, optionally limited to some statuses"""
+        raise NotImplementedError
+
+    def has_open(self, email, plan_name):
+        """True if the user has an active or stopped sub to this plan"""
+        raise NotImplementedError
+
+    def subscribe(self, email, plan_name):
+        doc = {
+            "user_email": email,
+            "plan_name": plan_name,
+            "usage_gb": 0,
+            "subscribed_on": datetime.now(),
+            "status": "active"
+        }
+        self._insert(doc)
+        return doc
+
+    def _insert(self, doc):
+        raise NotImplementedError
+
+    def set_status(self, sub_id, status):
+        """Change one subscription's status and adjust the plan counters"""
+        raise NotImplementedError
+
+    def remove_for_users(self, emails):
+        """Delete these users' subscriptions, counters and usage history;
+        returns the number of subscriptions"""
+        raise NotImplementedError
+
+    def export_rows(self, batch_size=2000):
+        """Every subscription joined with user name and plan price, streamed"""
+        raise NotImplementedError
+
+    def scan(self, fields, batch_size=50_000):
+        """Every subscription (only `fields`), as lists of batch_size dicts"""
+        raise NotImplementedError
+
+    def add_usage(self, increments, flush_id):
+        """Add usage to open subscriptions, at most once per flush_id.
+
+        increments: [(user_email, plan_name, usage_gb, last_event_at)].
+        Returns how many subscriptions were updated.
+        """
+        raise NotImplementedError
+
+    def usage_batch(self, batch_id):
+        """Ledger entry of a usage ingestion batch, or None"""
+        raise NotImplementedError
+
+    def mark_usage_batch(self, batch_id, **fields):
+        raise NotImplementedError
+
+    def add_usage_history(self, day_buckets, month_totals, flush_id):
+        """Add one flush to the usage_history buckets and rollups, at most once"""
+        raise NotImplementedError
+
+    def usage_history(self, email, level, start, end):
+        """A user's history docs for one chart level ("hour", "day", "month")
+        that overlap [start, end)"""
+        raise NotImplementedError
+
+
+class Repositories:
+    """The three repos of one backend, plus its startup hook"""
+
+    def __init__(self, users, plans, subscriptions, backend):
+        self.users = users
+        self.plans = plans
+        self.subscriptions = subscriptions
+        self.backend = backend
+
+    def bootstrap(self):
+        """Backend-specific startup work (indexes, migrations)"""
+
+    def delete_users(self, user_ids, progress=None):
+        """Delete users and their subscriptions, chunk by chunk.
+
+        Returns (users deleted, subscriptions removed).
+        """
+        user_ids = list(user_ids)
+        done = users_deleted = subs_removed = 0
+        for chunk in chunked(user_ids):
+            emails = self.users._delete_many(chunk)
+            users_deleted += len(emails)
+            subs_removed += self.subscriptions.remove_for_users(emails)
+            done += len(chunk)
+            if progress:
+                progress(done, len(user_ids))
+        return users_deleted, subs_removed
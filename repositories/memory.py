@@ -0,0 +1,479 @@
+# ====================================================
+# 🧠 In-Memory Backend
+# ====================================================
+"""Dict-backed repositories for offline benchmarking and profiling.
+
+Documents live in plain dicts keyed by an increasing integer `_id`, with
+secondary indexes (email, user_email, plan_name, churn score) kept as
+dicts/lists, so lookups by those keys cost what the indexed Mongo query
+would, minus the network. Not every path has an index here: filtered user
+counts, search_page and the bulk/segment/churn updates scan every user.
+
+Same semantics as the Mongo backend, no server needed. bench/run.py counts
+queries, not documents examined, so it cannot show a scan on either
+backend; check Mongo query shapes with indexes.uncovered_queries().
+"""
+import bisect
+import itertools
+import threading
+
+from plan_stats import removed_deltas, status_delta
+from subscriptions import status_matches
+from usage_history import add_flush, applied, history_query
+from user_search import (
+    CHURN_LIST_PROJECTION, USER_LIST_PROJECTION, user_matches, with_search_keys)
+from repositories.base import (
+    DuplicateError, PlansRepo, Repositories, SubscriptionsRepo, UsersRepo)
+
+
+class MemoryStore:
+    """Shared id sequence + write lock for one in-memory database"""
+
+    def __init__(self):
+        self.ids = itertools.count(1)
+        self.lock = threading.RLock()
+
+    def next_id(self):
+        return next(self.ids)
+
+
+class MemoryUsersRepo(UsersRepo):
+
+    def __init__(self, store):
+        self.store = store
+        self.docs = {}
+        self.by_email_index = {}
+        self.segments = []
+        # [(-churn_score, _id)] ascending, rebuilt after each scoring run
+        self.by_churn = []
+
+    def by_email(self, email):
+        return self.by_email_index.get(email)
+
+    def by_emails(self, emails):
+        found = {}
+        for email in emails:
+            user = self.by_email_index.get(email)
+            if user:
+                found[email] = {"name": user["name"], "email": user["email"]}
+        return found
+
+    def authenticate(self, email, password):
+        user = self.by_email_index.get(email)
+        if user and user.get("password") == password:
+            return user
+        return None
+
+    def count(self, role=None, approved=None):
+        if role is None and approved is None:
+            return len(self.docs)
+        return sum(1 for u in self.docs.values() if user_matches(u, "", role, approved))
+
+    def all(self):
+        return list(self.docs.values())
+
+    def search_page(self, search="", role=None, approved=None, exclude_emails=(),
+                    after_id=None, page_size=25):
+        # docs is in _id order: ids only ever grow
+        users = []
+        for user_id, user in self.docs.items():
+            if after_id is not None and user_id <= after_id:
+                continue
+            if user_matches(user, search, role, approved, exclude_emails):
+                users.append({k: user[k] for k in ("_id", *USER_LIST_PROJECTION) if k in user})
+                if len(users) > page_size:
+                    break
+        has_more = len(users) > page_size
+        users = users[:page_size]
+        return users, (users[-1]["_id"] if has_more and users else None)
+
+    def _insert(self, doc):
+        with self.store.lock:
+            if doc["email"] in self.by_email_index:
+                raise DuplicateError(doc["email"])
+            doc["_id"] = self.store.next_id()
+            self.docs[doc["_id"]] = doc
+            self.by_email_index[doc["email"]] = doc
+
+    def _update(self, user_id, fields):
+        with self.store.lock:
+            user = self.docs.get(user_id)
+            if user is None:
+                return
+            new_email = fields.get("email", user["email"])
+            if new_email != user["email"]:
+                if new_email in self.by_email_index:
+                    raise DuplicateError(new_email)
+                del self.by_email_index[user["email"]]
+                self.by_email_index[new_email] = user
+            user.update(fields)
+
+    def _update_profile(self, email, fields):
+        user = self.by_email_index.get(email)
+        if user:
+            self._update(user["_id"], fields)
+
+    def delete(self, user_id):
+        with self.store.lock:
+            user = self.docs.pop(user_id, None)
+            if user:
+                self.by_email_index.pop(user["email"], None)
+
+    def update_matching(self, fields, search="", role=None, approved=None,
+                        exclude_emails=()):
+        with self.store.lock:
+            matching = [u["_id"] for u in self.docs.values()
+                        if user_matches(u, search, role, approved, exclude_emails)]
+            return self._update_many(matching, with_search_keys(fields))
+
+    def _update_many(self, user_ids, fields):
+        matched = 0
+        with self.store.lock:
+            for user_id in user_ids:
+                if user_id in self.docs:
+                    self._update(user_id, fields)
+                    matched += 1
+        return matched
+
+    def _delete_many(self, user_ids):
+        emails = []
+        with self.store.lock:
+            for user_id in user_ids:
+                user = self.docs.get(user_id)
+                if user:
+                    emails.append(user["email"])
+                    self.delete(user_id)
+        return emails
+
+    def _label_many(self, emails, fields):
+        return self._set_fields((email, fields) for email in emails)
+
+    def _clear_segments(self, run_at):
+        with self.store.lock:
+            for user in self.docs.values():
+                if "segment" in user and user.get("segmented_at") != run_at:
+                    user.pop("segment")
+                    user.pop("segmented_at", None)
+
+    def _score_many(self, scores, run_at):
+        return self._set_fields(
+            (email, {"churn_score": score, "churn_scored_at": run_at})
+            for email, score in scores)
+
+    def _set_fields(self, updates):
+        matched = 0
+        with self.store.lock:
+            for email, fields in updates:
+                user = self.by_email_index.get(email)
+                if user:
+                    user.update(fields)
+                    matched += 1
+        return matched
+
+    def _clear_churn_scores(self, run_at):
+        with self.store.lock:
+            for user in self.docs.values():
+                if "churn_score" in user and user.get("churn_scored_at") != run_at:
+                    user.pop("churn_score")
+                    user.pop("churn_scored_at", None)
+            self.by_churn = sorted((-u["churn_score"], u["_id"])
+                                   for u in self.docs.values() if "churn_score" in u)
+
+    def top_churn_risk(self, limit=25):
+        users = (self.docs.get(user_id) for _, user_id in self.by_churn[:limit])
+        return [{field: u.get(field) for field in ("_id",) + tuple(CHURN_LIST_PROJECTION)}
+                for u in users if u and "churn_score" in u]
+
+    def save_segment_profiles(self, rows):
+        self.segments = [dict(row) for row in rows]
+
+    def segment_profiles(self):
+        return list(self.segments)
+
+
+class MemoryPlansRepo(PlansRepo):
+
+    def __init__(self, store):
+        self.store = store
+        self.docs = {}
+        self.ids_by_name = {}
+        super().__init__()
+
+    def _load_all(self):
+        return list(self.docs.values())
+
+    def _insert(self, doc):
+        with self.store.lock:
+            if doc["name"] in self.ids_by_name:
+                raise DuplicateError(doc["name"])
+            doc["_id"] = self.store.next_id()
+            self.docs[doc["_id"]] = doc
+            self.ids_by_name[doc["name"]] = doc["_id"]
+
+    def _update(self, plan_id, fields):
+        with self.store.lock:
+            plan = self.docs.get(plan_id)
+            if plan is None:
+                return
+            new_name = fields.get("name", plan["name"])
+            if new_name != plan["name"]:
+                if new_name in self.ids_by_name:
+                    raise DuplicateError(new_name)
+                del self.ids_by_name[plan["name"]]
+                self.ids_by_name[new_name] = plan_id
+            plan.update(fields)
+
+    def _delete(self, plan_id):
+        with self.store.lock:
+            plan = self.docs.pop(plan_id, None)
+            if plan:
+                self.ids_by_name.pop(plan["name"], None)
+
+    def existing_names(self, names):
+        return {name for name in names if name in self.ids_by_name}
+
+    def _insert_many(self, docs):
+        inserted = 0
+        with self.store.lock:
+            for doc in docs:
+                try:
+                    self._insert(doc)
+                except DuplicateError:
+                    continue
+                inserted += 1
+        return inserted
+
+    def _upsert_many(self, docs):
+        inserted = updated = 0
+        with self.store.lock:
+            for doc in docs:
+                plan_id = self.ids_by_name.get(doc["name"])
+                if plan_id is None:
+                    self._insert(doc)
+                    inserted += 1
+                else:
+                    self._update(plan_id, {k: v for k, v in doc.items() if k != "createdAt"})
+                    updated += 1
+        return inserted, updated
+
+
+class MemorySubscriptionsRepo(SubscriptionsRepo):
+
+    def __init__(self, store, users, plans):
+        self.store = store
+        self.users = users
+        self.plans = plans
+        self.docs = {}
+        # secondary indexes: lists of _ids, ascending (ids only ever grow)
+        self.by_user = {}
+        self.by_plan = {}
+        # plan_name → {"active": n, "total": n}
+        self.stats = {}
+        self.usage_batches = {}
+        # user_email → {(level, start, plan_name): usage_history doc}
+        self.history = {}
+
+    def plan_stats(self):
+        return {
+            name: {"active": c["active"], "inactive": c["total"] - c["active"],
+                   "total": c["total"]}
+            for name, c in self.stats.items()
+        }
+
+    def rebuild_plan_stats(self):
+        with self.store.lock:
+            stats = {}
+            for sub in self.docs.values():
+                counts = stats.setdefault(sub.get("plan_name"), {"active": 0, "total": 0})
+                counts["total"] += 1
+                counts["active"] += int(sub.get("status") == "active")
+            self.stats = stats
+        return True
+
+    def plan_subscriber_counts(self, plan_names, status_filter="All"):
+        counts = {}
+        for plan_name in plan_names:
+            n = sum(1 for sub_id in self.by_plan.get(plan_name, [])
+                    if status_matches(self.docs[sub_id].get("status"), status_filter))
+            if n:
+                counts[plan_name] = n
+        return counts
+
+    def _page(self, plan_name, status_filter, after_id, page_size):
+        """(subscriptions, next_cursor) for one keyset page of a plan"""
+        ids = self.by_plan.get(plan_name, [])
+        start = 0 if after_id is None else bisect.bisect_right(ids, after_id)
+
+        subs = []
+        for sub_id in ids[start:]:
+            sub = self.docs[sub_id]
+            if status_matches(sub.get("status"), status_filter):
+                subs.append(sub)
+                if len(subs) > page_size:
+                    break
+        has_more = len(subs) > page_size
+        subs = subs[:page_size]
+        return subs, (subs[-1]["_id"] if has_more and subs else None)
+
+    def subscriber_page(self, plan_name, status_filter="All", after_id=None,
+                        page_size=25):
+        subs, next_cursor = self._page(plan_name, status_filter, after_id, page_size)
+        users = self.users.by_emails({s["user_email"] for s in subs if s.get("user_email")})
+        return [(sub, users.get(sub.get("user_email"))) for sub in subs], next_cursor
+
+    def first_subscriber_pages(self, plan_names, status_filter="All", page_size=25):
+        names = {name for name in plan_names if self.plans.by_name(name)}
+        pages = {name: self._page(name, status_filter, None, page_size) for name in names}
+        users = self.users.by_emails({s["user_email"] for subs, _ in pages.values()
+                                      for s in subs if s.get("user_email")})
+        return {name: ([(sub, users.get(sub.get("user_email"))) for sub in subs], next_cursor)
+                for name, (subs, next_cursor) in pages.items()}
+
+    def for_user(self, email, statuses=None):
+        subs = [self.docs[sub_id] for sub_id in self.by_user.get(email, [])]
+        if statuses is not None:
+            subs = [s for s in subs if s.get("status") in statuses]
+        return subs
+
+    def has_open(self, email, plan_name):
+        return any(
+            s.get("plan_name") == plan_name and s.get("status") in ("active", "stopped")
+            for s in self.for_user(email)
+        )
+
+    def _insert(self, doc):
+        with self.store.lock:
+            doc["_id"] = self.store.next_id()
+            self.docs[doc["_id"]] = doc
+            self.by_user.setdefault(doc.get("user_email"), []).append(doc["_id"])
+            self.by_plan.setdefault(doc.get("plan_name"), []).append(doc["_id"])
+            counts = self.stats.setdefault(doc.get("plan_name"), {"active": 0, "total": 0})
+            counts["total"] += 1
+            counts["active"] += int(doc.get("status") == "active")
+
+    def set_status(self, sub_id, status):
+        with self.store.lock:
+            sub = self.docs.get(sub_id)
+            if sub and sub.get("status") != status:
+                counts = self.stats.setdefault(sub.get("plan_name"), {"active": 0, "total": 0})
+                counts["active"] += status_delta(sub.get("status"), status)
+                sub["status"] = status
+
+    def remove_for_users(self, emails):
+        with self.store.lock:
+            removed_ids = set()
+            for email in emails:
+                removed_ids.update(self.by_user.pop(email, []))
+                self.history.pop(email, None)
+            if not removed_ids:
+                return 0
+            removed = [self.docs.pop(sub_id) for sub_id in sorted(removed_ids)]
+            for plan_name in {s.get("plan_name") for s in removed}:
+                self.by_plan[plan_name] = [
+                    sub_id for sub_id in self.by_plan.get(plan_name, [])
+                    if sub_id not in removed_ids]
+            deltas = removed_deltas((s.get("plan_name"), s.get("status")) for s in removed)
+            for plan_name, inc in deltas.items():
+                counts = self.stats.setdefault(plan_name, {"active": 0, "total": 0})
+                counts["total"] += inc["total"]
+                counts["active"] += inc["active"]
+            return len(removed)
+
+    def export_rows(self, batch_size=2000):
+        price_of = self.plans.catalog.price_of
+        for sub in list(self.docs.values()):
+            user = self.users.by_email(sub.get("user_email"))
+            yield {
+                "subscription_id": str(sub["_id"]),
+                "user_email": sub.get("user_email"),
+                "user_name": user["name"] if user else None,
+                "plan_name": sub.get("plan_name"),
+                "plan_price": price_of(sub.get("plan_name")),
+                "status": sub.get("status") or "active",
+                "usage_gb": sub.get("usage_gb"),
+                "subscribed_on": sub.get("subscribed_on"),
+            }
+
+    def scan(self, fields, batch_size=50_000):
+        docs = list(self.docs.values())
+        for start in range(0, len(docs), batch_size):
+            yield [{field: doc.get(field) for field in fields}
+                   for doc in docs[start:start + batch_size]]
+
+    def add_usage(self, increments, flush_id):
+        updated = 0
+        with self.store.lock:
+            for email, plan_name, usage_gb, last_event_at in increments:
+                for sub_id in self.by_user.get(email, []):
+                    sub = self.docs[sub_id]
+                    if sub.get("plan_name") == plan_name and \
+                            sub.get("status") in ("active", "stopped"):
+                        # update_one semantics: the first open match only
+                        if not applied(sub.get("usage_flushes"), flush_id):
+                            sub["usage_gb"] = sub.get("usage_gb", 0) + usage_gb
+                            sub["usage_updated_at"] = max(
+                                sub.get("usage_updated_at") or last_event_at, last_event_at)
+                            sub["usage_flushes"] = add_flush(sub.get("usage_flushes"), flush_id)
+                            updated += 1
+                        break
+        return updated
+
+    def usage_batch(self, batch_id):
+        return self.usage_batches.get(batch_id)
+
+    def mark_usage_batch(self, batch_id, **fields):
+        with self.store.lock:
+            self.usage_batches.setdefault(batch_id, {"_id": batch_id}).update(fields)
+
+    def add_usage_history(self, day_buckets, month_totals, flush_id):
+        rows = [(email, plan_name, "day", day, gb, hours)
+                for email, plan_name, day, gb, hours in day_buckets]
+        rows.extend((email, plan_name, "month", month, gb, None)
+                    for email, plan_name, month, gb in month_totals)
+        with self.store.lock:
+            for email, plan_name, level, start, gb, hours in rows:
+                doc = self.history.setdefault(email, {}).setdefault(
+                    (level, start, plan_name),
+                    {"user_email": email, "plan_name": plan_name, "level": level,
+                     "start": start, "usage_gb": 0})
+                if applied(doc.get("flushes"), flush_id):
+                    continue
+                doc["usage_gb"] += gb
+                if hours:
+                    doc_hours = doc.setdefault("hours", {})
+                    for hour, hour_gb in hours.items():
+                        doc_hours[hour] = doc_hours.get(hour, 0) + hour_gb
+                doc["flushes"] = add_flush(doc.get("flushes"), flush_id)
+
+    def usage_history(self, email, level, start, end):
+        query, projection = history_query(email, level, start, end)
+        low, high = query["start"]["$gte"], query["start"]["$lt"]
+        return [
+            {field: doc[field] for field in projection if field in doc}
+            for (doc_level, doc_start, _), doc in self.history.get(email, {}).items()
+            if doc_level == query["level"] and low <= doc_start < high
+        ]
+
+
+class MemoryRepositories(Repositories):
+
+    def __init__(self):
+        self.store = MemoryStore()
+        users = MemoryUsersRepo(self.store)
+        plans = MemoryPlansRepo(self.store)
+        subscriptions = MemorySubscriptionsRepo(self.store, users, plans)
+        super().__init__(users, plans, subscriptions, backend="memory")
+
+    def seed(self, users=(), plans=(), subscriptions=()):
+        """Bulk-load raw documents (used by benchmarks and demo data)"""
+        for doc in users:
+            self.users._insert(with_search_keys(dict(doc)))
+        for doc in plans:
+            self.plans._insert(dict(doc))
+        for doc in subscriptions:
+            self.subscriptions._insert(dict(doc))
+        self.plans.catalog.bump()
+
+
+def memory_repositories():
+    return MemoryRepositories()
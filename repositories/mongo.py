@@ -0,0 +1,308 @@
+# ====================================================
+# 🍃 MongoDB Backend
+# ====================================================
+"""Repositories backed by the BroadbandDB collections"""
+from datetime import datetime
+
+from pymongo import DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from indexes import bootstrap_schema
+from plan_stats import (
+    STATS_COLLECTION, load_plan_stats, rebuild_plan_stats, record_removed,
+    record_status_change, record_subscribe)
+from segments import CUSTOMER_SEGMENTS
+from subscription_export import export_rows
+from subscriptions import (
+    first_subscriber_pages, plan_subscriber_counts, subscriber_page, users_by_email)
+from usage_history import (
+    USAGE_HISTORY, history_ops, history_query, remember_flush, write_history)
+from usage_ingest import USAGE_BATCHES
+from user_search import (
+    CHURN_LIST_PROJECTION, approved_query, user_query, user_search_page,
+    with_search_keys)
+from repositories.base import (
+    DuplicateError, PlansRepo, Repositories, SubscriptionsRepo, UsersRepo)
+
+
+class MongoUsersRepo(UsersRepo):
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.segments = collection.database[CUSTOMER_SEGMENTS]
+
+    def by_email(self, email):
+        return self.collection.find_one({"email": email})
+
+    def by_emails(self, emails):
+        return users_by_email(self.collection, emails)
+
+    def authenticate(self, email, password):
+        return self.collection.find_one({"email": email, "password": password})
+
+    def count(self, role=None, approved=None):
+        query = {} if role is None else {"role": role}
+        query.update(approved_query(approved))
+        return self.collection.count_documents(query)
+
+    def all(self):
+        return list(self.collection.find())
+
+    def search_page(self, search="", role=None, approved=None, exclude_emails=(),
+                    after_id=None, page_size=25):
+        return user_search_page(self.collection, search, role, approved,
+                                exclude_emails, after_id, page_size)
+
+    def _insert(self, doc):
+        try:
+            self.collection.insert_one(doc)
+        except DuplicateKeyError as exc:
+            raise DuplicateError(doc["email"]) from exc
+
+    def _update(self, user_id, fields):
+        try:
+            self.collection.update_one({"_id": user_id}, {"$set": fields})
+        except DuplicateKeyError as exc:
+            raise DuplicateError(fields.get("email")) from exc
+
+    def _update_profile(self, email, fields):
+        self.collection.update_one({"email": email}, {"$set": fields})
+
+    def delete(self, user_id):
+        self.collection.delete_one({"_id": user_id})
+
+    def update_matching(self, fields, search="", role=None, approved=None,
+                        exclude_emails=()):
+        return self.collection.update_many(
+            user_query(search, role, approved, exclude_emails),
+            {"$set": with_search_keys(fields)}).matched_count
+
+    def _update_many(self, user_ids, fields):
+        try:
+            return self.collection.update_many(
+                {"_id": {"$in": user_ids}}, {"$set": fields}).matched_count
+        except DuplicateKeyError as exc:
+            raise DuplicateError(fields.get("email")) from exc
+
+    def _delete_many(self, user_ids):
+        emails = [u["email"] for u in self.collection.find(
+            {"_id": {"$in": user_ids}}, {"_id": 0, "email": 1})]
+        self.collection.delete_many({"_id": {"$in": user_ids}})
+        return emails
+
+    def _label_many(self, emails, fields):
+        return self.collection.update_many(
+            {"email": {"$in": emails}}, {"$set": fields}).matched_count
+
+    def _clear_segments(self, run_at):
+        self.collection.update_many(
+            {"segment": {"$exists": True}, "segmented_at": {"$ne": run_at}},
+            {"$unset": {"segment": "", "segmented_at": ""}})
+
+    def _score_many(self, scores, run_at):
+        ops = [UpdateOne({"email": email},
+                         {"$set": {"churn_score": score, "churn_scored_at": run_at}})
+               for email, score in scores]
+        return self.collection.bulk_write(ops, ordered=False).matched_count
+
+    def _clear_churn_scores(self, run_at):
+        self.collection.update_many(
+            {"churn_score": {"$exists": True}, "churn_scored_at": {"$ne": run_at}},
+            {"$unset": {"churn_score": "", "churn_scored_at": ""}})
+
+    def top_churn_risk(self, limit=25):
+        # walks the churn_score index from the top; unscored users sort last
+        return list(self.collection.find(
+            {"churn_score": {"$exists": True}}, CHURN_LIST_PROJECTION)
+            .sort("churn_score", DESCENDING).limit(limit))
+
+    def save_segment_profiles(self, rows):
+        self.segments.delete_many({})
+        if rows:
+            self.segments.insert_many(rows)
+
+    def segment_profiles(self):
+        return list(self.segments.find())
+
+
+class MongoPlansRepo(PlansRepo):
+
+    def __init__(self, collection):
+        self.collection = collection
+        super().__init__()
+
+    def _load_all(self):
+        return self.collection.find()
+
+    def _insert(self, doc):
+        try:
+            self.collection.insert_one(doc)
+        except DuplicateKeyError as exc:
+            raise DuplicateError(doc["name"]) from exc
+
+    def _update(self, plan_id, fields):
+        try:
+            self.collection.update_one({"_id": plan_id}, {"$set": fields})
+        except DuplicateKeyError as exc:
+            raise DuplicateError(fields.get("name")) from exc
+
+    def _delete(self, plan_id):
+        self.collection.delete_one({"_id": plan_id})
+
+    def existing_names(self, names):
+        return {p["name"] for p in self.collection.find(
+            {"name": {"$in": list(names)}}, {"_id": 0, "name": 1})}
+
+    def _insert_many(self, docs):
+        if not docs:
+            return 0
+        try:
+            return len(self.collection.insert_many(docs, ordered=False).inserted_ids)
+        except BulkWriteError as exc:
+            # unordered: everything but the clashing names was written
+            return exc.details.get("nInserted", 0)
+
+    def _upsert_many(self, docs):
+        if not docs:
+            return 0, 0
+        now = datetime.now()
+        ops = [
+            UpdateOne({"name": doc["name"]},
+                      {"$set": {k: v for k, v in doc.items() if k != "createdAt"},
+                       "$setOnInsert": {"createdAt": doc.get("createdAt", now)}},
+                      upsert=True)
+            for doc in docs
+        ]
+        result = self.collection.bulk_write(ops, ordered=False)
+        return result.upserted_count, result.matched_count
+
+
+class MongoSubscriptionsRepo(SubscriptionsRepo):
+
+    def __init__(self, collection, stats, users, plans):
+        self.collection = collection
+        self.stats = stats
+        self.usage_batches = collection.database[USAGE_BATCHES]
+        self.history = collection.database[USAGE_HISTORY]
+        self.users = users
+        self.plans = plans
+
+    def plan_stats(self):
+        return load_plan_stats(self.stats)
+
+    def rebuild_plan_stats(self):
+        return rebuild_plan_stats(self.collection, self.stats.name)
+
+    def plan_subscriber_counts(self, plan_names, status_filter="All"):
+        return plan_subscriber_counts(self.collection, plan_names, status_filter)
+
+    def subscriber_page(self, plan_name, status_filter="All", after_id=None,
+                        page_size=25):
+        return subscriber_page(self.collection, self.users.collection, plan_name,
+                               status_filter, after_id, page_size)
+
+    def first_subscriber_pages(self, plan_names, status_filter="All", page_size=25):
+        return first_subscriber_pages(self.collection, self.plans.collection,
+                                      self.users.collection, plan_names, status_filter,
+                                      page_size)
+
+    def for_user(self, email, statuses=None):
+        query = {"user_email": email}
+        if statuses is not None:
+            query["status"] = {"$in": list(statuses)}
+        return list(self.collection.find(query))
+
+    def has_open(self, email, plan_name):
+        return self.collection.find_one({
+            "user_email": email,
+            "plan_name": plan_name,
+            "status": {"$in": ["active", "stopped"]}
+        }, {"_id": 1}) is not None
+
+    def _insert(self, doc):
+        self.collection.insert_one(doc)
+        record_subscribe(self.stats, doc["plan_name"], doc["status"])
+
+    def set_status(self, sub_id, status):
+        # returns the document as it was, so the counters see the old status
+        old = self.collection.find_one_and_update(
+            {"_id": sub_id, "status": {"$ne": status}},
+            {"$set": {"status": status}},
+            projection={"plan_name": 1, "status": 1}
+        )
+        if old:
+            record_status_change(
+                self.stats, old.get("plan_name"), old.get("status"), status)
+
+    def remove_for_users(self, emails):
+        if not emails:
+            return 0
+        query = {"user_email": {"$in": list(emails)}}
+        removed = [(s.get("plan_name"), s.get("status"))
+                   for s in self.collection.find(query, {"plan_name": 1, "status": 1})]
+        if removed:
+            self.collection.delete_many(query)
+            record_removed(self.stats, removed)
+        self.history.delete_many(query)
+        return len(removed)
+
+    def export_rows(self, batch_size=2000):
+        return export_rows(self.collection, batch_size, self.users.collection.name,
+                           self.plans.collection.name)
+
+    def scan(self, fields, batch_size=50_000):
+        projection = dict.fromkeys(fields, 1)
+        projection["_id"] = 0
+        batch = []
+        for doc in self.collection.find({}, projection, batch_size=batch_size):
+            batch.append(doc)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def add_usage(self, increments, flush_id):
+        ops = [
+            UpdateOne(
+                {"user_email": email, "plan_name": plan_name,
+                 "status": {"$in": ["active", "stopped"]},
+                 "usage_flushes": {"$ne": flush_id}},
+                {"$inc": {"usage_gb": usage_gb},
+                 "$max": {"usage_updated_at": last_event_at},
+                 "$push": {"usage_flushes": remember_flush(flush_id)}})
+            for email, plan_name, usage_gb, last_event_at in increments
+        ]
+        if not ops:
+            return 0
+        return self.collection.bulk_write(ops, ordered=False).matched_count
+
+    def usage_batch(self, batch_id):
+        return self.usage_batches.find_one({"_id": batch_id})
+
+    def mark_usage_batch(self, batch_id, **fields):
+        self.usage_batches.update_one({"_id": batch_id}, {"$set": fields}, upsert=True)
+
+    def add_usage_history(self, day_buckets, month_totals, flush_id):
+        write_history(self.history, history_ops(day_buckets, month_totals, flush_id))
+
+    def usage_history(self, email, level, start, end):
+        return list(self.history.find(*history_query(email, level, start, end)))
+
+
+class MongoRepositories(Repositories):
+
+    def __init__(self, db):
+        users = MongoUsersRepo(db["users"])
+        plans = MongoPlansRepo(db["plans"])
+        subscriptions = MongoSubscriptionsRepo(
+            db["CustomerPlans"], db[STATS_COLLECTION], users, plans)
+        super().__init__(users, plans, subscriptions, backend="mongo")
+        self.db = db
+
+    def bootstrap(self):
+        bootstrap_schema(self.db)
+
+
+def mongo_repositories(db):
+    return MongoRepositories(db)
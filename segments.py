@@ -0,0 +1,222 @@
+# ====================================================
+# 🎯 Customer Segmentation (batch job)
+# ====================================================
+"""Cluster customers on their subscriptions and label them in bulk.
+
+Per customer, from CustomerPlans + the plan catalog:
+    spend         sum of plan prices over all their subscriptions
+    active / stopped / previous   subscription counts by status
+    usage_ratio   mean usage_gb / valid_data
+    tenure_days   days since their first subscription
+
+Subscriptions are streamed in batches and each batch is reduced per customer
+with one pandas groupby, so the job never holds raw subscriptions, only one
+row per customer. Features are log-scaled and standardised, clustered with
+MiniBatchKMeans (scikit-learn), and each cluster gets a readable name (Lapsed, Budget, Core,
+Premium) from its average profile. Labels go back to `users.segment` with
+one update_many per segment and chunk of emails; the cluster profiles go to
+the `customer_segments` collection for the admin Analytics tab.
+
+    python segments.py                    # label everyone (weekly cron)
+    python segments.py --clusters 6 --dry-run
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+CUSTOMER_SEGMENTS = "customer_segments"
+FEATURES = ["spend", "active", "stopped", "previous", "usage_ratio", "tenure_days"]
+SCAN_FIELDS = ["user_email", "plan_name", "status", "usage_gb", "subscribed_on"]
+DEFAULT_CLUSTERS = 4
+DEFAULT_BATCH_SIZE = 50_000
+COMPACT_EVERY = 20          # batches between re-aggregations of partial rows
+SPEND_TIERS = {1: ["Core"], 2: ["Budget", "Premium"], 3: ["Budget", "Core", "Premium"],
+               4: ["Budget", "Core", "Plus", "Premium"]}
+# price-sensitive segments see Offer plans first
+OFFER_FIRST_SEGMENTS = {"Lapsed", "Budget"}
+
+
+# ====================================================
+# 🧮 Feature Matrix (vectorised, batch by batch)
+# ====================================================
+def _partials(rows, price, valid_data):
+    """One batch of subscriptions → per-customer partial sums"""
+    df = pd.DataFrame(rows, columns=SCAN_FIELDS)
+    status = df["status"].fillna("active")
+    data = df["plan_name"].map(valid_data)
+    ratio = pd.to_numeric(df["usage_gb"], errors="coerce") / data.where(data > 0)
+    return pd.DataFrame({
+        "user_email": df["user_email"],
+        "spend": df["plan_name"].map(price).fillna(0),
+        "active": status.eq("active").astype("int64"),
+        "stopped": status.eq("stopped").astype("int64"),
+        "previous": (~status.isin(["active", "stopped"])).astype("int64"),
+        "ratio_sum": ratio.fillna(0),
+        "ratio_n": ratio.notna().astype("int64"),
+        "first_on": pd.to_datetime(df["subscribed_on"], errors="coerce"),
+    }).groupby("user_email", sort=False).agg(
+        spend=("spend", "sum"), active=("active", "sum"), stopped=("stopped", "sum"),
+        previous=("previous", "sum"), ratio_sum=("ratio_sum", "sum"),
+        ratio_n=("ratio_n", "sum"), first_on=("first_on", "min"))
+
+
+def _combine(partials):
+    frame = pd.concat(partials)
+    aggs = {c: "sum" for c in frame.columns if c != "first_on"}
+    aggs["first_on"] = "min"
+    return frame.groupby(level=0, sort=False).agg(aggs)
+
+
+def customer_features(batches, plans, now=None):
+    """DataFrame indexed by user_email with the FEATURES columns"""
+    now = now or datetime.now()
+    price = {p.get("name"): p.get("price") for p in plans
+             if isinstance(p.get("price"), (int, float))}
+    valid_data = {p.get("name"): p.get("valid_data") for p in plans
+                  if isinstance(p.get("valid_data"), (int, float))}
+
+    partials = []
+    for rows in batches:
+        partials.append(_partials(rows, price, valid_data))
+        if len(partials) >= COMPACT_EVERY:
+            partials = [_combine(partials)]
+    if not partials:
+        return pd.DataFrame(columns=FEATURES)
+
+    totals = _combine(partials)
+    totals["usage_ratio"] = (totals.pop("ratio_sum") / totals.pop("ratio_n")).fillna(0)
+    totals["tenure_days"] = (now - totals.pop("first_on")).dt.days.fillna(0).clip(lower=0)
+    return totals[FEATURES].astype(float)
+
+
+# ====================================================
+# 🧩 Clustering + Names
+# ====================================================
+def cluster(features, n_clusters=DEFAULT_CLUSTERS, seed=0):
+    """Cluster label per row of features"""
+    # imported here: the repositories import this module for its constants
+    from sklearn.cluster import MiniBatchKMeans
+
+    n_clusters = min(n_clusters, len(features))
+    if n_clusters < 2:
+        return np.zeros(len(features), dtype=int)
+    scaled = np.log1p(features.to_numpy().clip(min=0))
+    spread = scaled.std(axis=0)
+    scaled = (scaled - scaled.mean(axis=0)) / np.where(spread > 0, spread, 1)
+    model = MiniBatchKMeans(n_clusters=n_clusters, batch_size=4096, n_init=3,
+                            random_state=seed)
+    return model.fit_predict(scaled)
+
+
+def _unique(name, taken):
+    label, n = name, 1
+    while label in taken:
+        n += 1
+        label = f"{name} {n}"
+    taken.add(label)
+    return label
+
+
+def segment_names(profiles):
+    """{cluster: name} — no open subscription on average → Lapsed, the rest
+    ranked by spend into Budget / Core / Plus / Premium (SPEND_TIERS)"""
+    names, taken = {}, set()
+    lapsed = profiles["active"] + profiles["stopped"] < 0.5
+    for label in profiles.index[lapsed]:
+        names[label] = _unique("Lapsed", taken)
+    ranked = profiles[~lapsed].sort_values("spend").index.tolist()
+    tiers = SPEND_TIERS.get(len(ranked)) or \
+        ["Budget"] + ["Core"] * (len(ranked) - 2) + ["Premium"]
+    for label, tier in zip(ranked, tiers):
+        names[label] = _unique(tier, taken)
+    return names
+
+
+def segment_profiles(features, labels, names):
+    """One row per segment: size and mean features"""
+    profiles = features.groupby(labels).mean()
+    profiles.insert(0, "customers", pd.Series(labels).value_counts())
+    profiles.index = [names[label] for label in profiles.index]
+    return profiles.sort_values("spend")
+
+
+def offer_first(recs, segment):
+    """Order recommendations for a segment: Offer plans first, cheapest first,
+    for price-sensitive segments; unchanged otherwise"""
+    if segment not in OFFER_FIRST_SEGMENTS:
+        return recs
+
+    def key(plan):
+        price = plan.get("price")
+        return (plan.get("plan_type") != "Offer",
+                price if isinstance(price, (int, float)) else float("inf"))
+
+    return sorted(recs, key=key)
+
+
+# ====================================================
+# 🏃 Job
+# ====================================================
+def run(repos, n_clusters=DEFAULT_CLUSTERS, batch_size=DEFAULT_BATCH_SIZE,
+        dry_run=False, progress=None):
+    """Segment every customer with subscriptions; returns (profiles, timings).
+
+    progress(done, total) is called while labels are written.
+    """
+    timings = {}
+    start = time.perf_counter()
+    features = customer_features(
+        repos.subscriptions.scan(SCAN_FIELDS, batch_size), repos.plans.all())
+    timings["features"] = time.perf_counter() - start
+    if features.empty:
+        return pd.DataFrame(columns=["customers"] + FEATURES), timings
+
+    start = time.perf_counter()
+    labels = cluster(features, n_clusters)
+    names = segment_names(features.groupby(labels).mean())
+    profiles = segment_profiles(features, labels, names)
+    timings["cluster"] = time.perf_counter() - start
+
+    if not dry_run:
+        start = time.perf_counter()
+        run_at = datetime.now()
+        emails = features.index.to_numpy()
+        by_segment = {names[label]: emails[labels == label].tolist() for label in names}
+        repos.users.set_segments(by_segment, run_at, progress)
+        repos.users.save_segment_profiles([
+            dict(row, _id=name, run_at=run_at)
+            for name, row in profiles.to_dict("index").items()])
+        timings["write"] = time.perf_counter() - start
+    return profiles, timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Segment customers and label them")
+    parser.add_argument("--clusters", type=int, default=DEFAULT_CLUSTERS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="subscriptions per cursor batch")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="print the segments without writing labels")
+    args = parser.parse_args(argv)
+
+    from db import get_db
+    from repositories import mongo_repositories
+
+    def report(done, total):
+        print(f"  {done:,} / {total:,} customers labelled", file=sys.stderr)
+
+    profiles, timings = run(mongo_repositories(get_db()), args.clusters, args.batch_size,
+                            args.dry_run, report)
+    print(profiles.round(2).to_string())
+    print(" · ".join(f"{stage} {seconds:.1f} s" for stage, seconds in timings.items()),
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
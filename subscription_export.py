@@ -0,0 +1,137 @@
+# ====================================================
+# 📤 Subscription Export (finance dump)
+# ====================================================
+"""Every CustomerPlans row joined with the user's name and the plan's price.
+
+Rows come from one aggregation — two `$lookup`s that each hit a unique
+index (users.email, plans.name) — read through a batched cursor and written
+chunk by chunk, so a multi-million row export never sits in a list or a
+DataFrame. Memory is bounded by --chunk-size rows.
+
+    python subscription_export.py subscriptions.parquet
+    python subscription_export.py - > subscriptions.csv     # CSV to stdout
+    python subscription_export.py dump.csv --batch-size 5000 --chunk-size 50000
+"""
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+from tabular_io import DEFAULT_CHUNK_SIZE, ChunkWriter, format_of
+
+
+EXPORT_COLUMNS = ["subscription_id", "user_email", "user_name", "plan_name",
+                  "plan_price", "status", "usage_gb", "subscribed_on"]
+# fixed dtypes so every chunk has the same Parquet schema, even all-null ones
+EXPORT_DTYPES = {
+    "subscription_id": "string", "user_email": "string", "user_name": "string",
+    "plan_name": "string", "plan_price": "float64", "status": "string",
+    "usage_gb": "float64",
+}
+DEFAULT_BATCH_SIZE = 2000
+
+
+def export_pipeline(users_collection_name="users", plans_collection_name="plans"):
+    return [
+        {"$lookup": {
+            "from": users_collection_name,
+            "let": {"email": "$user_email"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$email", "$$email"]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 0, "name": 1}},
+            ],
+            "as": "user",
+        }},
+        {"$lookup": {
+            "from": plans_collection_name,
+            "let": {"plan_name": "$plan_name"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$name", "$$plan_name"]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 0, "price": 1}},
+            ],
+            "as": "plan",
+        }},
+        {"$project": {
+            "_id": 0,
+            "subscription_id": {"$toString": "$_id"},
+            "user_email": 1,
+            "user_name": {"$arrayElemAt": ["$user.name", 0]},
+            "plan_name": 1,
+            "plan_price": {"$arrayElemAt": ["$plan.price", 0]},
+            "status": {"$ifNull": ["$status", "active"]},
+            "usage_gb": 1,
+            "subscribed_on": 1,
+        }},
+    ]
+
+
+def export_rows(customers_collection, batch_size=DEFAULT_BATCH_SIZE,
+                users_collection_name="users", plans_collection_name="plans"):
+    """Cursor over the joined rows, batch_size documents per round trip"""
+    return customers_collection.aggregate(
+        export_pipeline(users_collection_name, plans_collection_name),
+        batchSize=batch_size, allowDiskUse=True)
+
+
+def _frame(rows):
+    frame = pd.DataFrame(rows, columns=EXPORT_COLUMNS)
+    frame["subscription_id"] = frame["subscription_id"].astype(str)
+    frame["subscribed_on"] = pd.to_datetime(frame["subscribed_on"], errors="coerce")
+    frame["plan_price"] = pd.to_numeric(frame["plan_price"], errors="coerce")
+    frame["usage_gb"] = pd.to_numeric(frame["usage_gb"], errors="coerce")
+    return frame.astype(EXPORT_DTYPES)
+
+
+def write_export(rows, target, fmt, chunksize=DEFAULT_CHUNK_SIZE, progress=None):
+    """Write an iterable of export rows chunk by chunk; returns rows written.
+
+    progress(rows_written, rows_per_second) is called after every chunk.
+    """
+    start = time.perf_counter()
+    with ChunkWriter(target, fmt) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunksize:
+                writer.write(_frame(batch))
+                batch = []
+                if progress:
+                    progress(writer.rows, writer.rows / max(time.perf_counter() - start, 1e-9))
+        if batch or not writer.rows:
+            writer.write(_frame(batch))
+        if progress:
+            progress(writer.rows, writer.rows / max(time.perf_counter() - start, 1e-9))
+        return writer.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export all subscriptions for finance")
+    parser.add_argument("path", help=".csv / .parquet file, or - for CSV on stdout")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="documents per cursor round trip")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="rows buffered per write")
+    args = parser.parse_args(argv)
+
+    from db import get_db
+
+    to_stdout = args.path == "-"
+    target = sys.stdout.buffer if to_stdout else args.path
+    fmt = "csv" if to_stdout else format_of(args.path)
+
+    def report(rows, rate):
+        print(f"  {rows:,} rows · {rate:,.0f} rows/s", file=sys.stderr)
+
+    start = time.perf_counter()
+    rows = write_export(export_rows(get_db()["CustomerPlans"], args.batch_size),
+                        target, fmt, args.chunk_size, progress=report)
+    print(f"✅ exported {rows:,} subscriptions in {time.perf_counter() - start:.1f} s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+# ====================================================
+# 📋 Subscription Queries (Admin Subscriptions Tab)
+# ====================================================
+"""Paged subscriber listings for the admin Subscriptions tab.
+
+Counts come from one $group per duration tab. The first page of every plan
+card on screen comes from one aggregation plus one `$in` query for their
+users (first_subscriber_pages); a card paged past its first page reads its
+own keyset page of CustomerPlans (`_id > cursor`) the same way.
+"""
+import os
+
+
+DEFAULT_PAGE_SIZE = int(os.environ.get("SUBSCRIPTIONS_PAGE_SIZE", "25"))
+PAGE_SIZE_OPTIONS = sorted({10, 25, 50, 100, DEFAULT_PAGE_SIZE})
+
+SUBSCRIBER_PROJECTION = {"user_email": 1, "usage_gb": 1, "status": 1}
+USER_PROJECTION = {"_id": 0, "name": 1, "email": 1}
+
+
+def status_query(status_filter):
+    """Mongo filter for the "All / Active / Inactive" dropdown.
+
+    A subscription without a status is shown as active, as the cards do.
+    """
+    if status_filter == "Active":
+        return {"status": {"$in": ["active", None]}}
+    if status_filter == "Inactive":
+        return {"status": {"$nin": ["active", None]}}
+    return {}
+
+
+def status_matches(status, status_filter):
+    """Python twin of status_query() for the in-memory backend"""
+    if status_filter == "Active":
+        return status in ("active", None)
+    if status_filter == "Inactive":
+        return status not in ("active", None)
+    return True
+
+
+def counts_pipeline(plan_names, status_filter="All"):
+    """Aggregation run on CustomerPlans: one {_id: plan_name, count} per plan"""
+    match = {"plan_name": {"$in": list(plan_names)}}
+    match.update(status_query(status_filter))
+    return [
+        {"$match": match},
+        {"$group": {"_id": "$plan_name", "count": {"$sum": 1}}},
+    ]
+
+
+def plan_subscriber_counts(customers_collection, plan_names, status_filter="All"):
+    """{plan_name: subscriber count} for the given plans, in one aggregation"""
+    if not plan_names:
+        return {}
+    return {row["_id"]: row["count"]
+            for row in customers_collection.aggregate(
+                counts_pipeline(plan_names, status_filter))}
+
+
+def users_by_email(users_collection, emails):
+    """{email: user} for the given emails, one $in query with a projection"""
+    found = {}
+    if emails:
+        for user in users_collection.find({"email": {"$in": list(emails)}}, USER_PROJECTION):
+            found.setdefault(user["email"], user)
+    return found
+
+
+def subscriber_page(customers_collection, users_collection, plan_name,
+                    status_filter="All", after_id=None, page_size=DEFAULT_PAGE_SIZE):
+    """One page of a plan's subscribers joined with their user records.
+
+    Returns (rows, next_cursor); rows are (subscription, user) pairs and
+    next_cursor is None on the last page.
+    """
+    query = {"plan_name": plan_name}
+    query.update(status_query(status_filter))
+    if after_id is not None:
+        query["_id"] = {"$gt": after_id}
+
+    subs = list(
+        customers_collection.find(query, SUBSCRIBER_PROJECTION)
+        .sort("_id", 1)
+        .limit(page_size + 1)
+    )
+    has_more = len(subs) > page_size
+    subs = subs[:page_size]
+
+    users = users_by_email(
+        users_collection, {sub["user_email"] for sub in subs if sub.get("user_email")})
+
+    rows = [(sub, users.get(sub.get("user_email"))) for sub in subs]
+    next_cursor = subs[-1]["_id"] if has_more and subs else None
+    return rows, next_cursor
+
+
+def first_pages_pipeline(customers_collection_name, plan_names, status_filter="All",
+                         page_size=DEFAULT_PAGE_SIZE):
+    """Aggregation run on plans: {_id: plan_name, subs: [page_size + 1 subs]}"""
+    match = {"$expr": {"$eq": ["$plan_name", "$$plan_name"]}}
+    match.update(status_query(status_filter))
+    return [
+        {"$match": {"name": {"$in": list(plan_names)}}},
+        {"$group": {"_id": "$name"}},
+        {"$lookup": {
+            "from": customers_collection_name,
+            "let": {"plan_name": "$_id"},
+            "pipeline": [
+                {"$match": match},
+                {"$sort": {"_id": 1}},
+                {"$limit": page_size + 1},
+                {"$project": SUBSCRIBER_PROJECTION},
+            ],
+            "as": "subs",
+        }},
+    ]
+
+
+def first_subscriber_pages(customers_collection, plans_collection, users_collection,
+                           plan_names, status_filter="All", page_size=DEFAULT_PAGE_SIZE):
+    """{plan_name: (rows, next_cursor)} — the first page of each plan, as
+    subscriber_page() returns it, in one aggregation and one users query.
+
+    Starts from the plans and looks up at most page_size + 1 subscriptions
+    per plan (plan_name_status_id index), so the cost does not grow with
+    the plans' subscriber counts.
+    """
+    if not plan_names:
+        return {}
+    pages = {row["_id"]: row["subs"] for row in plans_collection.aggregate(
+        first_pages_pipeline(customers_collection.name, plan_names, status_filter, page_size))}
+
+    users = users_by_email(users_collection, {
+        sub["user_email"] for subs in pages.values() for sub in subs[:page_size]
+        if sub.get("user_email")})
+    result = {}
+    for plan_name, subs in pages.items():
+        has_more = len(subs) > page_size
+        subs = subs[:page_size]
+        rows = [(sub, users.get(sub.get("user_email"))) for sub in subs]
+        result[plan_name] = (rows, subs[-1]["_id"] if has_more and subs else None)
+    return result
@@ -0,0 +1,110 @@
+# ====================================================
+# 🗂️ Chunked CSV / Parquet I/O
+# ====================================================
+"""Read and write tabular files one DataFrame chunk at a time.
+
+Imports and exports go through these helpers so a file is never held in
+memory as a whole: CSV via pandas' chunked reader / appended writes,
+Parquet via pyarrow record batches and a ParquetWriter (pyarrow ships
+with Streamlit, and is imported only when a Parquet file is used).
+JSON lines (one object per line) can be read, e.g. for usage events.
+"""
+import io
+
+import pandas as pd
+
+
+FORMATS = ("csv", "parquet")
+READ_FORMATS = FORMATS + ("jsonl",)
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def format_of(filename):
+    """"csv", "parquet" or "jsonl" from a file name, else ValueError"""
+    ext = str(filename).rsplit(".", 1)[-1].lower()
+    if ext in ("parquet", "pq"):
+        return "parquet"
+    if ext == "csv":
+        return "csv"
+    if ext in ("jsonl", "ndjson"):
+        return "jsonl"
+    raise ValueError(f"unsupported file type: {filename} (use .csv, .parquet or .jsonl)")
+
+
+def read_chunks(source, fmt, chunksize=DEFAULT_CHUNK_SIZE):
+    """Yield DataFrames of at most chunksize rows from a path or file object"""
+    if fmt == "csv":
+        yield from pd.read_csv(source, chunksize=chunksize, skipinitialspace=True)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    elif fmt == "jsonl":
+        with pd.read_json(source, lines=True, chunksize=chunksize, dtype=False) as reader:
+            yield from reader
+    else:
+        raise ValueError(f"unsupported format: {fmt}")
+
+
+class ChunkWriter:
+    """Append DataFrame chunks to a CSV or Parquet path / file object.
+
+    Every chunk must have the same columns; Parquet also needs stable dtypes,
+    so the schema is taken from the first chunk.
+    """
+
+    def __init__(self, target, fmt):
+        if fmt not in FORMATS:
+            raise ValueError(f"unsupported format: {fmt}")
+        self.target = target
+        self.fmt = fmt
+        self.rows = 0
+        self._started = False
+        self._parquet = None
+        self._schema = None
+        self._text = None
+
+    def write(self, df):
+        if self.fmt == "csv":
+            self._write_csv(df)
+        else:
+            self._write_parquet(df)
+        self._started = True
+        self.rows += len(df)
+
+    def _write_csv(self, df):
+        header = not self._started
+        if isinstance(self.target, str) or hasattr(self.target, "__fspath__"):
+            df.to_csv(self.target, mode="w" if header else "a", header=header, index=False)
+            return
+        if self._text is None:
+            # binary file objects (BytesIO, open(..., "wb")) need a text wrapper
+            self._text = self.target if isinstance(self.target, io.TextIOBase) else \
+                io.TextIOWrapper(self.target, encoding="utf-8", newline="")
+        df.to_csv(self._text, header=header, index=False)
+
+    def _write_parquet(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._parquet is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self._schema = table.schema
+            self._parquet = pq.ParquetWriter(self.target, self._schema)
+        else:
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        self._parquet.write_table(table)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._text is not None and self._text is not self.target:
+            self._text.flush()
+            self._text.detach()  # leave the caller's file object open
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
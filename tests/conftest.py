@@ -0,0 +1,40 @@
+# ====================================================
+# 🧪 Shared Test Fixtures
+# ====================================================
+"""Fixtures for the test suite.
+
+Tests marked by the `mongo_db` fixture run against a real mongod and are
+skipped when none is reachable:
+
+    MONGO_TEST_URI    default mongodb://localhost:27017
+
+Each test gets its own scratch database, dropped afterwards.
+"""
+import os
+import uuid
+
+import pymongo
+import pytest
+from pymongo.errors import PyMongoError
+
+
+MONGO_TEST_URI = os.environ.get("MONGO_TEST_URI", "mongodb://localhost:27017")
+
+
+@pytest.fixture(scope="session")
+def mongo_client():
+    client = pymongo.MongoClient(MONGO_TEST_URI, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError as exc:
+        client.close()
+        pytest.skip(f"no mongod reachable at {MONGO_TEST_URI} ({type(exc).__name__})")
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def mongo_db(mongo_client):
+    name = f"BroadbandTest_{uuid.uuid4().hex[:8]}"
+    yield mongo_client[name]
+    mongo_client.drop_database(name)
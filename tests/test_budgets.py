@@ -0,0 +1,41 @@
+"""Every page stays within its query budget (bench.budgets, per backend)
+
+Each check runs `python -m bench.budgets` in its own process: the app's
+repositories and MongoClient are cached per process.
+"""
+import json
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+
+from bench.budgets import BUDGETS_PATH
+from tests.conftest import MONGO_TEST_URI
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_budgets(backend, **env):
+    result = subprocess.run(
+        [sys.executable, "-m", "bench.budgets", "--backend", backend],
+        cwd=ROOT, env={**os.environ, **env}, capture_output=True, text=True, timeout=600)
+    assert result.returncode == 0, result.stdout + result.stderr[-2000:]
+
+
+def test_memory_pages_within_budget():
+    run_budgets("memory")
+
+
+def test_mongo_pages_within_budget(mongo_client):
+    with open(BUDGETS_PATH) as fh:
+        if "mongo" not in json.load(fh):
+            pytest.skip("no mongo budgets recorded — run "
+                        "`python -m bench.budgets --backend mongo --update`")
+    db_name = f"BroadbandBudgets_{uuid.uuid4().hex[:8]}"
+    try:
+        run_budgets("mongo", BENCH_MONGO_URI=MONGO_TEST_URI, BENCH_MONGO_DB=db_name)
+    finally:
+        mongo_client.drop_database(db_name)
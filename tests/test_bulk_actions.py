@@ -0,0 +1,85 @@
+"""Bulk user updates and deletes (chunked) on the memory backend"""
+from datetime import datetime
+
+from repositories import memory_repositories
+from user_search import BULK_CHUNK_SIZE, chunked
+
+
+N_USERS = 2 * BULK_CHUNK_SIZE + 500
+
+
+def seeded():
+    repos = memory_repositories()
+    repos.seed(
+        users=[{"name": f"Customer {i}", "email": f"u{i}@example.com", "password": "x",
+                "role": "customer", "approved": False} for i in range(N_USERS)],
+        subscriptions=[{"user_email": f"u{i}@example.com", "plan_name": f"Plan {i % 2}",
+                        "status": "active" if i % 3 else "stopped"} for i in range(20)])
+    return repos
+
+
+class CountingCalls:
+    """Wraps a repo method and counts its calls"""
+
+    def __init__(self, func):
+        self.func, self.calls = func, 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        return self.func(*args)
+
+
+def test_chunked_keeps_order_and_the_last_partial_chunk():
+    assert [len(c) for c in chunked(range(N_USERS))] == [BULK_CHUNK_SIZE, BULK_CHUNK_SIZE, 500]
+    assert list(chunked(range(5), size=2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked([])) == []
+
+
+def test_bulk_update_writes_one_chunk_per_round_trip():
+    repos = seeded()
+    update_many = repos.users._update_many = CountingCalls(repos.users._update_many)
+    progress = []
+    ids = [u["_id"] for u in repos.users.all()] + [10 ** 9]   # one id that is gone
+
+    matched = repos.users.bulk_update(ids, {"approved": True, "name": "Renamed"},
+                                      progress=lambda done, total: progress.append(done))
+
+    assert matched == N_USERS
+    assert update_many.calls == 3
+    assert progress == [BULK_CHUNK_SIZE, 2 * BULK_CHUNK_SIZE, N_USERS + 1]
+    assert repos.users.count(role="customer", approved=True) == N_USERS
+    # prefix search reads name_lower, so a bulk rename keeps it in step
+    assert {u["name_lower"] for u in repos.users.all()} == {"renamed"}
+
+
+def test_update_matching_skips_excluded_emails():
+    repos = seeded()
+    matched = repos.users.update_matching({"approved": True}, search="customer 1",
+                                          exclude_emails=["u1@example.com"])
+    approved = {u["email"] for u in repos.users.all() if u["approved"]}
+    assert "u1@example.com" not in approved and "u10@example.com" in approved
+    assert matched == len(approved)
+
+
+def test_delete_users_removes_their_subscriptions_and_counters():
+    repos = seeded()
+    history_day = datetime(2024, 6, 1)
+    repos.subscriptions.add_usage_history(
+        [("u0@example.com", "Plan 0", history_day, 1.0, {"0": 1.0})], [], "batch#1")
+    delete_many = repos.users._delete_many = CountingCalls(repos.users._delete_many)
+    doomed = [u["_id"] for u in repos.users.all() if u["email"] in
+              {f"u{i}@example.com" for i in range(0, 20, 2)}]
+
+    users_deleted, subs_removed = repos.delete_users(doomed)
+
+    assert (users_deleted, subs_removed) == (10, 10)
+    assert delete_many.calls == 1
+    assert repos.users.count() == N_USERS - 10
+    assert repos.subscriptions.for_user("u0@example.com") == []
+    assert len(repos.subscriptions.for_user("u1@example.com")) == 1
+    assert repos.subscriptions.usage_history(
+        "u0@example.com", "day", history_day, datetime(2024, 6, 2)) == []
+    # only odd users are left: all of them on Plan 1
+    stats = repos.subscriptions.plan_stats()
+    assert stats.get("Plan 0", {"total": 0})["total"] == 0
+    assert stats["Plan 1"]["total"] == 10
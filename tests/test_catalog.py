@@ -0,0 +1,63 @@
+"""PlanCatalog: reloads after bump() or max_age, derived() follows"""
+import catalog
+from catalog import PlanCatalog
+from repositories import memory_repositories
+
+
+class CountingLoad:
+    def __init__(self, plans):
+        self.plans, self.calls = plans, 0
+
+    def __call__(self):
+        self.calls += 1
+        return [dict(p) for p in self.plans]
+
+
+def test_bump_reloads_the_catalog_and_its_derived_data():
+    load = CountingLoad([{"_id": 1, "name": "Basic", "price": 10}])
+    plans = PlanCatalog(load)
+    builds = []
+
+    def names(all_plans):
+        builds.append(1)
+        return [p["name"] for p in all_plans]
+
+    assert plans.by_name("Basic")["price"] == 10
+    assert plans.derived("names", names) == ["Basic"]
+    assert plans.derived("names", names) == ["Basic"] and plans.price_of("Basic") == 10
+    assert (load.calls, len(builds)) == (1, 1)
+
+    load.plans.append({"_id": 2, "name": "Plus", "price": 20})
+    assert plans.by_name("Plus") is None        # not reloaded until bumped
+    plans.bump()
+    assert plans.by_id(2)["name"] == "Plus"
+    assert plans.derived("names", names) == ["Basic", "Plus"]
+    assert (load.calls, len(builds)) == (2, 2)
+
+
+def test_max_age_reloads_without_a_bump(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(catalog.time, "monotonic", lambda: now[0])
+    load = CountingLoad([{"_id": 1, "name": "Basic", "price": 10}])
+    plans = PlanCatalog(load, max_age=60)
+
+    plans.all()
+    load.plans[0]["price"] = 15                 # edited by another process
+    now[0] += 59
+    assert plans.price_of("Basic") == 10 and load.calls == 1
+    now[0] += 2
+    assert plans.price_of("Basic") == 15 and load.calls == 2
+
+
+def test_plan_writes_bump_the_repo_catalog():
+    repos = memory_repositories()
+    repos.seed(plans=[{"name": "Basic", "price": 10}])
+    assert repos.plans.by_name("Basic")["price"] == 10
+    plan_id = repos.plans.by_name("Basic")["_id"]
+
+    repos.plans.update(plan_id, {"price": 12})
+    assert repos.plans.by_name("Basic")["price"] == 12
+    repos.plans.create({"name": "Plus", "price": 20})
+    assert [p["name"] for p in repos.plans.all()] == ["Basic", "Plus"]
+    repos.plans.delete(plan_id)
+    assert repos.plans.by_name("Basic") is None
@@ -0,0 +1,43 @@
+"""churn: train, score and store on synthetic data (memory backend)"""
+from datetime import datetime
+
+from churn import TOP_RISK_LIMIT, load_model, run_scoring, score_customers, train
+from kpis import synthetic_data
+from repositories import memory_repositories
+
+
+def seeded_repos(n_subs=900):
+    plans, subs = synthetic_data(n_plans=12, n_subs=n_subs)
+    emails = sorted({s["user_email"] for s in subs})
+    users = [{"name": email.split("@")[0], "email": email, "password": "x",
+              "role": "customer", "approved": True} for email in emails]
+    users.append({"name": "Gone", "email": "gone@example.com", "password": "x",
+                  "role": "customer", "approved": True, "churn_score": 0.99,
+                  "churn_scored_at": datetime(2020, 1, 1)})
+    repos = memory_repositories()
+    repos.seed(users=users, plans=plans, subscriptions=subs)
+    return repos, subs
+
+
+def test_train_score_and_top_risk(tmp_path):
+    repos, subs = seeded_repos()
+    path = str(tmp_path / "churn.joblib")
+
+    meta = train(repos, path, batch_size=200)
+    assert meta["rows"] == len(subs) and 0 <= meta["auc"] <= 1
+    assert 0 < meta["ended_share"] < 1
+
+    scores = score_customers(repos, load_model(path), batch_size=200)
+    open_customers = {s["user_email"] for s in subs if s["status"] == "active"}
+    assert set(scores.index) == open_customers
+    assert scores.between(0, 1).all()
+
+    written, timings = run_scoring(repos, path, batch_size=200)
+    assert written == len(open_customers) and set(timings) == {"score", "write"}
+    # a customer this run did not score loses the stale score
+    assert "churn_score" not in repos.users.by_email("gone@example.com")
+
+    top = repos.users.top_churn_risk(TOP_RISK_LIMIT)
+    assert [u["churn_score"] for u in top] == \
+        sorted(scores.round(4).tolist(), reverse=True)[:TOP_RISK_LIMIT]
+    assert len(top) == TOP_RISK_LIMIT and all(u["email"] in open_customers for u in top)
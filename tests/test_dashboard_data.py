@@ -0,0 +1,64 @@
+"""dashboard_data.fetch on a pool of one worker"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import dashboard_data
+from dashboard_data import fetch
+
+
+@pytest.fixture
+def busy_pool(monkeypatch):
+    """A one-thread pool whose only worker is blocked until the test ends"""
+    pool = ThreadPoolExecutor(max_workers=1)
+    release, started = threading.Event(), threading.Event()
+    pool.submit(lambda: (started.set(), release.wait(10)))
+    started.wait(10)
+    monkeypatch.setattr(dashboard_data, "_pool", pool)
+    yield pool
+    release.set()
+    pool.shutdown()
+
+
+def query(value, ran):
+    def run():
+        ran.append((value, threading.current_thread().name))
+        return value
+    return run
+
+
+def test_queued_queries_run_inline_in_declaration_order(busy_pool):
+    ran = []
+    results, timings = fetch("test", {name: query(name, ran) for name in "abc"})
+
+    assert list(results.items()) == [("a", "a"), ("b", "b"), ("c", "c")]
+    assert list(timings) == ["a", "b", "c"]
+    # nothing waited for the blocked worker: every query ran on this thread
+    assert {thread for _, thread in ran} == {threading.current_thread().name}
+    assert sorted(value for value, _ in ran) == ["a", "b", "c"]
+
+
+def broken(message):
+    def run():
+        raise ValueError(message)
+    return run
+
+
+def test_first_declared_failure_is_raised_after_the_others_ran(busy_pool):
+    ran = []
+    # queued queries run inline last-first, so "second" fails before "first"
+    with pytest.raises(ValueError, match="first"):
+        fetch("test", {"a": query("a", ran), "first": broken("first"),
+                       "second": broken("second"), "c": query("c", ran)})
+    assert sorted(value for value, _ in ran) == ["a", "c"]
+
+
+def test_idle_pool_returns_results_by_name(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(dashboard_data, "_pool", pool)
+    ran = []
+    results, _ = fetch("test", {name: query(name.upper(), ran) for name in "abcd"})
+    pool.shutdown()
+    assert results == {"a": "A", "b": "B", "c": "C", "d": "D"}
+    assert list(results) == list("abcd") and len(ran) == 4
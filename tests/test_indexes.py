@@ -0,0 +1,25 @@
+"""Every query shape the app sends is index-backed (explain(), no COLLSCAN)"""
+from bench import synthetic
+from indexes import (
+    INDEXES, QUERY_SHAPES, ensure_indexes, index_drift, pipeline_shapes, uncovered_pipelines,
+    uncovered_queries)
+
+
+def test_query_shapes_target_indexed_collections():
+    assert {collection for collection, _, _ in QUERY_SHAPES} <= set(INDEXES)
+    assert {collection for collection, _, _ in pipeline_shapes()} <= set(INDEXES)
+
+
+def test_no_query_shape_needs_a_collection_scan(mongo_db):
+    plans = list(synthetic.plans(12))
+    # the plans pipeline_shapes() asks for, so their $lookups actually run
+    plans[0]["name"], plans[1]["name"] = "Monthly Basic", "Yearly Pro"
+    mongo_db["users"].insert_many(list(synthetic.users(60)))
+    mongo_db["plans"].insert_many(plans)
+    mongo_db["CustomerPlans"].insert_many(list(synthetic.subscriptions(600, plans, 60)))
+    assert ensure_indexes(mongo_db) == {}
+
+    for collection_name, entry in index_drift(mongo_db).items():
+        assert entry["missing"] == [] and entry["changed"] == [], collection_name
+    assert uncovered_queries(mongo_db) == []
+    assert uncovered_pipelines(mongo_db) == []
@@ -0,0 +1,27 @@
+"""kpi_pipeline against the original per-subscription loop (kpis.reference_kpis)"""
+import pytest
+
+import kpis
+from repositories import memory_repositories
+
+
+@pytest.mark.parametrize("seed", [7, 11])
+def test_pipeline_matches_reference_loop(mongo_db, seed):
+    assert kpis.check_against_reference(mongo_db, n_plans=40, n_subs=3000, seed=seed) == []
+
+
+def test_pipeline_on_empty_collections(mongo_db):
+    assert kpis.load_admin_kpis(mongo_db["CustomerPlans"], mongo_db["plans"]) == kpis.empty_kpis()
+
+
+@pytest.mark.parametrize("seed", [7, 11])
+def test_memory_backend_matches_reference_loop(seed):
+    plans, subs = kpis.synthetic_data(n_plans=40, n_subs=3000, seed=seed)
+    repos = memory_repositories()
+    repos.seed(plans=plans, subscriptions=subs)
+
+    expected = kpis.reference_kpis(plans, subs)
+    actual = repos.subscriptions.admin_kpis()
+    for key in ("subscriptions", "total_revenue", "active_revenue", "by_plan"):
+        assert actual[key] == expected[key], key
+    assert kpis.analytics_rows(plans, actual) == kpis.analytics_rows(plans, expected)
@@ -0,0 +1,103 @@
+"""plan_import: chunk validation, dedup, insert vs upsert, file round trips"""
+import io
+
+import pandas as pd
+import pytest
+
+from plan_import import export_plans, import_plans, validate_chunk
+from repositories import memory_repositories
+
+
+PLANS_CSV = """name,price,valid_data,speed,validity_days,duration_type,plan_type
+Monthly Basic,199,50,50 Mbps,30,Monthly,Normal
+Yearly Pro,4999,1000,1 Gbps,365,Yearly,Offer
+,100,10,10 Mbps,30,Monthly,Normal
+Cheap,-5,10,10 Mbps,30,Monthly,Normal
+Odd Days,100,10,10 Mbps,2.5,Weekly,Normal
+Monthly Basic,249,60,50 Mbps,30,Monthly,Normal
+Quarterly Lite,499,150,100 Mbps,90,,
+"""
+
+
+class CountingPlans:
+    """Plans repo that counts its existing_names() round trips"""
+
+    def __init__(self, plans):
+        self.plans = plans
+        self.lookups = 0
+
+    def __getattr__(self, name):
+        return getattr(self.plans, name)
+
+    def existing_names(self, names):
+        self.lookups += 1
+        return self.plans.existing_names(names)
+
+
+def source(text=PLANS_CSV):
+    return io.StringIO(text)
+
+
+def test_validate_chunk_reports_every_bad_row():
+    clean, rejected = validate_chunk(pd.read_csv(source()))
+    assert list(clean["name"]) == ["Monthly Basic", "Yearly Pro", "Monthly Basic",
+                                   "Quarterly Lite"]
+    errors = dict(zip(rejected.index, rejected["error"]))
+    assert errors[2] == "name is empty"
+    assert errors[3] == "price must be a number ≥ 0"
+    assert errors[4] == ("validity_days must be a whole number ≥ 1; "
+                         "duration_type must be one of Monthly, Quarterly, Yearly")
+    lite = clean.iloc[-1]
+    assert (lite["duration_type"], lite["plan_type"]) == ("Monthly", "Normal")
+
+
+def test_validate_chunk_needs_the_required_columns():
+    with pytest.raises(ValueError, match="validity_days"):
+        validate_chunk(pd.DataFrame({"name": ["x"], "price": [1], "valid_data": [1],
+                                     "speed": ["1 Mbps"]}))
+
+
+def test_import_skips_in_file_duplicates_and_existing_names():
+    repos = memory_repositories()
+    repos.plans.create({"name": "Yearly Pro", "price": 1, "valid_data": 1,
+                        "speed": "1 Mbps", "validity_days": 1})
+    plans = CountingPlans(repos.plans)
+
+    summary = import_plans(plans, source(), "csv", chunksize=3)
+
+    assert (summary["read"], summary["inserted"], summary["skipped"], summary["invalid"]) == \
+        (7, 2, 1, 4)
+    assert {"row": 6, "name": "Monthly Basic",
+            "error": "name repeated earlier in the file"} in summary["errors"]
+    assert plans.lookups == 2      # one $in per chunk; rows 4-6 are all rejected
+    assert repos.plans.by_name("Yearly Pro")["price"] == 1
+
+
+def test_upsert_updates_existing_plans():
+    repos = memory_repositories()
+    repos.plans.create({"name": "Yearly Pro", "price": 1, "valid_data": 1,
+                        "speed": "1 Mbps", "validity_days": 1})
+
+    summary = import_plans(repos.plans, source(), "csv", upsert=True)
+
+    assert (summary["inserted"], summary["updated"]) == (2, 1)
+    assert repos.plans.by_name("Yearly Pro")["price"] == 4999
+    assert repos.plans.by_name("Monthly Basic")["price"] == 199
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_export_then_import_round_trip(fmt):
+    source_repos = memory_repositories()
+    import_plans(source_repos.plans, source(), "csv")
+    buffer = io.BytesIO()
+    assert export_plans(source_repos.plans.all(), buffer, fmt, chunksize=2) == 3
+
+    buffer.seek(0)
+    target = memory_repositories()
+    summary = import_plans(target.plans, buffer, fmt, chunksize=2)
+    assert (summary["inserted"], summary["invalid"]) == (3, 0)
+    columns = ["name", "price", "valid_data", "speed", "validity_days", "duration_type",
+               "plan_type"]
+    exported = sorted(tuple(p[c] for c in columns) for p in target.plans.all())
+    original = sorted(tuple(p[c] for c in columns) for p in source_repos.plans.all())
+    assert exported == original
@@ -0,0 +1,46 @@
+"""rebuild_plan_stats() and stats_drift() against a scratch mongod"""
+from plan_stats import (
+    STATS_COLLECTION, load_plan_stats, rebuild_plan_stats, record_subscribe, stats_drift)
+
+
+def seed(db):
+    db["CustomerPlans"].insert_many([
+        {"user_email": f"u{i}@example.com", "plan_name": f"Plan {i % 3}",
+         "status": "active" if i % 2 else "stopped"}
+        for i in range(30)])
+
+
+class BusyCustomers:
+    """CustomerPlans whose counters move while every aggregation runs"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.database = collection.database
+
+    def aggregate(self, pipeline):
+        result = self.collection.aggregate(pipeline)
+        record_subscribe(self.database[STATS_COLLECTION], "Plan 0")
+        return result
+
+
+def test_rebuild_clears_drift_and_drift_is_flagged_again(mongo_db):
+    seed(mongo_db)
+    assert set(stats_drift(mongo_db)) == {"Plan 0", "Plan 1", "Plan 2"}
+
+    assert rebuild_plan_stats(mongo_db["CustomerPlans"]) is True
+    assert stats_drift(mongo_db) == {}
+    assert "plan_stats_rebuild" not in mongo_db.list_collection_names()
+
+    record_subscribe(mongo_db[STATS_COLLECTION], "Plan 1")
+    assert set(stats_drift(mongo_db)) == {"Plan 1"}
+
+
+def test_rebuild_does_not_overwrite_counters_that_moved(mongo_db):
+    seed(mongo_db)
+    rebuild_plan_stats(mongo_db["CustomerPlans"])
+    before = load_plan_stats(mongo_db[STATS_COLLECTION])
+
+    assert rebuild_plan_stats(BusyCustomers(mongo_db["CustomerPlans"])) is False
+    after = load_plan_stats(mongo_db[STATS_COLLECTION])
+    assert after["Plan 0"]["total"] == before["Plan 0"]["total"] + 3
+    assert "plan_stats_rebuild" not in mongo_db.list_collection_names()
@@ -0,0 +1,52 @@
+"""query_monitor keeps query shapes, not values"""
+from types import SimpleNamespace
+
+import query_monitor
+from query_monitor import QueryMonitor, repeated_queries
+
+
+def event(command_name, command, request_id):
+    return SimpleNamespace(command_name=command_name, command=command, connection_id=1,
+                           request_id=request_id, duration_micros=1000, reply={"n": 1})
+
+
+def run(monitor, *events):
+    rerun = monitor.start_rerun("session")
+    try:
+        for item in events:
+            monitor.started(item)
+            monitor.succeeded(item)
+    finally:
+        monitor.finish_rerun()
+    return rerun
+
+
+def test_signature_hides_filter_and_update_values():
+    rerun = run(QueryMonitor(), event("update", {
+        "update": "users",
+        "updates": [{"q": {"email": "ann@example.com"},
+                     "u": {"$set": {"password": "$2b$12$secrethash"}}}]}, 1))
+    signature = rerun["commands"][0]["signature"]
+    assert "ann@example.com" not in signature and "secrethash" not in signature
+    assert '"email": "?"' in signature and '"password": "?"' in signature
+
+
+def test_repeats_need_the_same_values():
+    def find(email, request_id):
+        return event("find", {"find": "users", "filter": {"email": email}}, request_id)
+
+    rerun = run(QueryMonitor(), find("a@b.c", 1), find("d@e.f", 2), find("a@b.c", 3))
+    assert [(count, signature) for signature, count, _ in repeated_queries(rerun)] == [
+        (2, 'find users {"filter": {"email": "?"}}')]
+
+
+def test_fragment_rerun_continues_a_callback_record():
+    query_monitor.start_callback("fragment-session")
+    assert not query_monitor.recording()
+    with query_monitor.fragment_rerun("fragment-session", "Admin · 👥 Users · fragment"):
+        assert query_monitor.recording()
+    assert not query_monitor.recording()
+
+    [rerun] = query_monitor.MONITOR.recent("fragment-session")
+    assert rerun["section"] == "Admin · 👥 Users · fragment"
+    assert rerun["wall_ms"] is not None and "callback" not in rerun
@@ -0,0 +1,24 @@
+"""PlanRecommender.recommend on plans with missing or non-numeric fields"""
+from recommender import PlanRecommender, upgrade_bar
+
+
+PLANS = [
+    {"name": "Basic", "price": 10, "valid_data": 50, "validity_days": 30, "speed": "50 Mbps"},
+    {"name": "Plus", "price": 20, "valid_data": 100, "validity_days": 30, "speed": "50 Mbps"},
+    {"name": "Max", "price": 40, "valid_data": 500, "validity_days": 90, "speed": "1 Gbps"},
+    {"name": "Legacy", "price": 5, "valid_data": None, "validity_days": "30 days",
+     "speed": "10 Mbps"},
+]
+
+
+def test_upgrade_bar_ignores_non_numeric_values():
+    assert upgrade_bar([PLANS[3]]) == (0, 0)
+    assert upgrade_bar([PLANS[1], PLANS[3], {"name": "Bare"}]) == (100, 30)
+    assert upgrade_bar([]) == (0, 0)
+
+
+def test_recommend_with_non_numeric_current_plan():
+    recommender = PlanRecommender(PLANS)
+    names = {p["name"] for p in recommender.recommend([PLANS[3], PLANS[1]])}
+    assert names == {"Max"}
+    assert "Legacy" not in {p["name"] for p in recommender.recommend([PLANS[3]])}
@@ -0,0 +1,53 @@
+"""export_rows() + write_export() on the memory backend"""
+import io
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from repositories import memory_repositories
+from subscription_export import EXPORT_COLUMNS, write_export
+
+
+def seeded():
+    repos = memory_repositories()
+    repos.seed(
+        users=[{"name": "Ann", "email": "ann@example.com", "password": "x",
+                "role": "customer", "approved": True}],
+        plans=[{"name": "Monthly Basic", "price": 199, "valid_data": 50,
+                "speed": "50 Mbps", "validity_days": 30}],
+        subscriptions=[
+            {"user_email": "ann@example.com", "plan_name": "Monthly Basic",
+             "status": "active", "usage_gb": 1.5, "subscribed_on": datetime(2024, 6, 1)},
+            {"user_email": "gone@example.com", "plan_name": "Retired Plan",
+             "usage_gb": 0},
+        ])
+    return repos
+
+
+def read(buffer, fmt):
+    buffer.seek(0)
+    return pd.read_csv(buffer) if fmt == "csv" else pd.read_parquet(buffer)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_export_joins_user_name_and_plan_price(fmt):
+    buffer, progress = io.BytesIO(), []
+    rows = write_export(seeded().subscriptions.export_rows(), buffer, fmt, chunksize=1,
+                        progress=lambda done, rate: progress.append(done))
+
+    frame = read(buffer, fmt).sort_values("user_email", ignore_index=True)
+    assert rows == 2 and progress[-1] == 2
+    assert list(frame.columns) == EXPORT_COLUMNS
+    ann, gone = frame.to_dict("records")
+    assert (ann["user_name"], ann["plan_price"], ann["status"]) == ("Ann", 199, "active")
+    assert pd.Timestamp(ann["subscribed_on"]) == pd.Timestamp("2024-06-01")
+    # a deleted user / plan leaves empty cells, and no status means active
+    assert pd.isna(gone["user_name"]) and pd.isna(gone["plan_price"])
+    assert gone["status"] == "active"
+
+
+def test_empty_export_still_has_a_header():
+    buffer = io.BytesIO()
+    assert write_export(memory_repositories().subscriptions.export_rows(), buffer, "csv") == 0
+    assert list(read(buffer, "csv").columns) == EXPORT_COLUMNS
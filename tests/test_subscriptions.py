@@ -0,0 +1,44 @@
+"""first_subscriber_pages() returns what subscriber_page() does, per plan"""
+import pytest
+
+from bench import synthetic
+from indexes import ensure_indexes
+from repositories import memory_repositories, mongo_repositories
+
+
+def documents():
+    plans = list(synthetic.plans(12))
+    return (list(synthetic.users(60)), plans,
+            list(synthetic.subscriptions(600, plans, 60)))
+
+
+def check_first_pages(repos, plan_names):
+    for status_filter in ("All", "Active", "Inactive"):
+        for page_size in (5, 100):
+            pages = repos.subscriptions.first_subscriber_pages(
+                plan_names + ["No Such Plan"], status_filter, page_size)
+            for name in plan_names:
+                expected = repos.subscriptions.subscriber_page(
+                    name, status_filter, None, page_size)
+                assert pages.get(name, ([], None)) == expected, (name, status_filter, page_size)
+            assert pages.get("No Such Plan", ([], None)) == ([], None)
+
+
+def test_memory_first_pages_match_subscriber_page():
+    users, plans, subs = documents()
+    repos = memory_repositories()
+    repos.seed(users=users, plans=plans, subscriptions=subs)
+    check_first_pages(repos, [plan["name"] for plan in plans])
+
+
+def test_mongo_first_pages_match_subscriber_page(mongo_db):
+    users, plans, subs = documents()
+    mongo_db["users"].insert_many([dict(u) for u in users])
+    mongo_db["plans"].insert_many([dict(p) for p in plans])
+    mongo_db["CustomerPlans"].insert_many([dict(s) for s in subs])
+    ensure_indexes(mongo_db)
+    check_first_pages(mongo_repositories(mongo_db), [plan["name"] for plan in plans])
+
+
+def test_no_plans_no_query():
+    assert memory_repositories().subscriptions.first_subscriber_pages([]) == {}
@@ -0,0 +1,80 @@
+"""usage_ingest: timestamp parsing and replays"""
+import io
+from datetime import datetime
+
+import pandas as pd
+
+from repositories import memory_repositories
+from usage_ingest import BYTES_PER_GB, ingest, parse_events
+
+
+EVENTS_CSV = """user_email,plan_name,bytes,timestamp
+a@example.com,Monthly Basic,{gb},1717200000
+a@example.com,Monthly Basic,{gb},2024-06-01T01:30:00Z
+a@example.com,Monthly Basic,{gb},not a time
+""".format(gb=BYTES_PER_GB)
+
+
+def test_chunk_mixing_epoch_and_iso_timestamps():
+    events, invalid = parse_events(pd.read_csv(io.StringIO(EVENTS_CSV)))
+    assert invalid == 1
+    assert list(events["timestamp"]) == [pd.Timestamp("2024-06-01 00:00"),
+                                         pd.Timestamp("2024-06-01 01:30")]
+
+
+def test_replayed_batch_is_not_counted_twice():
+    repos = memory_repositories()
+    repos.seed(subscriptions=[{"user_email": "a@example.com", "plan_name": "Monthly Basic",
+                               "status": "active", "usage_gb": 0}])
+    subs = repos.subscriptions
+
+    first = ingest(subs, io.BytesIO(EVENTS_CSV.encode()), "csv", "batch-1")
+    replay = ingest(subs, io.BytesIO(EVENTS_CSV.encode()), "csv", "batch-1")
+
+    assert (first["matched"], first["buckets"], first["invalid"]) == (1, 2, 1)
+    assert replay["already_done"]
+    assert [s["usage_gb"] for s in subs.for_user("a@example.com")] == [2]
+
+
+class CrashAfterHistory:
+    """Subscriptions repo that dies after applying one flush, before the
+    batch ledger records it"""
+
+    def __init__(self, subs, flush_id):
+        self.subs, self.flush_id = subs, flush_id
+
+    def __getattr__(self, name):
+        return getattr(self.subs, name)
+
+    def add_usage_history(self, day_buckets, month_totals, flush_id):
+        self.subs.add_usage_history(day_buckets, month_totals, flush_id)
+        if flush_id == self.flush_id:
+            raise RuntimeError("killed")
+
+
+def test_resumed_flush_is_not_reapplied_after_another_batch():
+    repos = memory_repositories()
+    repos.seed(subscriptions=[{"user_email": "a@example.com", "plan_name": "Monthly Basic",
+                               "status": "active", "usage_gb": 0}])
+    subs = repos.subscriptions
+
+    def events(*hours):
+        return ("user_email,plan_name,bytes,timestamp\n" + "".join(
+            f"a@example.com,Monthly Basic,{BYTES_PER_GB},2024-06-01T0{hour}:00:00Z\n"
+            for hour in hours)).encode()
+
+    batch_a, batch_b = events(0, 1), events(2)
+
+    try:
+        ingest(CrashAfterHistory(subs, "A#2"), io.BytesIO(batch_a), "csv", "A", flush_events=1)
+    except RuntimeError:
+        pass
+    ingest(subs, io.BytesIO(batch_b), "csv", "B", flush_events=1)
+    resumed = ingest(subs, io.BytesIO(batch_a), "csv", "A", flush_events=1)
+
+    assert resumed["skipped_flushes"] == 1 and resumed["matched"] == 0
+    assert [s["usage_gb"] for s in subs.for_user("a@example.com")] == [3]
+    start, end = datetime(2024, 6, 1), datetime(2024, 7, 1)
+    days = subs.usage_history("a@example.com", "day", start, end)
+    months = subs.usage_history("a@example.com", "month", start, end)
+    assert [d["usage_gb"] for d in days] == [3] and [m["usage_gb"] for m in months] == [3]
@@ -0,0 +1,74 @@
+"""Users tab search: prefix escaping, pending semantics, keyset pages"""
+import re
+
+from repositories import memory_repositories
+from user_search import user_matches, user_query
+
+
+def user(name, email, approved=False, role="customer"):
+    doc = {"name": name, "email": email, "password": "x", "role": role}
+    if approved is not None:
+        doc["approved"] = approved
+    return doc
+
+
+def seeded(*users):
+    repos = memory_repositories()
+    repos.seed(users=list(users))
+    return repos
+
+
+def names(users):
+    return [u["name"] for u in users]
+
+
+def test_search_is_an_escaped_anchored_prefix():
+    query = user_query("  A.b+(c ")
+    assert query["$or"] == [{"name_lower": {"$regex": "^a\\.b\\+\\(c"}},
+                            {"email": {"$regex": "^A\\.b\\+\\(c"}}]
+    assert re.match(query["$or"][0]["name_lower"]["$regex"], "a.b+(c d")
+    assert not re.match(query["$or"][0]["name_lower"]["$regex"], "axb+(c")
+
+    repos = seeded(user("A.b+(c Smith", "one@example.com"), user("Axb+(c", "two@example.com"),
+                   user("Zed", "a.b+(c@example.com"), user("Zed Two", "za.b+(c@example.com"))
+    users, _ = repos.users.search_page("a.b+(c")
+    assert names(users) == ["A.b+(c Smith", "Zed"]
+
+
+def test_pending_means_approved_is_not_true():
+    assert user_query(approved=False) == {"approved": {"$ne": True}}
+    assert user_query(approved=True) == {"approved": True}
+    missing, falsy, truthy = (user("Missing", "m@x.io", approved=None),
+                              user("Falsy", "f@x.io", approved=0),
+                              user("Truthy", "t@x.io", approved="yes"))
+    # only a real True is approved, as at login
+    assert all(user_matches(u, approved=False) for u in (missing, falsy, truthy))
+
+    repos = seeded(missing, falsy, truthy, user("Approved", "a@x.io", approved=True))
+    assert names(repos.users.search_page(approved=False)[0]) == ["Missing", "Falsy", "Truthy"]
+    assert repos.users.count(role="customer", approved=True) == 1
+
+
+def test_keyset_pages_continue_after_the_cursor():
+    repos = seeded(*[user(f"Ann {i}", f"ann{i}@x.io") for i in range(7)],
+                   user("Bob", "bob@x.io"), user("Admin Ann", "boss@x.io", role="admin"))
+    pages, cursor = [], None
+    while True:
+        users, cursor = repos.users.search_page("ann", role="customer", after_id=cursor,
+                                                page_size=3)
+        pages.append(names(users))
+        if cursor is None:
+            break
+        # a user added mid-paging sorts after every cursor so far
+        if len(pages) == 1:
+            repos.users.create("Ann Late", "late@x.io", "x")
+    assert pages == [["Ann 0", "Ann 1", "Ann 2"], ["Ann 3", "Ann 4", "Ann 5"],
+                     ["Ann 6", "Ann Late"]]
+
+
+def test_excluded_emails_never_match():
+    repos = seeded(user("Ann", "admin@portal.com", role="admin"), user("Ann B", "b@x.io"))
+    users, _ = repos.users.search_page("ann", exclude_emails=("admin@portal.com",))
+    assert names(users) == ["Ann B"]
+    assert user_query(exclude_emails=["admin@portal.com"]) == {
+        "email": {"$nin": ["admin@portal.com"]}}
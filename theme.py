@@ -0,0 +1,48 @@
+# ====================================================
+# 🎨 Portal Theme (static stylesheet)
+# ====================================================
+"""All portal CSS lives in static/portal.css; cards use its classes.
+
+Streamlit drops any element a rerun doesn't emit again, so CSS written
+with st.markdown("<style>…") had to be re-sent on every rerun — once per
+block, and per card when the card carried inline styles. apply() emits
+one element at the top of every rerun instead:
+
+- with static file serving on (.streamlit/config.toml:
+  server.enableStaticServing) a <link> to app/static/portal.css — the
+  browser fetches the stylesheet once per page load, not per rerun, so a
+  rerun costs a few dozen bytes;
+- otherwise the stylesheet inlined once, minified.
+
+`python -m bench.rerun_bytes` measures the bytes each page sends.
+"""
+import functools
+import os
+import re
+
+import streamlit as st
+
+
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "portal.css")
+STATIC_URL = "app/static/portal.css"
+
+
+@functools.lru_cache(maxsize=None)
+def _stylesheet(mtime):
+    """(minified CSS, cache-busting version) for one version of the file"""
+    with open(CSS_PATH) as fh:
+        css = fh.read()
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r" ?([{};:,>]) ?", r"\1", css)
+    return css.strip(), int(mtime)
+
+
+def apply():
+    """Link (or inline) the portal stylesheet; call first on every rerun"""
+    css, version = _stylesheet(os.path.getmtime(CSS_PATH))
+    if st.get_option("server.enableStaticServing"):
+        st.markdown(f'<link rel="stylesheet" href="{STATIC_URL}?v={version}">',
+                    unsafe_allow_html=True)
+    else:
+        st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
@@ -0,0 +1,181 @@
+# ====================================================
+# 🕒 Usage History (bucketed, with rollups)
+# ====================================================
+"""Usage over time per user and plan, for the Usage Trends chart.
+
+Ingestion writes two levels into the `usage_history` collection, both with
+`$inc` upserts from the same flush that feeds `usage_gb`:
+- "day" buckets: one document per (user, plan, day) holding the day total
+  (`usage_gb`, the daily rollup) and the 24 hourly values (`hours.0` … `hours.23`),
+- "month" rollups: one document per (user, plan, month) with the month total.
+
+A chart reads only the level that suits its date range (see level_for()),
+so a one-year view is ~365 day totals per plan, never raw events.
+
+    {"user_email", "plan_name", "level": "day" | "month", "start",
+     "usage_gb", "hours": {"0": gb, ...} (day only),
+     "flushes": [the last APPLIED_FLUSHES flush ids applied]}
+"""
+import pandas as pd
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+
+USAGE_HISTORY = "usage_history"
+HOURLY_MAX_DAYS = 3     # ≤ 72 points per plan
+DAILY_MAX_DAYS = 400    # a year of day totals; longer ranges use months
+LEVEL_LABELS = {"hour": "Hourly", "day": "Daily", "month": "Monthly"}
+# flush ids remembered per document (subscription or bucket): a resumed
+# flush is skipped as long as fewer other flushes reached it in between
+APPLIED_FLUSHES = 32
+
+
+def level_for(start, end):
+    """Resolution for [start, end): "hour", "day" or "month" """
+    days = (end - start).days
+    if days <= HOURLY_MAX_DAYS:
+        return "hour"
+    if days <= DAILY_MAX_DAYS:
+        return "day"
+    return "month"
+
+
+def stored_level(level):
+    """Hourly values live inside the day buckets"""
+    return "day" if level == "hour" else level
+
+
+def range_start(start, level):
+    """Start of the first stored document that overlaps [start, …)"""
+    start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    return start.replace(day=1) if level == "month" else start
+
+
+def history_query(email, level, start, end):
+    """(filter, projection) for a user's documents of one chart level"""
+    query = {"user_email": email, "level": stored_level(level),
+             "start": {"$gte": range_start(start, level), "$lt": end}}
+    projection = {"_id": 0, "plan_name": 1, "start": 1, "usage_gb": 1}
+    if level == "hour":
+        projection["hours"] = 1
+    return query, projection
+
+
+# ====================================================
+# ➕ Rollups (from one chunk of parsed events)
+# ====================================================
+def _datetimes(series):
+    """datetime objects of a datetime64 column, without a Timestamp per row"""
+    return series.to_numpy().astype("datetime64[us]").tolist()
+
+
+def rollups(events, bytes_per_gb):
+    """(day_buckets, month_totals) from valid events.
+
+    events: DataFrame of user_email, plan_name, bytes, timestamp.
+    day_buckets:  [(user_email, plan_name, day, usage_gb, {hour: gb})]
+    month_totals: [(user_email, plan_name, month, usage_gb)]
+    """
+    if events.empty:
+        return [], []
+    hourly = (events.assign(hour=events["timestamp"].dt.floor("h"))
+              .groupby(["user_email", "plan_name", "hour"], sort=False)["bytes"].sum()
+              .reset_index())
+    hourly["gb"] = hourly.pop("bytes") / bytes_per_gb
+    hourly["day"] = hourly["hour"].dt.floor("D")
+    hourly["hour"] = hourly["hour"].dt.hour.astype(str)
+
+    # one pass of plain Python over the hourly sums fills each day bucket
+    # (tolist() first — iterating Arrow-backed columns is far slower)
+    days = {}
+    for email, plan_name, day, hour, gb in zip(
+            hourly["user_email"].tolist(), hourly["plan_name"].tolist(),
+            _datetimes(hourly["day"]), hourly["hour"].tolist(), hourly["gb"].tolist()):
+        bucket = days.get((email, plan_name, day))
+        if bucket is None:
+            bucket = days[(email, plan_name, day)] = [0.0, {}]
+        bucket[0] += gb
+        bucket[1][hour] = gb
+    day_buckets = [(email, plan_name, day, total, hours)
+                   for (email, plan_name, day), (total, hours) in days.items()]
+
+    monthly = hourly.groupby(
+        ["user_email", "plan_name", hourly["day"].to_numpy().astype("datetime64[M]")],
+        sort=False)["gb"].sum()
+    month_keys = monthly.index.to_frame(index=False)
+    month_totals = list(zip(month_keys["user_email"].tolist(),
+                            month_keys["plan_name"].tolist(),
+                            _datetimes(month_keys.iloc[:, 2]), monthly.tolist()))
+    return day_buckets, month_totals
+
+
+# ====================================================
+# 🍃 Mongo Writes
+# ====================================================
+def remember_flush(flush_id):
+    """$push that appends flush_id to a document's last APPLIED_FLUSHES"""
+    return {"$each": [flush_id], "$slice": -APPLIED_FLUSHES}
+
+
+def applied(flushes, flush_id):
+    """Memory-backend counterpart of the {"$ne": flush_id} array guard"""
+    return flush_id in (flushes or ())
+
+
+def add_flush(flushes, flush_id):
+    """Memory-backend counterpart of remember_flush()"""
+    return ((flushes or []) + [flush_id])[-APPLIED_FLUSHES:]
+
+
+def bucket_update(email, plan_name, level, start, usage_gb, flush_id, hours=None):
+    """$inc upsert that skips a document this flush already reached"""
+    inc = {"usage_gb": usage_gb}
+    for hour, gb in (hours or {}).items():
+        inc[f"hours.{hour}"] = gb
+    return UpdateOne(
+        {"user_email": email, "level": level, "start": start, "plan_name": plan_name,
+         "flushes": {"$ne": flush_id}},
+        {"$inc": inc, "$push": {"flushes": remember_flush(flush_id)}}, upsert=True)
+
+
+def history_ops(day_buckets, month_totals, flush_id):
+    ops = [bucket_update(email, plan_name, "day", day, gb, flush_id, hours)
+           for email, plan_name, day, gb, hours in day_buckets]
+    ops.extend(bucket_update(email, plan_name, "month", month, gb, flush_id)
+               for email, plan_name, month, gb in month_totals)
+    return ops
+
+
+def write_history(collection, ops):
+    """One unordered bulk_write of bucket upserts.
+
+    On a replayed flush, a document that already has it does not match the
+    filter, so its upsert hits the unique index — that duplicate key error
+    is the "already applied" answer, anything else is raised.
+    """
+    if not ops:
+        return
+    try:
+        collection.bulk_write(ops, ordered=False)
+    except BulkWriteError as exc:
+        if exc.details.get("writeConcernErrors") or any(
+                error["code"] != 11000 for error in exc.details["writeErrors"]):
+            raise
+
+
+# ====================================================
+# 📈 Chart Points
+# ====================================================
+def history_frame(docs, level, start, end):
+    """Plan / Time / Used Data (GB) rows for the chart, in time order"""
+    rows = []
+    for doc in docs:
+        if level == "hour":
+            for hour, gb in (doc.get("hours") or {}).items():
+                at = doc["start"] + pd.Timedelta(hours=int(hour))
+                if start <= at < end:
+                    rows.append((doc["plan_name"], at, gb))
+        else:
+            rows.append((doc["plan_name"], doc["start"], doc.get("usage_gb", 0)))
+    frame = pd.DataFrame(rows, columns=["Plan", "Time", "Used Data (GB)"])
+    return frame.sort_values(["Plan", "Time"], ignore_index=True)
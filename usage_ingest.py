@@ -0,0 +1,231 @@
+# ====================================================
+# 📶 Usage Ingestion (network usage → usage_gb)
+# ====================================================
+"""Feed CustomerPlans.usage_gb from network usage events.
+
+Events are rows of (user_email, plan_name, bytes, timestamp) in CSV or JSON
+lines, from files or stdin. They are read in chunks of --flush-events rows;
+each chunk is summed per subscription with one pandas groupby and flushed
+as a single unordered bulk_write of `$inc` updates on the user's open
+(active/stopped) subscription to that plan. The same flush adds the events
+to the hourly/daily buckets and monthly rollups of usage_history.py.
+
+Re-running the same batch never double counts:
+- the `usage_batches` ledger records how many flushes of a batch are done,
+  so a rerun skips them (and skips finished batches entirely);
+- every updated subscription (and history bucket) remembers the last
+  APPLIED_FLUSHES flushes applied to it, so a flush interrupted half-way is
+  not applied twice when resumed, even if other batches reached the same
+  documents in between (up to APPLIED_FLUSHES of them).
+Flush boundaries must line up on a rerun, so a batch keeps the
+--flush-events it was started with.
+
+    python usage_ingest.py events.csv more-events.jsonl
+    cat events.jsonl | python usage_ingest.py - --format jsonl --batch-id 2024-06-01
+    python usage_ingest.py events.csv --flush-events 500000
+"""
+import argparse
+import contextlib
+import gc
+import hashlib
+import os
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from tabular_io import READ_FORMATS, format_of, read_chunks
+from usage_history import rollups
+
+
+USAGE_BATCHES = "usage_batches"
+EVENT_COLUMNS = ["user_email", "plan_name", "bytes", "timestamp"]
+BYTES_PER_GB = 1024 ** 3
+DEFAULT_FLUSH_EVENTS = 200_000
+
+
+# ====================================================
+# ➕ Aggregation (vectorised, one chunk at a time)
+# ====================================================
+def event_times(series):
+    """UTC timestamps (naive, as Mongo stores them) from ISO strings or epoch
+    seconds, parsed per value — a chunk may mix both"""
+    numeric = pd.to_numeric(series, errors="coerce")
+    times = pd.to_datetime(numeric, unit="s", utc=True, errors="coerce").dt.as_unit("us")
+    text = numeric.isna() & series.notna()
+    if text.any():
+        times[text] = pd.to_datetime(series[text], utc=True, errors="coerce",
+                                     format="ISO8601").dt.as_unit("us")
+    return times.dt.tz_convert(None)
+
+
+def parse_events(chunk):
+    """(valid events DataFrame, invalid event count)"""
+    missing = [c for c in EVENT_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"missing column(s): {', '.join(missing)}")
+
+    events = pd.DataFrame({
+        "user_email": chunk["user_email"],
+        "plan_name": chunk["plan_name"],
+        "bytes": pd.to_numeric(chunk["bytes"], errors="coerce"),
+        "timestamp": event_times(chunk["timestamp"]),
+    })
+    valid = (events["user_email"].notna() & events["plan_name"].notna()
+             & events["bytes"].notna() & (events["bytes"] >= 0)
+             & events["timestamp"].notna())
+    return events[valid], int((~valid).sum())
+
+
+def aggregate_events(events):
+    """Per-subscription totals, indexed by (user_email, plan_name), with
+    columns `usage_gb` and `last_event_at`"""
+    totals = (events
+              .groupby(["user_email", "plan_name"], sort=False)
+              .agg(bytes=("bytes", "sum"), last_event_at=("timestamp", "max")))
+    totals["usage_gb"] = totals.pop("bytes") / BYTES_PER_GB
+    return totals
+
+
+def increments(totals):
+    """[(user_email, plan_name, usage_gb, last_event_at)] for the repo"""
+    return [
+        (email, plan_name, float(gb), last.to_pydatetime())
+        for (email, plan_name), gb, last in zip(
+            totals.index, totals["usage_gb"], totals["last_event_at"])
+    ]
+
+
+# ====================================================
+# 📥 Batches
+# ====================================================
+def file_batch_id(path):
+    """Default batch id: file name + content hash (same file → same batch)"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return f"{os.path.basename(path)}:{digest.hexdigest()[:16]}"
+
+
+@contextlib.contextmanager
+def paused_gc():
+    """No cyclic GC while a flush builds its (acyclic) buckets and updates:
+    with millions of live documents, the collections it triggers cost about
+    as much as the flush itself"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def empty_summary(batch_id):
+    return {"batch_id": batch_id, "events": 0, "invalid": 0, "flushes": 0,
+            "skipped_flushes": 0, "subscriptions": 0, "matched": 0,
+            "buckets": 0, "already_done": False}
+
+
+def ingest(subs_repo, source, fmt, batch_id, flush_events=DEFAULT_FLUSH_EVENTS,
+           progress=None):
+    """Apply one batch of usage events; returns a summary dict.
+
+    progress(summary) is called after every flush.
+    """
+    summary = empty_summary(batch_id)
+    state = subs_repo.usage_batch(batch_id) or {}
+    if state.get("done"):
+        summary["already_done"] = True
+        return summary
+
+    # a resumed batch must split into the same flushes as before
+    flush_events = state.get("flush_events", flush_events)
+    done_flushes = state.get("flushes", 0)
+    if not state:
+        subs_repo.mark_usage_batch(batch_id, flush_events=flush_events, flushes=0,
+                                   started_at=datetime.now())
+
+    for seq, chunk in enumerate(read_chunks(source, fmt, flush_events), 1):
+        summary["events"] += len(chunk)
+        if seq <= done_flushes:
+            summary["skipped_flushes"] += 1
+            continue
+        flush_id = f"{batch_id}#{seq}"
+        with paused_gc():
+            events, invalid = parse_events(chunk)
+            totals = aggregate_events(events)
+            summary["invalid"] += invalid
+            summary["subscriptions"] += len(totals)
+            summary["matched"] += subs_repo.add_usage(increments(totals), flush_id)
+            day_buckets, month_totals = rollups(events, BYTES_PER_GB)
+            subs_repo.add_usage_history(day_buckets, month_totals, flush_id)
+        summary["buckets"] += len(day_buckets) + len(month_totals)
+        summary["flushes"] += 1
+        subs_repo.mark_usage_batch(batch_id, flushes=seq)
+        if progress:
+            progress(summary)
+
+    subs_repo.mark_usage_batch(batch_id, done=True, events=summary["events"],
+                               finished_at=datetime.now())
+    return summary
+
+
+# ====================================================
+# 🖥️ CLI
+# ====================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest network usage events")
+    parser.add_argument("paths", nargs="+", help="event files (.csv / .jsonl), or - for stdin")
+    parser.add_argument("--format", choices=READ_FORMATS,
+                        help="input format (needed for stdin; default: from extension)")
+    parser.add_argument("--batch-id",
+                        help="idempotency key (default: file name + content hash; "
+                             "required for stdin)")
+    parser.add_argument("--flush-events", type=int, default=DEFAULT_FLUSH_EVENTS,
+                        help="events aggregated per bulk_write")
+    args = parser.parse_args(argv)
+
+    if "-" in args.paths and (not args.batch_id or not args.format):
+        parser.error("reading stdin needs --batch-id and --format")
+    if args.batch_id and len(args.paths) > 1:
+        parser.error("--batch-id names a single input")
+
+    from db import get_db
+    from repositories import mongo_repositories
+
+    repos = mongo_repositories(get_db())
+    # the unique usage_history index is what makes a replayed flush a no-op
+    repos.bootstrap()
+    subs_repo = repos.subscriptions
+    status = 0
+    for path in args.paths:
+        start = time.perf_counter()
+        source = sys.stdin.buffer if path == "-" else path
+        fmt = args.format or format_of(path)
+        batch_id = args.batch_id or file_batch_id(path)
+
+        def report(summary):
+            rate = summary["events"] / max(time.perf_counter() - start, 1e-9)
+            print(f"  {summary['events']:,} events · {summary['matched']:,} subscriptions "
+                  f"updated · {rate:,.0f} events/s", file=sys.stderr)
+
+        summary = ingest(subs_repo, source, fmt, batch_id, args.flush_events, report)
+        if summary["already_done"]:
+            print(f"⏭ {batch_id}: already ingested, skipped", file=sys.stderr)
+            continue
+        unmatched = summary["subscriptions"] - summary["matched"]
+        print(f"✅ {batch_id}: {summary['events']:,} events in "
+              f"{time.perf_counter() - start:.1f} s · {summary['matched']:,} subscriptions "
+              f"updated · {unmatched:,} without an open subscription · "
+              f"{summary['buckets']:,} history buckets · "
+              f"{summary['invalid']:,} invalid events", file=sys.stderr)
+        if summary["invalid"]:
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
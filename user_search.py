@@ -0,0 +1,88 @@
+# ====================================================
+# 🔎 User Queries (Admin Users Tab)
+# ====================================================
+"""Search, filters and keyset pages for the admin Users tab.
+
+Search is an anchored prefix match, so it stays on an index: names are
+matched against `name_lower` (kept in step with `name` on every write),
+emails against `email` as typed. Pages are keyset pages on `_id` with a
+projection that leaves out passwords, and the header counts are
+`count_documents` calls on the (role, approved) index.
+
+Bulk actions (approve, change role, delete) send one update_many /
+delete_many per BULK_CHUNK_SIZE ids and report progress after each chunk.
+"""
+import re
+
+from subscriptions import DEFAULT_PAGE_SIZE
+
+
+USER_LIST_PROJECTION = {"name": 1, "email": 1, "role": 1, "approved": 1}
+CHURN_LIST_PROJECTION = {"name": 1, "email": 1, "churn_score": 1, "churn_scored_at": 1}
+SUPER_ADMIN_EMAIL = "admin@portal.com"
+BULK_CHUNK_SIZE = 1000
+
+
+def chunked(ids, size=BULK_CHUNK_SIZE):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def with_search_keys(fields):
+    """fields plus the lowercase copy of `name` that prefix search uses"""
+    if "name" in fields:
+        fields = dict(fields, name_lower=str(fields["name"]).lower())
+    return fields
+
+
+def approved_query(approved):
+    """A user without `approved` is pending, as at login"""
+    if approved is None:
+        return {}
+    return {"approved": True} if approved else {"approved": {"$ne": True}}
+
+
+def user_query(search="", role=None, approved=None, exclude_emails=()):
+    query = {}
+    if role:
+        query["role"] = role
+    query.update(approved_query(approved))
+    if exclude_emails:
+        query["email"] = {"$nin": list(exclude_emails)}
+    search = (search or "").strip()
+    if search:
+        query["$or"] = [
+            {"name_lower": {"$regex": "^" + re.escape(search.lower())}},
+            {"email": {"$regex": "^" + re.escape(search)}},
+        ]
+    return query
+
+
+def user_matches(user, search="", role=None, approved=None, exclude_emails=()):
+    """Python twin of user_query() for the in-memory backend"""
+    if role and user.get("role") != role:
+        return False
+    if approved is not None and bool(user.get("approved") is True) != approved:
+        return False
+    if user.get("email") in exclude_emails:
+        return False
+    search = (search or "").strip()
+    if search:
+        name_lower = user.get("name_lower", str(user.get("name", "")).lower())
+        return name_lower.startswith(search.lower()) or \
+            str(user.get("email", "")).startswith(search)
+    return True
+
+
+def user_search_page(users_collection, search="", role=None, approved=None,
+                     exclude_emails=(), after_id=None, page_size=DEFAULT_PAGE_SIZE):
+    """(users, next_cursor) — one page of matching users in _id order"""
+    query = user_query(search, role, approved, exclude_emails)
+    if after_id is not None:
+        query["_id"] = {"$gt": after_id}
+    users = list(users_collection.find(query, USER_LIST_PROJECTION)
+                 .sort("_id", 1).limit(page_size + 1))
+    has_more = len(users) > page_size
+    users = users[:page_size]
+    return users, (users[-1]["_id"] if has_more and users else None)